@@ -1,70 +1,59 @@
 import os
-import operator
 from typing import Annotated, List, TypedDict, Union
 
-from langchain_aws import ChatBedrock
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph, END
 from tools import available_tools
+from metrics import stage, record_tokens, LLM_ATTEMPTS, LLM_RETRIES, VALIDATION_FAILURES
+from llm_gateway import chat_model, gateway, estimate_tokens, PRIORITIES, PRIORITY_INTERACTIVE, GatewayTimeout, Throttled
+from model_router import MODEL_TIERS, ROUTE_ESCALATIONS, ROUTE_OUTCOMES, escalation_path, route_prompt
 from pydantic import BaseModel, Field
 
+import blob_store
+from semantic_cache import SEMANTIC_CACHE_ENABLED, semantic_cache
+
+# Message history kept in state (and in every checkpoint); older turns are dropped
+MAX_STATE_MESSAGES = int(os.environ.get("MAX_STATE_MESSAGES", "20"))
+
+def window_messages(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+    """Append like operator.add, but keep only the last MAX_STATE_MESSAGES"""
+    return (left + right)[-MAX_STATE_MESSAGES:]
+
 # --- State Application ---
 class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], window_messages]
     plan: List[str]
     current_step: int
-    results: dict
+    results: dict  # large artifacts by reference: "graph_ref" -> blob_store
+    priority: str  # "interactive" (default) or "batch", see llm_gateway.PRIORITIES
 
 # --- LLM Setup ---
-# Using Amazon Nova Lite via Bedrock
-llm = ChatBedrock(
-    model_id="apac.amazon.nova-lite-v1:0", 
-    model_kwargs={
-        "temperature": 0.4,  # Balanced creativity/consistency for production
-        "top_p": 0.9,        # Nucleus sampling for better quality
-    },
-    max_tokens=8192,  # Support complex workflows (20+ nodes)
-    region_name=os.environ.get("AWS_DEFAULT_REGION", "ap-south-1")
-)
-
-from graph_models import WorkflowGraph
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage
+# Amazon Nova models via Bedrock on the gateway's pooled client. Which model
+# (and max_tokens) a request gets is decided per prompt by model_router.
+from graph_models import WORKFLOW_EXPORT_SCHEMA, parse_workflow_export
+from checkpointing import build_checkpointer
+from pydantic import ValidationError
+
+_structured_llms = {}
+
+def get_structured_llm(model_id, max_tokens):
+    """Model bound to the export schema. Bedrock enforces it through a forced
+    tool call, so the answer arrives as parsed tool arguments, not JSON text."""
+    key = (model_id, max_tokens)
+    if key not in _structured_llms:
+        llm = chat_model(
+            model_id,
+            max_tokens=max_tokens,
+            temperature=0.4,  # Balanced creativity/consistency for production
+            top_p=0.9,        # Nucleus sampling for better quality
+        )
+        _structured_llms[key] = llm.with_structured_output(WORKFLOW_EXPORT_SCHEMA, include_raw=True)
+    return _structured_llms[key]
 
 # --- Planner Agent ---
-# We use the 'with_structured_output' capability if available, or just a strong system prompt with JSON enforcement.
-# Since Bedrock + LangChain integration varies, we will use a strong system prompt for JSON output.
-planner_system_prompt = """You are a Workflow Architect. Your objective is to design a high-fidelity automation workflow in a strict JSON format compatible with the company application.
-
-### MANDATORY JSON STRUCTURE
-The response must be a single JSON object with this exact structure:
-{{
-  "version": "1.0",
-  "exported_at": "2026-01-27T10:41:52Z",
-  "workflows": [
-    {{
-      "name": "Mandatory Workflow Name",
-      "description": "...",
-      "workflow_data": {{
-        "nodes": [
-          {{
-            "id": "node-1",
-            "type": "webhook",
-            "label": "Human Readable Label",
-            "config": {{ "accept_json_only": true }},
-            "nodeNumber": 1
-          }}
-        ],
-        "connections": [
-          {{ "from": "node-1", "to": "node-2" }}
-        ]
-      }},
-      "is_active": true
-    }}
-  ],
-  "workflow_comments": {{}}
-}}
+planner_system_prompt = """You are a Workflow Architect. Your objective is to design a high-fidelity automation workflow compatible with the company application.
+Always answer by calling the `WorkflowExport` tool with exactly one workflow.
 
 ### CRITICAL RULES FOR NODES
 1. **LABEL**: EVERY node MUST have a descriptive `label` string (e.g., "Check CPU", "Clear Cache"). If missing, it will show as "Untitled".
@@ -244,485 +233,271 @@ Before generating the workflow, ensure:
 - Are all required parameters present?
 - Are all operators valid?
 - No circular dependencies?
-- No text outside JSON.
 """
 
-def validate_connections(graph_data):
-    """Validate that all nodes are properly connected"""
-    workflows = graph_data.get("workflows", [])
-    if not workflows:
-        return []
-    
-    nodes = workflows[0].get("workflow_data", {}).get("nodes", [])
-    connections = workflows[0].get("workflow_data", {}).get("connections", [])
-    
-    errors = []
-    node_ids = {n["id"] for n in nodes}
-    incoming = {nid: [] for nid in node_ids}
-    outgoing = {nid: [] for nid in node_ids}
-    
-    # Build connection graph
-    for conn in connections:
-        from_id = conn["from"]
-        to_id = conn["to"]
-        if from_id in outgoing:
-            outgoing[from_id].append(to_id)
-        if to_id in incoming:
-            incoming[to_id].append(from_id)
-    
-    # Validate each node
-    for node in nodes:
-        nid = node["id"]
-        ntype = node["type"]
-        label = node.get("label", "Unknown")
-        
-        # Start nodes should have no incoming
-        if ntype in ["webhook", "trigger"]:
-            if incoming[nid]:
-                errors.append(f"{nid} ({label}): Start node should have no incoming connections")
-            if not outgoing[nid]:
-                errors.append(f"{nid} ({label}): Start node must have at least 1 outgoing connection")
-        else:
-            # All other nodes must have incoming
-            if not incoming[nid]:
-                errors.append(f"{nid} ({label}): Orphaned node - no incoming connections")
-        
-        # Condition nodes must have exactly 2 outgoing (true/false)
-        if ntype == "condition":
-            if len(outgoing[nid]) != 2:
-                errors.append(f"{nid} ({label}): Condition must have exactly 2 outgoing connections (true/false)")
-        
-        # Warn about potential dead ends (nodes with no outgoing except final log nodes)
-        if not outgoing[nid] and ntype not in ["log"] and len(nodes) > 1:
-            # Check if this is truly a dead end or just a final node
-            # A final node is acceptable if it's at the end of a branch
-            if incoming[nid]:  # Has incoming, so it's in the middle of flow
-                errors.append(f"{nid} ({label}): Potential dead end - no outgoing connections")
-    
-    return errors
-
-# --- Production-Ready Validation Functions ---
-
-def validate_json_structure(graph_data):
-    """Validate JSON structure before processing"""
-    errors = []
-    
-    if "workflows" not in graph_data:
-        errors.append("Missing 'workflows' key in root object")
-        return errors
-    
-    if not isinstance(graph_data["workflows"], list):
-        errors.append("'workflows' must be an array")
-        return errors
-    
-    if len(graph_data["workflows"]) == 0:
-        errors.append("'workflows' array is empty")
-        return errors
-    
-    workflow = graph_data["workflows"][0]
-    
-    if not workflow.get("name") or not workflow.get("name").strip():
-        errors.append("Workflow 'name' is required and cannot be empty")
-    
-    if not workflow.get("description") or not workflow.get("description").strip():
-        errors.append("Workflow 'description' is required and cannot be empty")
-    
-    if "workflow_data" not in workflow:
-        errors.append("Missing 'workflow_data' in workflow")
-        return errors
-    
-    workflow_data = workflow["workflow_data"]
-    
-    if "nodes" not in workflow_data:
-        errors.append("Missing 'nodes' in workflow_data")
-    
-    if "connections" not in workflow_data:
-        errors.append("Missing 'connections' in workflow_data")
-    
-    return errors
-
-def validate_node_ids(nodes):
-    """Ensure all node IDs are unique"""
-    errors = []
-    node_ids = [n["id"] for n in nodes]
-    duplicates = [nid for nid in node_ids if node_ids.count(nid) > 1]
-    
-    if duplicates:
-        unique_dupes = list(set(duplicates))
-        errors.append(f"Duplicate node IDs found: {', '.join(unique_dupes)}")
-    
-    return errors
+from workflow_validation import (
+    INTEGRATION_REQUIRED_PARAMS, VALID_OPERATORS, auto_fix_connections, detect_cycles,
+    validate_condition_operators, validate_connection_targets, validate_connections,
+    validate_integration_params, validate_json_structure, validate_node_ids,
+)
 
-def validate_connection_targets(nodes, connections):
-    """Validate all connections reference existing nodes"""
-    errors = []
-    node_ids = {n["id"] for n in nodes}
-    
-    for conn in connections:
-        from_id = conn.get("from")
-        to_id = conn.get("to")
-        
-        if not from_id:
-            errors.append("Connection missing 'from' field")
-            continue
-        
-        if not to_id:
-            errors.append("Connection missing 'to' field")
-            continue
-        
-        if from_id not in node_ids:
-            errors.append(f"Connection references non-existent source node: {from_id}")
-        
-        if to_id not in node_ids:
-            errors.append(f"Connection references non-existent target node: {to_id}")
-    
-    return errors
-
-# Integration parameter requirements
-INTEGRATION_REQUIRED_PARAMS = {
-    "Email": {
-        "send_email": ["to", "subject", "body"],
-        "send_bulk_email": ["recipients", "subject", "body"]
-    },
-    "AWS": {
-        "list_blocked_ips_waf": ["ipset_name", "scope"],
-        "unblock_ip_waf": ["ipset_name", "ip", "scope"]
-    },
-    "Github": {
-        "create_issue": ["params"],
-        "list_projects": ["params"]
-    },
-    "Gitlab": {
-        "create_issue": ["params"],
-        "list_projects": ["params"]
-    }
+# --- POST-PROCESSING: Enforcement of Integration Schema ---
+# IDs match public.integrations table in workflow_db.sql
+INTEGRATION_MAP = {
+    "email": {"id": 48, "type": "Email", "default_task": "send_email", "display": "Send Email"},
+    "aws": {"id": 42, "type": "AWS", "default_task": "list_blocked_ips_waf", "display": "List Blocked IPs"},
+    "github": {"id": 49, "type": "Github", "default_task": "create_issue", "display": "Create Issue"},
+    "gitlab": {"id": 45, "type": "Gitlab", "default_task": "create_issue", "display": "Create Issue"}
 }
 
-def validate_integration_params(nodes):
-    """Validate integration nodes have required parameters"""
-    errors = []
-    
-    for node in nodes:
-        if node.get("type") != "integration":
-            continue
-        
-        integration_type = node.get("integration_type_name")
-        task = node.get("task")
-        params = node.get("params", {})
-        node_id = node.get("id")
-        label = node.get("label", "Unknown")
-        
-        if integration_type in INTEGRATION_REQUIRED_PARAMS:
-            required = INTEGRATION_REQUIRED_PARAMS[integration_type].get(task, [])
-            for param in required:
-                if param not in params or not params[param]:
-                    errors.append(
-                        f"{node_id} ({label}): Missing required parameter '{param}' for {integration_type}.{task}"
-                    )
-    
-    return errors
+def enforce_integration_schema(graph_data):
+    """Pin integration nodes to the registry, or downgrade them to log nodes"""
+    if "workflows" in graph_data:
+        for wf in graph_data["workflows"]:
+            nodes = wf.get("workflow_data", {}).get("nodes", [])
+            for node in nodes:
+                if node.get("type") == "integration":
+                    # Find matching integration
+                    itype = str(node.get("integration_type_name", "")).lower()
+                    label = str(node.get("label", "")).lower()
+                    match = None
+                    
+                    for key, val in INTEGRATION_MAP.items():
+                        if key in itype or key in label:
+                            match = val
+                            break
+                    
+                    if match:
+                        # Apply mandatory root fields
+                        node["integration_id"] = match["id"]
+                        node["integration_type_name"] = match["type"]
+                        node["task"] = node.get("task") or match["default_task"]
+                        node["task_display_name"] = node.get("task_display_name") or match["display"]
+                        node["continue_on_error"] = node.get("continue_on_error", False)
+                        node["run_all_tasks"] = node.get("run_all_tasks", False)
+                        
+                        # Ensure params object exists
+                        if "params" not in node:
+                            node["params"] = {}
+                        
+                        # Inject mandatory fields as per user request
+                        node["params"]["timeout_seconds"] = 300
+                        node["params"]["integration_types"] = match["type"]
+                    else:
+                        # Fallback to LOG node if it's an unrecognized integration
+                        original_label = node.get('label', 'Missing Integration')
+                        node["type"] = "log"
+                        node["label"] = f"Log: Unsupported Integration"
+                        node["config"] = {"message": f"No integrations available for this requirement: {original_label}"}
+                        node["params"] = {}
+                        # Clean up integration fields
+                        fields_to_remove = ["integration_id", "task", "task_display_name", "integration_type_name", "continue_on_error", "run_all_tasks"]
+                        for field in fields_to_remove:
+                            node.pop(field, None)
 
-# Valid condition operators
-VALID_OPERATORS = ["eq", "ne", "gt", "lt", "gte", "lte", "contains", "not_contains"]
+def planner_node(state: AgentState):
+    with stage("planner"):
+        return _plan(state)
 
-def validate_condition_operators(nodes):
-    """Validate condition node operators"""
-    errors = []
-    
-    for node in nodes:
-        if node.get("type") != "condition":
-            continue
-        
-        node_id = node.get("id")
-        label = node.get("label", "Unknown")
-        config = node.get("config", {})
-        condition = config.get("condition", {})
-        operator = condition.get("operator")
-        
-        if not operator:
-            errors.append(f"{node_id} ({label}): Missing operator in condition")
-        elif operator not in VALID_OPERATORS:
-            errors.append(
-                f"{node_id} ({label}): Invalid operator '{operator}'. "
-                f"Must be one of: {', '.join(VALID_OPERATORS)}"
-            )
-    
-    return errors
+def _plan(state: AgentState):
+    request = state["messages"][-1].content
+    priority = PRIORITIES.get(state.get("priority"), PRIORITY_INTERACTIVE)
+
+    # A paraphrase of an earlier request reuses its graph without an LLM call
+    if SEMANTIC_CACHE_ENABLED:
+        with stage("semantic_cache"):
+            cached = semantic_cache.lookup(request)
+        if cached is not None:
+            return _cached_plan(cached)
+    
+    # Start on the cheapest tier that fits the request; a response that fails
+    # validation is retried on the next, stronger tier.
+    route = route_prompt(request)
+    path = escalation_path(route)
+    try:
+        for attempt, tier_index in enumerate(path):
+            tier = MODEL_TIERS[tier_index]
+            result, failure = _plan_with_tier(request, tier, priority)
+            ROUTE_OUTCOMES.labels(tier["name"], failure or "success").inc()
+            result["results"]["route"] = {
+                "tier": tier["name"],
+                "model": tier["model_id"],
+                "complexity": round(route.score, 2),
+                "escalations": attempt,
+            }
+            if failure is None or attempt == len(path) - 1:
+                result = _graph_by_ref(result)
+                if failure is None and SEMANTIC_CACHE_ENABLED:
+                    semantic_cache.store(request, result["results"]["graph_ref"])
+                return result
+            next_tier = MODEL_TIERS[path[attempt + 1]]
+            ROUTE_ESCALATIONS.labels(tier["name"], next_tier["name"]).inc()
+            print(f"DEBUG: {tier['name']} tier failed ({failure}), escalating to {next_tier['name']}", flush=True)
+    except Exception as e:
+        print(f"DEBUG: Planner Error: {e}", flush=True)
+        return {
+             "messages": [AIMessage(content=f"Error generating plan: {str(e)}")],
+             "results": {}
+        }
 
-def detect_cycles(nodes, connections):
-    """Detect circular dependencies in workflow"""
-    from collections import defaultdict
-    
-    # Build adjacency list
-    graph = defaultdict(list)
-    for conn in connections:
-        graph[conn["from"]].append(conn["to"])
-    
-    # DFS to detect cycles
-    visited = set()
-    rec_stack = set()
-    
-    def has_cycle(node_id):
-        visited.add(node_id)
-        rec_stack.add(node_id)
-        
-        for neighbor in graph[node_id]:
-            if neighbor not in visited:
-                if has_cycle(neighbor):
-                    return True
-            elif neighbor in rec_stack:
-                return True
-        
-        rec_stack.remove(node_id)
-        return False
-    
-    node_ids = [n["id"] for n in nodes]
-    for nid in node_ids:
-        if nid not in visited:
-            if has_cycle(nid):
-                return ["Circular dependency detected in workflow connections"]
-    
-    return []
+def _graph_by_ref(result):
+    """Keep only a blob store reference to the graph in state; the API materializes it"""
+    results = result["results"]
+    if "graph" in results:
+        results["graph_ref"] = blob_store.put(results.pop("graph"))
+    return result
+
+def _cached_plan(cached):
+    graph = cached["graph"]
+    workflows = graph.get("workflows") or [{}]
+    node_count = len(workflows[0].get("workflow_data", {}).get("nodes", []))
+    print(f"DEBUG: Semantic cache hit for: {cached['source_prompt']}", flush=True)
+    return {
+        "plan": [],
+        "results": {
+            "graph_ref": blob_store.put(graph),
+            "semantic_cache": {"source_prompt": cached["source_prompt"]},
+        },
+        "messages": [AIMessage(content=f"✅ Workflow Plan Generated with {node_count} nodes (reused a validated plan for a similar request).")]
+    }
 
-def auto_fix_connections(graph_data):
-    """Automatically fix common connection errors before validation"""
-    if "workflows" not in graph_data or not graph_data["workflows"]:
-        return
-    
-    workflow = graph_data["workflows"][0]
-    workflow_data = workflow.get("workflow_data", {})
-    nodes = workflow_data.get("nodes", [])
-    connections = workflow_data.get("connections", [])
-    
-    if not nodes or not connections:
-        return
-    
-    # Build connection maps
-    node_ids = [n["id"] for n in nodes]
-    incoming = {nid: [] for nid in node_ids}
-    outgoing = {nid: [] for nid in node_ids}
-    
-    for conn in connections:
-        from_id = conn.get("from")
-        to_id = conn.get("to")
-        if from_id in outgoing:
-            outgoing[from_id].append(conn)
-        if to_id in incoming:
-            incoming[to_id].append(conn)
+def _plan_with_tier(request, tier, priority):
+    """One planning attempt on `tier`; returns (state update, failed phase or None)"""
+    model_id = tier["model_id"]
     
-    # Fix 1: Connect orphaned nodes to previous sequential node
-    for i, node in enumerate(nodes):
-        nid = node["id"]
-        ntype = node["type"]
-        
-        # Skip start nodes
-        if ntype in ["webhook", "trigger"]:
-            continue
-        
-        # If orphaned and not a condition node
-        if not incoming[nid] and ntype != "condition":
-            # Find previous node in sequence
-            if i > 0:
-                prev_node = nodes[i - 1]
-                prev_id = prev_node["id"]
-                
-                # Add connection from previous node
-                new_conn = {"from": prev_id, "to": nid}
-                connections.append(new_conn)
-                outgoing[prev_id].append(new_conn)
-                incoming[nid].append(new_conn)
-                print(f"AUTO-FIX: Connected orphaned node {nid} to {prev_id}", flush=True)
+    with stage("prompt_assembly"):
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", planner_system_prompt),
+            ("user", "{input}")
+        ])
+        chain = prompt | get_structured_llm(model_id, tier["max_tokens"])
     
-    # Fix 2: Ensure condition nodes have exactly 2 outgoing connections
-    for node in nodes:
-        if node.get("type") != "condition":
-            continue
-        
-        nid = node["id"]
-        out_conns = outgoing[nid]
-        
-        # Count true/false branches
-        true_conns = [c for c in out_conns if c.get("sourceHandle") == "true"]
-        false_conns = [c for c in out_conns if c.get("sourceHandle") == "false"]
-        
-        # If missing branches, try to add them
-        if len(true_conns) == 0 or len(false_conns) == 0:
-            # Find next nodes in sequence
-            node_idx = nodes.index(node)
-            
-            if len(true_conns) == 0 and node_idx + 1 < len(nodes):
-                next_node = nodes[node_idx + 1]
-                new_conn = {"from": nid, "sourceHandle": "true", "to": next_node["id"]}
-                connections.append(new_conn)
-                outgoing[nid].append(new_conn)
-                incoming[next_node["id"]].append(new_conn)
-                print(f"AUTO-FIX: Added true branch for condition {nid} to {next_node['id']}", flush=True)
-            
-            if len(false_conns) == 0 and node_idx + 2 < len(nodes):
-                next_next_node = nodes[node_idx + 2]
-                new_conn = {"from": nid, "sourceHandle": "false", "to": next_next_node["id"]}
-                connections.append(new_conn)
-                outgoing[nid].append(new_conn)
-                incoming[next_next_node["id"]].append(new_conn)
-                print(f"AUTO-FIX: Added false branch for condition {nid} to {next_next_node['id']}", flush=True)
+    # Retry logic with exponential backoff. Throttling is retried inside the
+    # gateway, which also shrinks concurrency, so it is not retried again here.
+    from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
     
-    # Update connections in workflow data
-    workflow_data["connections"] = connections
-
-def planner_node(state: AgentState):
-    request = state["messages"][-1].content
+    def count_retry(retry_state):
+        LLM_RETRIES.labels(model_id).inc()
     
-    # We will simply ask the LLM for the JSON
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", planner_system_prompt),
-        ("user", "{input}")
-    ])
-    
-    chain = prompt | llm
-    
-    # Retry logic with exponential backoff
-    from tenacity import retry, stop_after_attempt, wait_exponential
+    reserved_tokens = estimate_tokens(planner_system_prompt, request, max_tokens=tier["max_tokens"])
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_not_exception_type((Throttled, GatewayTimeout)),
+        before_sleep=count_retry,
         reraise=True
     )
     def invoke_llm_with_retry():
-        return chain.invoke({"input": request})
-    
-    try:
-        response = invoke_llm_with_retry()
-        content = response.content
-        
-        # Simple cleanup if the LLM wraps code in markdown blocks
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-            
-        import json
-        try:
-            graph_data = json.loads(content)
-        except json.JSONDecodeError as e:
-            error_msg = f"⚠️ **JSON Parsing Error**\n\nFailed to parse LLM response as JSON: {str(e)}\n\nPlease try again with a simpler workflow request."
-            print(f"DEBUG: JSON Parse Error: {e}", flush=True)
+        with stage("llm_call", model=model_id):
+            try:
+                response = gateway.invoke(
+                    chain, {"input": request},
+                    priority=priority, model=model_id, estimated_tokens=reserved_tokens
+                )
+            except Exception:
+                LLM_ATTEMPTS.labels(model_id, "error").inc()
+                raise
+        LLM_ATTEMPTS.labels(model_id, "success").inc()
+        record_tokens(model_id, response.get("raw"))
+        return response
+    
+    response = invoke_llm_with_retry()
+    
+    with stage("json_extraction"):
+        if response.get("parsed") is None:
+            VALIDATION_FAILURES.labels("structured_output").inc()
+            reason = response.get("parsing_error") or "model did not call the WorkflowExport tool"
+            error_msg = f"⚠️ **Structured Output Error**\n\nThe model did not return a workflow: {reason}\n\nPlease try again with a simpler workflow request."
+            print(f"DEBUG: Structured Output Error: {reason}", flush=True)
             return {
                 "plan": [],
                 "results": {"error": "json_parse_error"},
                 "messages": [AIMessage(content=error_msg)]
-            }
+            }, "structured_output"
         
-        # --- VALIDATION PHASE 1: JSON Structure ---
-        json_errors = validate_json_structure(graph_data)
-        if json_errors:
-            error_msg = "⚠️ **JSON Structure Errors:**\n\n" + "\n".join(f"  • {err}" for err in json_errors)
-            error_msg += "\n\nThe workflow JSON structure is invalid. Please try again."
-            print(f"DEBUG: JSON Structure Errors:\n{error_msg}", flush=True)
+        try:
+            graph_data = parse_workflow_export(response["parsed"])
+        except ValidationError as e:
+            VALIDATION_FAILURES.labels("schema").inc()
+            schema_errors = [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ]
+            error_msg = "⚠️ **Schema Validation Errors:**\n\n" + "\n".join(f"  • {err}" for err in schema_errors)
+            error_msg += "\n\nThe workflow does not match the export schema. Please try again."
+            print(f"DEBUG: Schema Validation Errors:\n{error_msg}", flush=True)
             return {
                 "plan": [],
-                "results": {"graph": graph_data, "json_errors": json_errors},
+                "results": {"graph": response["parsed"], "json_errors": schema_errors},
                 "messages": [AIMessage(content=error_msg)]
-            }
-        
-        # --- POST-PROCESSING: Enforcement of Integration Schema ---
-        # IDs match public.integrations table in workflow_db.sql
-        INTEGRATION_MAP = {
-            "email": {"id": 48, "type": "Email", "default_task": "send_email", "display": "Send Email"},
-            "aws": {"id": 42, "type": "AWS", "default_task": "list_blocked_ips_waf", "display": "List Blocked IPs"},
-            "github": {"id": 49, "type": "Github", "default_task": "create_issue", "display": "Create Issue"},
-            "gitlab": {"id": 45, "type": "Gitlab", "default_task": "create_issue", "display": "Create Issue"}
-        }
-
-        if "workflows" in graph_data:
-            for wf in graph_data["workflows"]:
-                nodes = wf.get("workflow_data", {}).get("nodes", [])
-                for node in nodes:
-                    if node.get("type") == "integration":
-                        # Find matching integration
-                        itype = str(node.get("integration_type_name", "")).lower()
-                        label = str(node.get("label", "")).lower()
-                        match = None
-                        
-                        for key, val in INTEGRATION_MAP.items():
-                            if key in itype or key in label:
-                                match = val
-                                break
-                        
-                        if match:
-                            # Apply mandatory root fields
-                            node["integration_id"] = match["id"]
-                            node["integration_type_name"] = match["type"]
-                            node["task"] = node.get("task") or match["default_task"]
-                            node["task_display_name"] = node.get("task_display_name") or match["display"]
-                            node["continue_on_error"] = node.get("continue_on_error", False)
-                            node["run_all_tasks"] = node.get("run_all_tasks", False)
-                            
-                            # Ensure params object exists
-                            if "params" not in node:
-                                node["params"] = {}
-                            
-                            # Inject mandatory fields as per user request
-                            node["params"]["timeout_seconds"] = 300
-                            node["params"]["integration_types"] = match["type"]
-                        else:
-                            # Fallback to LOG node if it's an unrecognized integration
-                            original_label = node.get('label', 'Missing Integration')
-                            node["type"] = "log"
-                            node["label"] = f"Log: Unsupported Integration"
-                            node["config"] = {"message": f"No integrations available for this requirement: {original_label}"}
-                            node["params"] = {}
-                            # Clean up integration fields
-                            fields_to_remove = ["integration_id", "task", "task_display_name", "integration_type_name", "continue_on_error", "run_all_tasks"]
-                            for field in fields_to_remove:
-                                node.pop(field, None)
-
-        # --- AUTO-FIX: Repair common connection errors ---
-        print("DEBUG: Running auto-fix for connection errors...", flush=True)
+            }, "schema"
+    
+    # --- VALIDATION PHASE 1: JSON Structure ---
+    with stage("validate.json_structure"):
+        json_errors = validate_json_structure(graph_data)
+    if json_errors:
+        VALIDATION_FAILURES.labels("json_structure").inc()
+        error_msg = "⚠️ **JSON Structure Errors:**\n\n" + "\n".join(f"  • {err}" for err in json_errors)
+        error_msg += "\n\nThe workflow JSON structure is invalid. Please try again."
+        print(f"DEBUG: JSON Structure Errors:\n{error_msg}", flush=True)
+        return {
+            "plan": [],
+            "results": {"graph": graph_data, "json_errors": json_errors},
+            "messages": [AIMessage(content=error_msg)]
+        }, "json_structure"
+    
+    # --- POST-PROCESSING: Enforcement of Integration Schema ---
+    with stage("integration_postprocess"):
+        enforce_integration_schema(graph_data)
+
+    # --- AUTO-FIX: Repair common connection errors ---
+    print("DEBUG: Running auto-fix for connection errors...", flush=True)
+    with stage("auto_fix_connections"):
         auto_fix_connections(graph_data)
 
-        # --- VALIDATION PHASE 2: Comprehensive Workflow Validation ---
-        all_validation_errors = []
+    # --- VALIDATION PHASE 2: Comprehensive Workflow Validation ---
+    all_validation_errors = []
+    
+    if "workflows" in graph_data and graph_data["workflows"]:
+        workflow = graph_data["workflows"][0]
+        workflow_data = workflow.get("workflow_data", {})
+        nodes = workflow_data.get("nodes", [])
+        connections = workflow_data.get("connections", [])
         
-        if "workflows" in graph_data and graph_data["workflows"]:
-            workflow = graph_data["workflows"][0]
-            workflow_data = workflow.get("workflow_data", {})
-            nodes = workflow_data.get("nodes", [])
-            connections = workflow_data.get("connections", [])
-            
-            # Run all validation checks
+        # Run all validation checks
+        with stage("validate.node_ids"):
             all_validation_errors.extend(validate_node_ids(nodes))
+        with stage("validate.connection_targets"):
             all_validation_errors.extend(validate_connection_targets(nodes, connections))
+        with stage("validate.connections"):
             all_validation_errors.extend(validate_connections(graph_data))
+        with stage("validate.integration_params"):
             all_validation_errors.extend(validate_integration_params(nodes))
+        with stage("validate.condition_operators"):
             all_validation_errors.extend(validate_condition_operators(nodes))
+        with stage("validate.cycles"):
             all_validation_errors.extend(detect_cycles(nodes, connections))
-        
-        if all_validation_errors:
-            error_msg = "⚠️ **Workflow Validation Failed**\n\n**Errors detected:**\n" + "\n".join(f"  • {err}" for err in all_validation_errors)
-            error_msg += "\n\n**Suggestion:** Please review the workflow structure and ensure all nodes are properly connected with valid parameters."
-            print(f"DEBUG: Validation Errors:\n{error_msg}", flush=True)
-            return {
-                "plan": [],
-                "results": {"graph": graph_data, "validation_errors": all_validation_errors},
-                "messages": [AIMessage(content=error_msg)]
-            }
+    
+    if all_validation_errors:
+        VALIDATION_FAILURES.labels("workflow").inc()
+        error_msg = "⚠️ **Workflow Validation Failed**\n\n**Errors detected:**\n" + "\n".join(f"  • {err}" for err in all_validation_errors)
+        error_msg += "\n\n**Suggestion:** Please review the workflow structure and ensure all nodes are properly connected with valid parameters."
+        print(f"DEBUG: Validation Errors:\n{error_msg}", flush=True)
+        return {
+            "plan": [],
+            "results": {"graph": graph_data, "validation_errors": all_validation_errors},
+            "messages": [AIMessage(content=error_msg)]
+        }, "workflow"
 
-        node_count = 0
-        if "workflows" in graph_data:
-            node_count = len(graph_data["workflows"][0].get("workflow_data", {}).get("nodes", []))
+    node_count = 0
+    if "workflows" in graph_data:
+        node_count = len(graph_data["workflows"][0].get("workflow_data", {}).get("nodes", []))
 
-        return {
-            "plan": [], 
-            "results": {"graph": graph_data},
-            "messages": [AIMessage(content=f"✅ Workflow Plan Generated with {node_count} nodes. All validations passed.")]
-        }
-    except Exception as e:
-        print(f"DEBUG: Planner Error: {e}", flush=True)
-        return {
-             "messages": [AIMessage(content=f"Error generating plan: {str(e)}")],
-             "results": {}
-        }
+    return {
+        "plan": [], 
+        "results": {"graph": graph_data},
+        "messages": [AIMessage(content=f"✅ Workflow Plan Generated with {node_count} nodes. All validations passed.")]
+    }, None
 
 
 # --- Executor Agent ---
@@ -746,4 +521,7 @@ workflow.add_edge("planner", END) # End after planning
 # workflow.add_edge("planner", "executor")
 # workflow.add_conditional_edges("executor", should_continue)
 
-app_graph = workflow.compile()
+# State is checkpointed after every node, keyed by thread_id (the run id),
+# so an interrupted run resumes from its last completed node
+checkpointer = build_checkpointer()
+app_graph = workflow.compile(checkpointer=checkpointer)
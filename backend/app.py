@@ -1,9 +1,81 @@
 import os
-from flask import Flask, jsonify, request
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from flask import Flask, Response, jsonify, request
 from database import db
-from agent_graph import app_graph
+from agent_graph import app_graph, checkpointer
 from langchain_core.messages import HumanMessage
 from flask_cors import CORS
+from metrics import REQUEST_LATENCY, metrics_payload
+from layout import apply_layout
+from response_encoding import encode_response
+import blob_store
+from models import AdminWorkflow, ExecutionLatencyRollup, ExecutionRollup
+from execution_plan import PlanError
+from executor import execute_workflow
+from webhook_queue import QueueUnavailable, enqueue_event, webhook_settings
+from webhook_worker import ensure_local_worker
+from rollups import ROLLUP_MAX_DAYS, aggregator, since_days, summarize, timeseries
+
+def _run_config(run_id):
+    return {"configurable": {"thread_id": run_id}}
+
+def _resume(run_id):
+    """Finish a checkpointed run: served from the checkpoint if it completed,
+    otherwise continued after its last completed node. None if there is no such run."""
+    config = _run_config(run_id)
+    snapshot = app_graph.get_state(config)
+    if not snapshot.values:
+        return None
+    return app_graph.invoke(None, config) if snapshot.next else snapshot.values
+
+def _run_prompt(run_id):
+    """The prompt a checkpointed run was started with, or None if there is no such run"""
+    snapshot = app_graph.get_state(_run_config(run_id))
+    for message in (snapshot.values or {}).get('messages', []):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return None
+
+def _run_response(run_id, final_state, data):
+    """Shape a finished graph state into the API response"""
+    # Extract messages/results
+    messages = [m.content for m in final_state['messages']]
+    results = dict(final_state.get('results') or {})
+    
+    # State holds the graph by reference; load it only now, for the response
+    graph_ref = results.pop('graph_ref', None)
+    if graph_ref:
+        graph = blob_store.get(graph_ref)
+        if graph is None:
+            results['error'] = 'graph_expired'
+        else:
+            results['graph'] = graph
+    
+    # Optional server-side layout fills node positions so the browser can skip dagre
+    wants_layout = data.get('layout') or request.args.get('layout') in ('1', 'true')
+    if wants_layout and results.get('graph') and not results.get('validation_errors') and not results.get('json_errors'):
+        apply_layout(results['graph'])
+    
+    return encode_response({
+        'status': 'success',
+        'run_id': run_id,
+        'plan': final_state.get('plan'),
+        'results': results,
+        'messages': messages
+    })
+
+def _analytics_days():
+    """?days=N window for analytics endpoints (default 30); None if invalid"""
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return None
+    return days if 1 <= days <= ROLLUP_MAX_DAYS else None
 
 def create_app():
     app = Flask(__name__)
@@ -13,6 +85,30 @@ def create_app():
 
     db.init_app(app)
 
+    # The rollup tables are ours (the rest of the schema comes from the platform's dump)
+    with app.app_context():
+        try:
+            db.metadata.create_all(db.engine, tables=[ExecutionRollup.__table__, ExecutionLatencyRollup.__table__])
+        except Exception as e:
+            print(f"DEBUG: Could not create rollup tables: {e}", flush=True)
+
+    @app.before_request
+    def start_timer():
+        request.start_time = time.perf_counter()
+
+    @app.after_request
+    def observe_latency(response):
+        if request.endpoint and request.endpoint != 'metrics':
+            REQUEST_LATENCY.labels(request.endpoint, response.status_code).observe(
+                time.perf_counter() - request.start_time
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        body, content_type = metrics_payload()
+        return Response(body, content_type=content_type)
+
     @app.route('/health')
     def health():
         try:
@@ -33,25 +129,164 @@ def create_app():
             "messages": [HumanMessage(content=prompt)],
             "plan": [],
             "current_step": 0,
-            "results": {}
+            "results": {},
+            # Batch callers (backfills, load tests) queue behind interactive users
+            "priority": data.get('priority') or request.headers.get('X-Priority', 'interactive')
         }
         
-        # Invoke the graph
-        final_state = app_graph.invoke(initial_state)
+        # The run id is the checkpoint thread; clients may supply their own to make retries resumable
+        run_id = data.get('run_id') or uuid.uuid4().hex
+        
+        # A retried request picks up its earlier run instead of planning again,
+        # but a run id can't be reused to ask for something else
+        final_state = None
+        if data.get('run_id') and checkpointer is not None:
+            existing_prompt = _run_prompt(run_id)
+            if existing_prompt is not None and existing_prompt != prompt:
+                return jsonify({'error': 'run_id belongs to a run with a different prompt'}), 409
+            final_state = _resume(run_id)
+        if final_state is None:
+            # Invoke the graph
+            final_state = app_graph.invoke(initial_state, _run_config(run_id))
+        return _run_response(run_id, final_state, data)
+
+    @app.route('/api/runs/<run_id>/resume', methods=['POST'])
+    def resume_run(run_id):
+        if checkpointer is None:
+            return jsonify({'error': 'Checkpointing is disabled'}), 409
+        final_state = _resume(run_id)
+        if final_state is None:
+            return jsonify({'error': 'Run not found'}), 404
+        return _run_response(run_id, final_state, request.get_json(silent=True) or {})
+
+    @app.route('/api/workflows/<int:workflow_id>/execute', methods=['POST'])
+    def execute_stored_workflow(workflow_id):
+        workflow = db.session.get(AdminWorkflow, workflow_id)
+        if workflow is None or not workflow.is_active:
+            return jsonify({'error': 'Workflow not found'}), 404
         
-        # Extract messages/results
-        messages = [m.content for m in final_state['messages']]
+        payload = request.get_json(silent=True) or {}
+        try:
+            log, result = execute_workflow(workflow, payload, trigger_source='api')
+        except PlanError as e:
+            return jsonify({'error': 'Workflow cannot be executed', 'details': e.errors}), 422
         
+        return encode_response({
+            'status': result['status'],
+            'execution_id': log.id,
+            'result': result
+        })
+
+    @app.route('/api/webhooks/<int:workflow_id>', methods=['POST'])
+    def receive_webhook(workflow_id):
+        # Ack fast: validate, hand the event to the queue and let webhook workers run it
+        settings = webhook_settings(workflow_id)
+        if settings is None:
+            return jsonify({'error': 'No active workflow with a webhook trigger'}), 404
+        
+        body = request.get_data(cache=True)
+        payload = request.get_json(silent=True)
+        if payload is None:
+            if settings['accept_json_only']:
+                return jsonify({'error': 'Expected a JSON body'}), 415
+            payload = {'body': body.decode('utf-8', 'replace')}
+        
+        try:
+            outcome, event_id = enqueue_event(workflow_id, payload, body, request.headers, request.remote_addr)
+        except QueueUnavailable as e:
+            return jsonify({'error': str(e)}), 503
+        ensure_local_worker(app)
+        if outcome == 'rejected':
+            # Backpressure: the queue is full, senders should retry later
+            return jsonify({'error': 'Webhook queue is full'}), 429, {'Retry-After': '5'}
+        return jsonify({'status': outcome, 'event_id': event_id}), 202 if outcome == 'queued' else 200
+
+    # Analytics read only the hourly rollups, never execution_logs, so their
+    # cost depends on the window and number of workflows, not on log volume
+    @app.route('/api/analytics/workflows', methods=['GET'])
+    def workflow_analytics():
+        days = _analytics_days()
+        if days is None:
+            return jsonify({'error': f'days must be an integer between 1 and {ROLLUP_MAX_DAYS}'}), 400
+        
+        stats = summarize('workflow', since_days(days))
+        ids = [int(k) for k in stats]
+        names = dict(db.session.execute(
+            db.select(AdminWorkflow.id, AdminWorkflow.name).where(AdminWorkflow.id.in_(ids))
+        ).all()) if ids else {}
+        workflows = [
+            {'workflow_id': int(k), 'name': names.get(int(k)), **v}
+            for k, v in sorted(stats.items(), key=lambda kv: kv[1]['runs'], reverse=True)
+        ]
+        return jsonify({'days': days, 'workflows': workflows})
+
+    @app.route('/api/analytics/workflows/<int:workflow_id>', methods=['GET'])
+    def workflow_analytics_detail(workflow_id):
+        days = _analytics_days()
+        if days is None:
+            return jsonify({'error': f'days must be an integer between 1 and {ROLLUP_MAX_DAYS}'}), 400
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in ('hour', 'day'):
+            return jsonify({'error': "granularity must be 'hour' or 'day'"}), 400
+        
+        since = since_days(days)
+        totals = summarize('workflow', since, key=str(workflow_id)).get(str(workflow_id))
         return jsonify({
-            'status': 'success',
-            'plan': final_state.get('plan'),
-            'results': final_state.get('results'),
-            'messages': messages
+            'workflow_id': workflow_id,
+            'days': days,
+            'totals': totals,
+            'series': timeseries('workflow', str(workflow_id), since, granularity) if totals else []
         })
 
+    @app.route('/api/analytics/integrations', methods=['GET'])
+    def integration_analytics():
+        days = _analytics_days()
+        if days is None:
+            return jsonify({'error': f'days must be an integer between 1 and {ROLLUP_MAX_DAYS}'}), 400
+        
+        stats = summarize('integration', since_days(days))
+        integrations = [
+            {'integration': k, **v}
+            for k, v in sorted(stats.items(), key=lambda kv: kv[1]['runs'], reverse=True)
+        ]
+        return jsonify({'days': days, 'integrations': integrations})
+
     return app
 
 app = create_app()
 
+USE_RELOADER = os.environ.get('FLASK_USE_RELOADER', 'true').lower() == 'true'
+
+def _shutdown(signum, frame):
+    # atexit doesn't run when SIGTERM kills the process; write pending rollups first
+    aggregator.flush()
+    sys.exit(0)
+
+def _run_reloader_parent(host, port):
+    """Werkzeug's reloader parent, except that SIGTERM reaches the serving child.
+
+    Werkzeug's own parent exits on SIGTERM and leaves the child to be killed
+    with its rollups unwritten. The child (WERKZEUG_RUN_MAIN=true) exits
+    through sys.exit on SIGTERM, so its atexit flush runs.
+    """
+    # Bound once here and served by each child in turn, as werkzeug does
+    sock = socket.create_server((host, port))
+    sock.set_inheritable(True)
+    env = dict(os.environ, WERKZEUG_RUN_MAIN='true', WERKZEUG_SERVER_FD=str(sock.fileno()))
+    while True:
+        child = subprocess.Popen([sys.executable] + sys.argv, env=env, pass_fds=(sock.fileno(),))
+        signal.signal(signal.SIGTERM, lambda signum, frame: child.send_signal(signum))
+        try:
+            code = child.wait()
+        except KeyboardInterrupt:
+            code = child.wait()  # the child got the same Ctrl-C
+        if code != 3:  # 3: a source file changed, start a new child
+            sys.exit(code)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    host, port = '0.0.0.0', int(os.environ.get('PORT', '5000'))
+    if USE_RELOADER and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        _run_reloader_parent(host, port)
+    if not USE_RELOADER:
+        signal.signal(signal.SIGTERM, _shutdown)
+    app.run(host=host, port=port, debug=True, use_reloader=USE_RELOADER)
@@ -0,0 +1,10 @@
+import json
+import os
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+def load_recordings(path=None):
+    """Recorded WorkflowExport tool-call payloads, shared by the fake LLM and the mock Bedrock server"""
+    path = path or os.path.join(RECORDINGS_DIR, "planner_responses.json")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,65 @@
+"""Deterministic stand-in for the Bedrock structured-output model.
+
+Replays recorded `WorkflowExport` tool-call payloads so the planner can be
+benchmarked end to end without network access or AWS credentials.
+"""
+import copy
+import itertools
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+class FakeStructuredLLM:
+    """Cycles through recordings in order; `latency` adds a fixed sleep per call"""
+
+    def __init__(self, recordings, latency=0.0):
+        self.recordings = recordings
+        self.latency = latency
+        self.calls = 0
+        self._cycle = itertools.cycle(recordings)
+
+    def _invoke(self, prompt_value):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        recording = next(self._cycle)
+        usage = recording.get("usage", {})
+        raw = AIMessage(
+            content="",
+            tool_calls=[{"name": "WorkflowExport", "args": recording["parsed"], "id": f"call-{self.calls}"}],
+            usage_metadata={
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("input_tokens", 0) + usage.get("output_tokens", 0),
+            },
+        )
+        # The planner mutates the graph in place, hand out a fresh copy each time
+        return {"raw": raw, "parsed": copy.deepcopy(recording["parsed"]), "parsing_error": None}
+
+    def as_runnable(self):
+        return RunnableLambda(self._invoke)
+
+def install(agent_graph_module, fake, semantic_cache=False):
+    """Swap the planner's model for `fake`; returns a callable that restores it.
+
+    The gateway is replaced with one without rate limits so the benchmark
+    measures the pipeline rather than the configured Bedrock quota. The
+    semantic cache is off unless asked for: with a handful of recordings,
+    every run after the first pass would otherwise be a cache hit.
+    """
+    from llm_gateway import LLMGateway
+
+    original = (
+        agent_graph_module.get_structured_llm, agent_graph_module.gateway,
+        agent_graph_module.SEMANTIC_CACHE_ENABLED,
+    )
+    runnable = fake.as_runnable()
+    agent_graph_module.get_structured_llm = lambda model_id, max_tokens: runnable
+    agent_graph_module.gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0, initial_limit=10 ** 6, max_limit=10 ** 6)
+    agent_graph_module.SEMANTIC_CACHE_ENABLED = semantic_cache
+
+    def restore():
+        (agent_graph_module.get_structured_llm, agent_graph_module.gateway,
+         agent_graph_module.SEMANTIC_CACHE_ENABLED) = original
+    return restore
@@ -0,0 +1,25 @@
+"""Reference interpreter for conditions, the way an executor would do it
+without compiling: re-parse the template and walk the path on every call.
+Only used as the baseline for the expressions.* benchmark cases."""
+import re
+
+from expressions import COMPARATORS, to_number, to_text
+
+def resolve(template, scope):
+    match = re.fullmatch(r"\{\{\s*(.+?)\s*\}\}", template) if isinstance(template, str) else None
+    if not match:
+        if isinstance(template, str) and "{{" in template:
+            return re.sub(r"\{\{\s*(.+?)\s*\}\}", lambda m: to_text(resolve("{{" + m.group(1) + "}}", scope)), template)
+        return template
+    value = scope
+    for part in re.findall(r"[^.\[\]]+", match.group(1)):
+        try:
+            value = value[int(part)] if part.isdigit() else value[part]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value
+
+def evaluate(condition, scope):
+    left = resolve(condition.get("left"), scope)
+    right = resolve(condition.get("right"), scope)
+    return bool(COMPARATORS[condition["operator"]](left, right, to_number(right), to_text(right)))
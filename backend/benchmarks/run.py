@@ -0,0 +1,304 @@
+"""Offline benchmark suite for the planning pipeline.
+
+Run from backend/:
+
+    python -m benchmarks.run                      # full suite, compare to baseline.json
+    python -m benchmarks.run --only validate      # substring filter on case names
+    python -m benchmarks.run --save-baseline      # record the current numbers
+    python -m benchmarks.run --dump-sizes 1MB,2GB # parse_sql_dump on bigger dumps
+
+Exits with status 1 when any case's p50 regresses past --tolerance.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_workflow, parse_size, write_sql_dump
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+def measure(fn, setup=None, repeat=50, budget=10.0):
+    """Call fn(setup()) up to `repeat` times, stopping early after `budget` seconds (min 3 runs)"""
+    samples = []
+    error = None
+    started = time.perf_counter()
+    # The pipeline prints DEBUG/AUTO-FIX lines; keep paying for them but off the terminal
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            arg = setup() if setup else None
+            t0 = time.perf_counter()
+            try:
+                fn(arg)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            samples.append(time.perf_counter() - t0)
+            if len(samples) >= 3 and time.perf_counter() - started > budget:
+                break
+    if not samples:
+        return {"runs": 0, "error": error}
+    result = {
+        "runs": len(samples),
+        "mean": statistics.fmean(samples),
+        "p50": percentile(samples, 50),
+        "p99": percentile(samples, 99),
+        "ops_per_sec": len(samples) / sum(samples) if sum(samples) else float("inf"),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+def planner_cases(args):
+    import agent_graph
+    from langchain_core.messages import HumanMessage
+    from benchmarks import load_recordings
+    from benchmarks.fake_llm import FakeStructuredLLM, install
+    from semantic_cache import semantic_cache
+
+    recordings = load_recordings(args.recordings)
+    fake = FakeStructuredLLM(recordings, latency=args.llm_latency)
+    restore = install(agent_graph, fake)
+    prompts = [r["prompt"] for r in recordings]
+    counter = iter(range(sys.maxsize))
+
+    def run_planner(_):
+        prompt = prompts[next(counter) % len(prompts)]
+        agent_graph.planner_node({"messages": [HumanMessage(content=prompt)], "plan": [], "current_step": 0, "results": {}})
+
+    def run_cached(_):
+        calls = fake.calls
+        run_planner(None)
+        if fake.calls != calls:
+            raise AssertionError("semantic cache miss: the planner called the model")
+
+    def semantic_hits():
+        # Plan each prompt once (misses), then measure the hit path only
+        agent_graph.SEMANTIC_CACHE_ENABLED = True
+        semantic_cache.clear()
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for _ in prompts:
+                    run_planner(None)
+            return measure(run_cached, repeat=args.repeat, budget=args.budget)
+        finally:
+            agent_graph.SEMANTIC_CACHE_ENABLED = False
+            semantic_cache.clear()
+
+    try:
+        yield "planner.e2e", lambda: measure(run_planner, repeat=args.repeat, budget=args.budget)
+        yield "planner.semantic_hit", semantic_hits
+    finally:
+        restore()
+
+def validator_cases(args):
+    import agent_graph
+
+    for size in args.sizes:
+        graph = make_workflow(size)
+        wd = graph["workflows"][0]["workflow_data"]
+        nodes, connections = wd["nodes"], wd["connections"]
+        checks = {
+            "validate_json_structure": lambda _: agent_graph.validate_json_structure(graph),
+            "validate_node_ids": lambda _: agent_graph.validate_node_ids(nodes),
+            "validate_connection_targets": lambda _: agent_graph.validate_connection_targets(nodes, connections),
+            "validate_connections": lambda _: agent_graph.validate_connections(graph),
+            "validate_integration_params": lambda _: agent_graph.validate_integration_params(nodes),
+            "validate_condition_operators": lambda _: agent_graph.validate_condition_operators(nodes),
+            "detect_cycles": lambda _: agent_graph.detect_cycles(nodes, connections),
+        }
+        for name, fn in checks.items():
+            yield f"{name}.{size}", lambda: measure(fn, repeat=args.repeat, budget=args.budget)
+
+        from layout import compute_layout
+        yield f"compute_layout.{size}", lambda: measure(
+            lambda _: compute_layout(nodes, connections), repeat=args.repeat, budget=args.budget
+        )
+
+        # auto_fix mutates its input, so every run gets a fresh copy (not timed)
+        serialized = json.dumps(make_workflow(size, orphan_ratio=0.1, seed=size))
+        yield f"auto_fix_connections.{size}", lambda: measure(
+            agent_graph.auto_fix_connections,
+            setup=lambda: json.loads(serialized),
+            repeat=args.repeat,
+            budget=args.budget,
+        )
+
+def sql_dump_cases(args):
+    from extract_integrations import parse_sql_dump
+
+    with tempfile.TemporaryDirectory(prefix="sqlbench-") as tmp:
+        def run_case(label):
+            path = os.path.join(tmp, f"dump-{label}.sql")
+            written = write_sql_dump(path, parse_size(label))
+            try:
+                result = measure(lambda _: parse_sql_dump(path), repeat=max(3, args.repeat // 10), budget=args.budget)
+            finally:
+                os.remove(path)
+            if result.get("runs"):
+                result["mb_per_sec"] = written / (1 << 20) / result["p50"]
+            return result
+
+        for label in args.dump_sizes:
+            yield f"parse_sql_dump.{label}", lambda: run_case(label)
+
+EXPRESSION_CONDITIONS = [
+    {"left": "{{data.status}}", "operator": "eq", "right": "firing"},
+    {"left": "{{data.usage}}", "operator": "gt", "right": 90},
+    {"left": "{{data.usage}}", "operator": "lte", "right": "95"},
+    {"left": "{{data.labels.severity}}", "operator": "ne", "right": "info"},
+    {"left": "{{data.tags}}", "operator": "contains", "right": "prod"},
+    {"left": "{{data.message}}", "operator": "not_contains", "right": "test"},
+    {"left": "{{ip}}", "operator": "eq", "right": "{{data.source_ip}}"},
+    {"left": "{{data.alerts[1].value}}", "operator": "gte", "right": 3.5},
+]
+EXPRESSION_SCOPE = {
+    "ip": "10.0.0.7",
+    "data": {
+        "status": "firing", "usage": "91.5", "labels": {"severity": "critical"},
+        "tags": ["prod", "db"], "message": "disk almost full", "source_ip": "10.0.0.7",
+        "alerts": [{"value": 1}, {"value": "4.2"}],
+    },
+}
+
+def expression_cases(args):
+    from expressions import compile_condition
+    from benchmarks import naive_expressions
+
+    compiled = [compile_condition(c) for c in EXPRESSION_CONDITIONS]
+    naive = [(naive_expressions.evaluate, c) for c in EXPRESSION_CONDITIONS]
+    assert [f(EXPRESSION_SCOPE) for f in compiled] == [f(c, EXPRESSION_SCOPE) for f, c in naive]
+    rounds = range(1000 // len(EXPRESSION_CONDITIONS))
+
+    def run_compiled(_):
+        for _ in rounds:
+            for condition in compiled:
+                condition(EXPRESSION_SCOPE)
+
+    def run_naive(_):
+        for _ in rounds:
+            for evaluate, condition in naive:
+                evaluate(condition, EXPRESSION_SCOPE)
+
+    # Each run evaluates 1000 conditions, so p50 in ms == microseconds per condition
+    yield "expressions.compiled_x1000", lambda: measure(run_compiled, repeat=args.repeat, budget=args.budget)
+    yield "expressions.naive_x1000", lambda: measure(run_naive, repeat=args.repeat, budget=args.budget)
+
+def http_cases(args):
+    import requests
+    from http_runtime import HttpRuntime
+    from loadtest.stub_http import start
+
+    server, base_url = start()
+    runtime = HttpRuntime()
+    url = f"{base_url}/json?size=20"
+    try:
+        yield "http_node.pooled", lambda: measure(
+            lambda _: runtime.request("GET", url, timeout=5), repeat=args.repeat * 4, budget=args.budget
+        )
+        # What every call would cost without keep-alive: a fresh connection each time
+        yield "http_node.fresh_connection", lambda: measure(
+            lambda _: requests.get(url, timeout=5, headers={"Connection": "close"}).json(),
+            repeat=args.repeat * 4, budget=args.budget,
+        )
+        yield "http_node.body_cap_8MB", lambda: measure(
+            lambda _: runtime.request("GET", f"{base_url}/bytes?n={8 << 20}", timeout=10),
+            repeat=max(3, args.repeat // 10), budget=args.budget,
+        )
+    finally:
+        server.shutdown()
+
+def compare(results, baseline, tolerance):
+    """Attach the p50 delta vs baseline to each case; returns regressed case names"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not result.get("runs"):
+            continue
+        delta = result["p50"] / base["p50"] - 1 if base["p50"] else 0.0
+        result["p50_delta"] = delta
+        if delta > tolerance:
+            regressions.append(name)
+    return regressions
+
+def format_row(name, r):
+    if not r.get("runs"):
+        return f"{name:<42} ERROR {r.get('error')}"
+    line = (
+        f"{name:<42} runs={r['runs']:<5} p50={r['p50'] * 1000:>10.3f}ms "
+        f"p99={r['p99'] * 1000:>10.3f}ms  {r['ops_per_sec']:>10.1f} ops/s"
+    )
+    if "mb_per_sec" in r:
+        line += f"  {r['mb_per_sec']:.1f} MB/s"
+    if "p50_delta" in r:
+        line += f"  ({r['p50_delta']:+.1%} vs baseline)"
+    if r.get("error"):
+        line += f"  [{r['error']}]"
+    return line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="Run only cases whose name contains this substring")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Synthetic workflow node counts")
+    parser.add_argument("--dump-sizes", default="1MB,16MB", help="SQL dump sizes, e.g. 1MB,512MB,2GB")
+    parser.add_argument("--repeat", type=int, default=50, help="Maximum runs per case")
+    parser.add_argument("--budget", type=float, default=10.0, help="Seconds per case before stopping early")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per fake LLM call")
+    parser.add_argument("--recordings", help="Recorded planner responses (JSON list)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown before failing")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", help="Also write raw results to this file")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    args.dump_sizes = [s for s in args.dump_sizes.split(",") if s]
+
+    # Recursive cycle detection needs headroom on the 10k node graphs
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), max(args.sizes) * 4))
+
+    # Each group yields (name, thunk) so filtered-out cases are never measured
+    results = {}
+    for group in (planner_cases, validator_cases, expression_cases, sql_dump_cases, http_cases):
+        for name, run_case in group(args):
+            if args.only and args.only not in name:
+                continue
+            result = results[name] = run_case()
+            print(format_row(name, result), flush=True)
+
+    if args.save_baseline:
+        baseline = {n: {"p50": r["p50"], "p99": r["p99"]} for n, r in results.items() if r.get("runs")}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for {len(baseline)} cases to {args.baseline}")
+        regressions = []
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print()
+        for name in results:
+            print(format_row(name, results[name]))
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        regressions = []
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if regressions:
+        print(f"\nREGRESSED (p50 > +{args.tolerance:.0%}): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Synthetic workflows and SQL dumps for the benchmark suite."""
+import json
+import random
+
+_EMAIL = {"integration_id": 48, "integration_type_name": "Email", "task": "send_email", "task_display_name": "Send Email"}
+_AWS = {"integration_id": 42, "integration_type_name": "AWS", "task": "list_blocked_ips_waf", "task_display_name": "List Blocked IPs"}
+
+def _node(n, ntype, label, **fields):
+    node = {"id": f"node-{n}", "type": ntype, "label": label, "nodeNumber": n}
+    node.update(fields)
+    return node
+
+def _integration(n, spec, params):
+    params = dict(params, timeout_seconds=300, integration_types=spec["integration_type_name"])
+    return _node(n, "integration", f"{spec['task_display_name']} {n}", params=params,
+                 continue_on_error=False, run_all_tasks=False, **spec)
+
+def make_workflow(n_nodes, orphan_ratio=0.0, seed=0):
+    """Build a valid export with `n_nodes` nodes.
+
+    The graph is a webhook followed by repeating segments of
+    integration -> condition -> (email | log) -> merge script, so every
+    validator and the auto-fixer see realistic branching. `orphan_ratio`
+    drops that share of plain sequential connections to give
+    auto_fix_connections something to repair.
+    """
+    rng = random.Random(seed)
+    nodes = [_node(1, "webhook", "Receive Alert", config={"accept_json_only": True}, params={})]
+    connections = []
+    prev = "node-1"
+    n = 2
+    while n + 4 <= n_nodes:
+        check, cond, yes, no, merge = (f"node-{n + i}" for i in range(5))
+        nodes.append(_integration(n, _AWS, {"ipset_name": "blocked-ips", "scope": "REGIONAL"}))
+        nodes.append(_node(n + 1, "condition", f"Is Blocked {n + 1}?", config={
+            "condition": {"format": "simple", "type": "simple", "left": "{{data.status}}", "operator": "eq", "right": "blocked"},
+            "true_nodes": [], "false_nodes": [],
+        }))
+        nodes.append(_integration(n + 2, _EMAIL, {"to": "ops@example.com", "subject": "Blocked", "body": "IP is blocked"}))
+        nodes.append(_node(n + 3, "log", f"Log {n + 3}", config={"message": "not blocked"}))
+        nodes.append(_node(n + 4, "script", f"Merge {n + 4}", params={"script": "status = data.get('status')"}))
+        connections += [
+            {"from": prev, "to": check},
+            {"from": check, "to": cond},
+            {"from": cond, "sourceHandle": "true", "to": yes},
+            {"from": cond, "sourceHandle": "false", "to": no},
+            {"from": yes, "to": merge},
+            {"from": no, "to": merge},
+        ]
+        prev = merge
+        n += 5
+    while n <= n_nodes:
+        nodes.append(_node(n, "log", f"Log {n}", config={"message": "done"}))
+        connections.append({"from": prev, "to": f"node-{n}"})
+        prev = f"node-{n}"
+        n += 1
+
+    if orphan_ratio:
+        plain = [c for c in connections if "sourceHandle" not in c]
+        dropped = {id(c) for c in rng.sample(plain, int(len(plain) * orphan_ratio))}
+        connections = [c for c in connections if id(c) not in dropped]
+
+    return {
+        "version": "1.0",
+        "exported_at": "2026-01-27T10:41:52Z",
+        "workflows": [{
+            "name": f"Synthetic {n_nodes} nodes",
+            "description": "Generated by benchmarks.synthetic",
+            "workflow_data": {"nodes": nodes, "connections": connections},
+            "is_active": True,
+        }],
+        "workflow_comments": {},
+    }
+
+def parse_size(text):
+    """'64MB' -> 67108864; plain integers are bytes"""
+    text = str(text).strip().upper()
+    for suffix, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+def write_sql_dump(path, target_bytes, n_types=40, seed=0):
+    """Stream a pg_dump-shaped file of roughly `target_bytes` to `path`.
+
+    Filler execution_logs rows come first so parse_sql_dump has to scan the
+    bulk of the file before it reaches the integration tables.
+    """
+    rng = random.Random(seed)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        def emit(text):
+            nonlocal written
+            f.write(text)
+            written += len(text)
+
+        emit("--\n-- PostgreSQL database dump\n--\n\n")
+        emit("COPY public.execution_logs (id, workflow_id, integration_id, log_type, status, execution_data) FROM stdin;\n")
+        row_id = 1
+        tail_budget = 4096 + n_types * 1024
+        while written < target_bytes - tail_budget:
+            payload = json.dumps({"step": row_id, "status": "ok", "output": "x" * rng.randint(50, 400)})
+            emit(f"{row_id}\t{rng.randint(1, 500)}\t{rng.randint(1, n_types)}\tworkflow\tcompleted\t{payload}\n")
+            row_id += 1
+        emit("\\.\n\n")
+
+        emit("COPY public.integration_types (id, name, display_name, description, tasks) FROM stdin;\n")
+        for tid in range(1, n_types + 1):
+            tasks = [
+                {
+                    "name": f"task_{tid}_{k}",
+                    "display_name": f"Task {tid}.{k}",
+                    "category": "action" if k % 2 else "check",
+                    "parameters": [{"name": "target", "required": True}, {"name": "note", "required": False}],
+                }
+                for k in range(6)
+            ]
+            emit(f"{tid}\tType{tid}\tType {tid}\tSynthetic type\t{json.dumps(tasks)}\n")
+        emit("\\.\n\n")
+
+        emit("COPY public.integrations (id, name, integration_type_id, config, created_by, is_active) FROM stdin;\n")
+        for iid in range(1, n_types * 2 + 1):
+            active = "t" if iid % 3 else "f"
+            emit(f"{iid}\tIntegration {iid}\t{(iid - 1) % n_types + 1}\t{{}}\t1\t{active}\n")
+        emit("\\.\n")
+    return written
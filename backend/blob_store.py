@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from metrics import record_cache
+from redis_client import get_redis
+
+BLOB_TTL = int(os.environ.get("BLOB_TTL", str(7 * 24 * 3600)))
+BLOB_CACHE_SIZE = int(os.environ.get("BLOB_CACHE_SIZE", "256"))  # in-process fallback, entries
+
+_local = OrderedDict()
+_lock = threading.Lock()
+_durable = None  # PostgresBlobs when checkpoints live in Postgres and Redis isn't configured
+
+class PostgresBlobs:
+    """Blobs in a Postgres table, so refs in durable checkpoints survive a restart"""
+
+    PURGE_EVERY = 1000  # puts between sweeps of expired rows
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.puts = 0
+        with self.pool.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "ref TEXT PRIMARY KEY, data BYTEA NOT NULL, expires_at TIMESTAMPTZ NOT NULL)"
+            )
+
+    def set(self, ref, packed, ttl):
+        with self.pool.connection() as conn:
+            # Same content, same ref: storing it again only refreshes the expiry
+            conn.execute(
+                "INSERT INTO blobs (ref, data, expires_at) VALUES (%s, %s, now() + make_interval(secs => %s)) "
+                "ON CONFLICT (ref) DO UPDATE SET expires_at = EXCLUDED.expires_at",
+                (ref, packed, ttl),
+            )
+            self.puts += 1
+            if self.puts % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM blobs WHERE expires_at < now()")
+
+    def get(self, ref):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM blobs WHERE ref = %s AND expires_at > now()", (ref,)).fetchone()
+        return bytes(row["data"]) if row else None
+
+def use_postgres(pool):
+    """Keep blobs in Postgres from now on (called when the checkpointer is Postgres-backed)"""
+    global _durable
+    _durable = PostgresBlobs(pool)
+
+def _key(ref):
+    return f"blob:{ref}"
+
+def _remember(ref, packed):
+    with _lock:
+        _local[ref] = packed
+        _local.move_to_end(ref)
+        while len(_local) > BLOB_CACHE_SIZE:
+            _local.popitem(last=False)
+
+def put(obj):
+    """Store a JSON-serializable artifact and return its content hash reference"""
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    ref = "sha256:" + hashlib.sha256(data).hexdigest()
+    packed = zlib.compress(data, 6)
+    r = get_redis()
+    if r is not None:
+        # Same content, same key: storing it again only refreshes the TTL
+        r.set(_key(ref), packed, ex=BLOB_TTL)
+        return ref
+    if _durable is not None:
+        _durable.set(ref, packed, BLOB_TTL)
+    _remember(ref, packed)
+    return ref
+
+def get(ref):
+    """A fresh copy of the artifact behind `ref`, or None if it expired or was evicted"""
+    r = get_redis()
+    if r is not None:
+        packed = r.get(_key(ref))
+    else:
+        with _lock:
+            packed = _local.get(ref)
+            if packed is not None:
+                _local.move_to_end(ref)
+        if packed is None and _durable is not None:
+            # The local LRU is only a read cache in front of Postgres
+            packed = _durable.get(ref)
+            if packed is not None:
+                _remember(ref, packed)
+    record_cache("blob", packed is not None)
+    if packed is None:
+        return None
+    return json.loads(zlib.decompress(packed))
@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+import zlib
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+import blob_store
+from redis_client import get_redis
+
+# postgres | redis | memory | none; "auto" picks postgres, then redis, then none
+CHECKPOINTER = os.environ.get("CHECKPOINTER", "auto").lower()
+CHECKPOINT_TTL = int(os.environ.get("CHECKPOINT_TTL", str(7 * 24 * 3600)))  # seconds a thread is kept after its last checkpoint
+CHECKPOINT_PRUNE_INTERVAL = float(os.environ.get("CHECKPOINT_PRUNE_INTERVAL", "3600"))  # postgres only; redis expires keys itself
+CHECKPOINT_PRUNE_BATCH = 500  # threads deleted per transaction
+CHECKPOINT_POOL_SIZE = int(os.environ.get("CHECKPOINT_POOL_SIZE", "10"))
+# Payloads smaller than this are stored as-is; zlib header overhead isn't worth it
+COMPRESS_MIN_BYTES = 512
+
+class CompressedSerializer(JsonPlusSerializer):
+    """msgpack (JsonPlus) payloads, zlib-compressed when large.
+
+    Compressed payloads carry a "z:" prefix on their type tag, so checkpoints
+    written before compression was enabled still load.
+    """
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return "z:" + type_, zlib.compress(data, 6)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.startswith("z:"):
+            return super().loads_typed((type_[2:], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+class RedisSaver(BaseCheckpointSaver):
+    """Checkpoint saver on plain Redis data types (no RedisJSON/RediSearch needed).
+
+    Per thread and namespace a sorted set indexes checkpoint ids (uuid6, so
+    lexical order is creation order); each checkpoint is a hash holding the
+    serialized checkpoint, metadata and parent id, and its pending writes
+    live in a sibling hash. Every key expires after `ttl` seconds.
+    """
+
+    def __init__(self, client, serde=None, ttl=CHECKPOINT_TTL):
+        super().__init__(serde=serde)
+        self.client = client
+        self.ttl = ttl
+
+    @staticmethod
+    def _index_key(thread_id, ns):
+        return f"ckpt:{thread_id}:{ns}"
+
+    @staticmethod
+    def _checkpoint_key(thread_id, ns, checkpoint_id):
+        return f"ckpt:{thread_id}:{ns}:{checkpoint_id}"
+
+    @staticmethod
+    def _writes_key(thread_id, ns, checkpoint_id):
+        return f"ckpt_writes:{thread_id}:{ns}:{checkpoint_id}"
+
+    def _load(self, thread_id, ns, checkpoint_id):
+        saved = self.client.hgetall(self._checkpoint_key(thread_id, ns, checkpoint_id))
+        if not saved:
+            return None
+        writes = []
+        for field, value in self.client.hgetall(self._writes_key(thread_id, ns, checkpoint_id)).items():
+            task_id, idx = field.decode().rsplit(":", 1)
+            channel, type_, payload = value.split(b"\n", 2)
+            writes.append(((task_id, int(idx)), channel.decode(), self.serde.loads_typed((type_.decode(), payload))))
+        writes.sort(key=lambda w: w[0])
+        parent_id = saved.get(b"parent", b"").decode()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((saved[b"type"].decode(), saved[b"checkpoint"])),
+            metadata=self.serde.loads_typed((saved[b"metadata_type"].decode(), saved[b"metadata"])),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(key[0], channel, value) for key, channel, value in writes],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        if not checkpoint_id:
+            latest = self.client.zrevrangebylex(self._index_key(thread_id, ns), "+", "-", start=0, num=1)
+            if not latest:
+                return None
+            checkpoint_id = latest[0].decode()
+        return self._load(thread_id, ns, checkpoint_id)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config is None:
+            raise ValueError("RedisSaver.list needs a thread_id")
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        only_id = get_checkpoint_id(config)
+        before_id = get_checkpoint_id(before) if before else None
+        upper = f"({before_id}" if before_id else "+"
+        for raw_id in self.client.zrevrangebylex(self._index_key(thread_id, ns), upper, "-"):
+            checkpoint_id = raw_id.decode()
+            if only_id and checkpoint_id != only_id:
+                continue
+            saved = self._load(thread_id, ns, checkpoint_id)
+            if saved is None:
+                continue
+            if filter and not all(saved.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield saved
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        key = self._checkpoint_key(thread_id, ns, checkpoint["id"])
+        index = self._index_key(thread_id, ns)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={
+            "type": type_,
+            "checkpoint": data,
+            "metadata_type": metadata_type,
+            "metadata": metadata_data,
+            "parent": config["configurable"].get("checkpoint_id") or "",
+        })
+        pipe.expire(key, self.ttl)
+        pipe.zadd(index, {checkpoint["id"]: 0})
+        pipe.expire(index, self.ttl)
+        pipe.execute()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        key = self._writes_key(thread_id, ns, config["configurable"]["checkpoint_id"])
+        pipe = self.client.pipeline()
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, data = self.serde.dumps_typed(value)
+            record = channel.encode() + b"\n" + type_.encode() + b"\n" + data
+            field = f"{task_id}:{idx}"
+            # Special writes (errors, interrupts) may be replaced; regular ones are write-once
+            if idx < 0:
+                pipe.hset(key, field, record)
+            else:
+                pipe.hsetnx(key, field, record)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def delete_thread(self, thread_id):
+        keys = list(self.client.scan_iter(match=f"ckpt:{thread_id}:*"))
+        keys += list(self.client.scan_iter(match=f"ckpt_writes:{thread_id}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+def _postgres_conninfo():
+    url = os.environ.get("DATABASE_URL", "")
+    # SQLAlchemy-style driver suffixes (postgresql+psycopg2://) mean nothing to libpq
+    scheme, sep, rest = url.partition("://")
+    return scheme.split("+")[0] + sep + rest
+
+POSTGRES_CHECKPOINT_TABLES = ("checkpoint_writes", "checkpoint_blobs", "checkpoints")
+
+def prune_postgres_checkpoints(pool, ttl=CHECKPOINT_TTL):
+    """Delete threads whose latest checkpoint is older than `ttl`; returns how many.
+
+    The Postgres saver has no TTL of its own; this gives it the Redis saver's
+    retention. Checkpoints carry their write time as checkpoint->>'ts'.
+    """
+    pruned = 0
+    while True:
+        with pool.connection() as conn, conn.transaction():
+            rows = conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+                "HAVING max((checkpoint->>'ts')::timestamptz) < now() - make_interval(secs => %s) LIMIT %s",
+                (ttl, CHECKPOINT_PRUNE_BATCH),
+            ).fetchall()
+            thread_ids = [row["thread_id"] for row in rows]
+            for table in POSTGRES_CHECKPOINT_TABLES if thread_ids else ():
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ANY(%s)", (thread_ids,))
+        pruned += len(thread_ids)
+        if len(thread_ids) < CHECKPOINT_PRUNE_BATCH:
+            return pruned
+
+def _prune_forever(pool):
+    while True:
+        try:
+            pruned = prune_postgres_checkpoints(pool)
+            if pruned:
+                print(f"DEBUG: Pruned {pruned} expired checkpoint threads", flush=True)
+        except Exception as e:
+            print(f"DEBUG: Checkpoint pruning failed, will retry: {e}", flush=True)
+        time.sleep(CHECKPOINT_PRUNE_INTERVAL)
+
+def _postgres_saver(serde):
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    pool = ConnectionPool(
+        _postgres_conninfo(),
+        max_size=CHECKPOINT_POOL_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=True,
+    )
+    saver = PostgresSaver(pool, serde=serde)
+    saver.setup()  # creates/migrates the checkpoint tables
+    if get_redis() is None:
+        # Checkpoints hold blob refs; blobs kept only in process memory would
+        # leave a resumed run pointing at nothing after a restart
+        blob_store.use_postgres(pool)
+    threading.Thread(target=_prune_forever, args=(pool,), name="checkpoint-prune", daemon=True).start()
+    return saver
+
+def build_checkpointer():
+    """Checkpointer selected by CHECKPOINTER, or None to run without one"""
+    kind = CHECKPOINTER
+    if kind == "auto":
+        if os.environ.get("DATABASE_URL", "").startswith("postgres"):
+            kind = "postgres"
+        elif get_redis() is not None:
+            kind = "redis"
+        else:
+            kind = "none"
+
+    serde = CompressedSerializer()
+    try:
+        if kind == "postgres":
+            saver = _postgres_saver(serde)
+        elif kind == "redis":
+            client = get_redis()
+            if client is None:
+                raise RuntimeError("CHECKPOINTER=redis needs REDIS_URL")
+            saver = RedisSaver(client, serde=serde)
+        elif kind == "memory":
+            saver = InMemorySaver(serde=serde)
+        else:
+            print("DEBUG: Checkpointing disabled", flush=True)
+            return None
+    except Exception as e:
+        # Runs still work without checkpoints; they just can't be resumed
+        print(f"DEBUG: Could not set up {kind} checkpointer, continuing without: {e}", flush=True)
+        return None
+    print(f"DEBUG: Using {kind} checkpointer", flush=True)
+    return saver
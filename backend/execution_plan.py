@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Optional, Tuple
+
+from expressions import compile_condition, compile_template
+from metrics import record_cache, stage
+from workflow_validation import detect_cycles, validate_condition_operators, validate_connection_targets, validate_node_ids
+
+PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "512"))
+
+class PlanError(Exception):
+    """The stored workflow cannot be turned into an executable plan"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+@dataclass(frozen=True, slots=True)
+class PlanNode:
+    id: str
+    type: str
+    label: str
+    handler: Optional[Callable]  # None for condition nodes and unsupported types
+    render: Callable  # scope -> {"config": ..., "params": ...} with templates filled in
+    condition: Optional[Callable]  # scope -> bool, condition nodes only
+    next: Tuple[str, ...]  # unconditional successors
+    on_true: Tuple[str, ...]
+    on_false: Tuple[str, ...]
+    source: MappingProxyType  # the stored node, read-only
+
+@dataclass(frozen=True, slots=True)
+class ExecutionPlan:
+    workflow_id: Optional[int]
+    version: Optional[str]
+    order: Tuple[str, ...]  # topological
+    entries: Tuple[str, ...]  # nodes without incoming connections
+    nodes: MappingProxyType  # id -> PlanNode
+
+# --- Compilation ---
+
+def nodes_and_connections(workflow_data):
+    """(nodes, connections) of a stored workflow; PlanError if it isn't shaped like one"""
+    try:
+        if isinstance(workflow_data, str):
+            workflow_data = json.loads(workflow_data)
+        # Accept a full export as well as a bare workflow_data
+        if "workflows" in workflow_data:
+            workflow_data = workflow_data["workflows"][0].get("workflow_data", {})
+        nodes, connections = workflow_data.get("nodes", []), workflow_data.get("connections", [])
+    except (ValueError, TypeError, AttributeError, KeyError, IndexError) as e:
+        raise PlanError([f"workflow_data is not a valid workflow: {type(e).__name__}: {e}"])
+    if not isinstance(nodes, list) or not isinstance(connections, list):
+        raise PlanError(["workflow_data nodes and connections must be lists"])
+    errors = [f"Node {i} has no id" for i, n in enumerate(nodes) if not isinstance(n, dict) or "id" not in n]
+    errors += [
+        f"Node {n['id']}: {field} must be an object" for n in nodes if isinstance(n, dict) and "id" in n
+        for field in ("config", "params") if n.get(field) is not None and not isinstance(n[field], dict)
+    ]
+    errors += [f"Connection {i} is not an object" for i, c in enumerate(connections) if not isinstance(c, dict)]
+    if errors:
+        raise PlanError(errors)
+    return nodes, connections
+
+def _topological_order(node_ids, connections):
+    indegree = {nid: 0 for nid in node_ids}
+    successors = {nid: [] for nid in node_ids}
+    for conn in connections:
+        successors[conn["from"]].append(conn["to"])
+        indegree[conn["to"]] += 1
+    ready = [nid for nid in node_ids if indegree[nid] == 0]
+    order = []
+    while ready:
+        nid = ready.pop(0)
+        order.append(nid)
+        for succ in successors[nid]:
+            indegree[succ] -= 1
+            if indegree[succ] == 0:
+                ready.append(succ)
+    return order
+
+def _branch(conn):
+    """"true", "false" or None for a connection leaving a condition node.
+
+    Resolved the way the canvas draws it: a "True"/"False" label wins over
+    sourceHandle, and condition.value is the fallback when neither is set.
+    """
+    handle = conn.get("sourceHandle")
+    label = str(conn.get("label") or "").lower()
+    if label in ("true", "false"):
+        handle = label
+    if not handle and (conn.get("condition") or {}).get("value"):
+        handle = str(conn["condition"]["value"]).lower()
+    return handle if handle in ("true", "false") else None
+
+def compile_plan(workflow_data, handlers, workflow_id=None, version=None):
+    """Validate a stored workflow and compile it into an immutable ExecutionPlan"""
+    nodes, connections = nodes_and_connections(workflow_data)
+    errors = validate_node_ids(nodes) + validate_connection_targets(nodes, connections)
+    errors += validate_condition_operators(nodes)
+    if not errors:
+        errors += detect_cycles(nodes, connections)
+    if errors:
+        raise PlanError(errors)
+
+    node_ids = [n["id"] for n in nodes]
+    conditions = {n["id"] for n in nodes if n.get("type") == "condition"}
+    outgoing = {nid: {"next": [], "true": [], "false": []} for nid in node_ids}
+    has_incoming = set()
+    for conn in connections:
+        branch = _branch(conn) if conn["from"] in conditions else None
+        outgoing[conn["from"]][branch or "next"].append(conn["to"])
+        has_incoming.add(conn["to"])
+
+    compiled = {}
+    for node in nodes:
+        nid, node_type = node["id"], node.get("type")
+        out = outgoing[nid]
+        condition = None
+        if node_type == "condition":
+            condition = compile_condition((node.get("config") or {}).get("condition") or {})
+        compiled[nid] = PlanNode(
+            id=nid,
+            type=node_type,
+            label=node.get("label", ""),
+            handler=handlers.get(node_type),
+            render=compile_template({"config": node.get("config") or {}, "params": node.get("params") or {}}),
+            condition=condition,
+            # A condition's untagged connections count as its true branch
+            next=() if condition else tuple(out["next"] + out["true"] + out["false"]),
+            on_true=tuple(out["true"] + out["next"]) if condition else (),
+            on_false=tuple(out["false"]) if condition else (),
+            source=MappingProxyType(node),
+        )
+
+    return ExecutionPlan(
+        workflow_id=workflow_id,
+        version=version,
+        order=tuple(_topological_order(node_ids, connections)),
+        entries=tuple(nid for nid in node_ids if nid not in has_incoming),
+        nodes=MappingProxyType(compiled),
+    )
+
+# --- Cache ---
+
+_plans = OrderedDict()  # workflow id -> plan; an entry is stale once updated_at moves on
+_lock = threading.Lock()
+
+def get_plan(workflow, handlers):
+    """Compiled plan for an AdminWorkflow, reused until the workflow's updated_at changes"""
+    version = workflow.updated_at.isoformat() if workflow.updated_at else None
+    with _lock:
+        plan = _plans.get(workflow.id)
+        if plan is not None and plan.version == version:
+            _plans.move_to_end(workflow.id)
+            record_cache("execution_plan", True)
+            return plan
+    record_cache("execution_plan", False)
+
+    with stage("compile_plan", workflow_id=workflow.id):
+        plan = compile_plan(workflow.workflow_data, handlers, workflow_id=workflow.id, version=version)
+    with _lock:
+        _plans[workflow.id] = plan
+        _plans.move_to_end(workflow.id)
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
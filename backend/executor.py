@@ -0,0 +1,157 @@
+import json
+import time
+from datetime import datetime
+
+from database import db
+from execution_plan import get_plan
+from http_runtime import http_runtime
+from metrics import stage
+from models import ExecutionLog
+from rollups import aggregator
+from script_runner import script_pool
+from tool_runtime import invoke_tool
+from tools import available_tools
+
+# node type -> handler(node, rendered, scope); rendered holds the node's
+# config/params with {{templates}} filled in from scope
+NODE_HANDLERS = {}
+
+TOOLS_BY_NAME = {t.name: t for t in available_tools}
+
+class NodeError(Exception):
+    """A node failed in a way the workflow should report"""
+
+def node_handler(*node_types):
+    """Register a function as the handler for the given node types"""
+    def register(fn):
+        for node_type in node_types:
+            NODE_HANDLERS[node_type] = fn
+        return fn
+    return register
+
+@node_handler("webhook", "trigger")
+def run_trigger(node, rendered, scope):
+    # The trigger payload is already in scope as `data`
+    return None
+
+@node_handler("log")
+def run_log(node, rendered, scope):
+    message = rendered["config"].get("message") or node.label
+    print(f"DEBUG: [workflow log] {message}", flush=True)
+    return {"message": message}
+
+@node_handler("integration")
+def run_integration(node, rendered, scope):
+    # Only tasks backed by one of our tools run here; the rest belong to the
+    # platform's integration services
+    tool = TOOLS_BY_NAME.get(node.source.get("task"))
+    if tool is None:
+        return {"skipped": f"Integration task '{node.source.get('task')}' is not available in this service"}
+    params = rendered["params"].get("params", rendered["params"])
+    args = {k: v for k, v in params.items() if k in tool.args}
+    return {"result": invoke_tool(tool, args, idempotency_key=f"{scope['run_id']}:{node.id}")}
+
+@node_handler("script")
+def run_script(node, rendered, scope):
+    # The script source is code, not a template: run it exactly as stored
+    params = node.source.get("params") or {}
+    if not params.get("script"):
+        raise NodeError("Script node has no params.script")
+    timeout = params.get("timeout_seconds")
+    return script_pool.run(params["script"], scope["data"], trigger=scope["trigger"],
+                           owner=scope["workflow_id"], **({"timeout": float(timeout)} if timeout else {}))
+
+@node_handler("http")
+def run_http(node, rendered, scope):
+    config = rendered["config"]
+    if not config.get("url"):
+        raise NodeError("HTTP node has no config.url")
+    timeout = config.get("timeout_seconds") or rendered["params"].get("timeout_seconds")
+    result = http_runtime.request(config.get("method"), config["url"], body=config.get("body"),
+                                  headers=config.get("headers"), timeout=timeout)
+    if not result["ok"]:
+        raise NodeError(f"HTTP {result['status_code']} from {config['url']}")
+    return result
+
+# Executor bookkeeping in scope that node outputs must not replace. `data`
+# is deliberately left out: a script reassigning it transforms the payload.
+RESERVED_SCOPE_KEYS = frozenset(("trigger", "nodes", "run_id", "workflow_id"))
+
+def run_plan(plan, payload, run_id):
+    """Walk a compiled plan from its entry nodes, following the branches taken"""
+    scope = {"data": payload, "trigger": payload, "nodes": {}, "run_id": run_id, "workflow_id": plan.workflow_id}
+    active = set(plan.entries)
+    steps = []
+    status = "success"
+    error = None
+
+    for node_id in plan.order:
+        if node_id not in active:
+            continue
+        node = plan.nodes[node_id]
+        started = time.perf_counter()
+        step = {"id": node.id, "type": node.type, "status": "success"}
+        if node.type == "integration":
+            step["task"] = node.source.get("task")
+        try:
+            if node.condition is not None:
+                taken = node.condition(scope)
+                step["output"] = taken
+                active.update(node.on_true if taken else node.on_false)
+            else:
+                if node.handler is None:
+                    raise NodeError(f"No handler for '{node.type}' nodes")
+                output = node.handler(node, node.render(scope), scope)
+                scope["nodes"][node.id] = output
+                if isinstance(output, dict):
+                    if "skipped" in output:
+                        step["status"] = "skipped"
+                    # Outputs become variables for later templates (e.g. script locals, http data)
+                    scope.update((k, v) for k, v in output.items() if k not in RESERVED_SCOPE_KEYS)
+                step["output"] = output
+                active.update(node.next)
+        except Exception as e:
+            step["status"] = "failed"
+            step["error"] = str(e)
+            if not node.source.get("continue_on_error"):
+                status, error = "failed", f"{node.id} ({node.label}): {e}"
+        step["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        steps.append(step)
+        if error:
+            break
+
+    return {"status": status, "error": error, "steps": steps}
+
+def execute_workflow(workflow, payload, trigger_source="api", trigger_metadata=None, run_id=None):
+    """Run a stored workflow and record it in execution_logs; returns (log, result).
+    Raises PlanError if the stored workflow can't be compiled."""
+    plan = get_plan(workflow, NODE_HANDLERS)
+    started_at = datetime.utcnow()
+    log = ExecutionLog(
+        workflow_id=workflow.id,
+        log_type="workflow",
+        status="running",
+        started_at=started_at,
+        trigger_source=trigger_source,
+        trigger_metadata=json.dumps(trigger_metadata) if trigger_metadata is not None else None,
+    )
+    db.session.add(log)
+    db.session.flush()
+
+    with stage("execute_workflow", workflow_id=workflow.id):
+        result = run_plan(plan, payload, run_id or f"exec-{log.id}")
+
+    completed_at = datetime.utcnow()
+    steps = result["steps"]
+    log.status = result["status"]
+    log.completed_at = completed_at
+    log.execution_time_seconds = int((completed_at - started_at).total_seconds())
+    log.total_tasks = len(steps)
+    log.successful_tasks = sum(1 for s in steps if s["status"] == "success")
+    log.failed_tasks = sum(1 for s in steps if s["status"] == "failed")
+    log.execution_data = json.dumps(result, default=str)
+    log.error_message = result["error"]
+    db.session.commit()
+    # Rollups and execution_count are written in batches by the aggregator
+    aggregator.record(workflow.id, started_at, completed_at, result["status"], steps)
+    return log, result
@@ -0,0 +1,155 @@
+import json
+import operator
+import re
+
+# {{ path }} where path is dotted keys and/or [index] parts: data.items[0].name
+TEMPLATE_PATTERN = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+PATH_PART = re.compile(r"[^.\[\]]+|\[(-?\d+)\]")
+
+# --- Coercion rules ---
+# Comparisons are forgiving because values come from JSON payloads, HTTP
+# bodies and script variables, while right-hand sides are typed by the LLM:
+#   * numbers and numeric strings compare as numbers ("91" > 90)
+#   * booleans compare with "true"/"false" strings, case-insensitively
+#   * anything else compares as text
+#   * a missing value (None) is never gt/lt/gte/lte anything and contains nothing
+
+def to_number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value.strip()) if isinstance(value, str) else None
+    except ValueError:
+        return None
+
+def to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+def _equal(left, right, right_number, right_text):
+    # Before ==, which would make True equal 1 but not "1"
+    if isinstance(left, bool) or isinstance(right, bool):
+        return to_text(left).lower() == right_text.lower()
+    if left == right:
+        return True
+    left_number = to_number(left)
+    if left_number is not None and right_number is not None:
+        return left_number == right_number
+    return to_text(left) == right_text
+
+def _ordered(op):
+    def compare(left, right, right_number, right_text):
+        if left is None or right is None:
+            return False
+        left_number = to_number(left)
+        if left_number is not None and right_number is not None:
+            return op(left_number, right_number)
+        return op(to_text(left), right_text)
+    return compare
+
+def _contains(left, right, right_number, right_text):
+    if left is None:
+        return False
+    if isinstance(left, (list, tuple, set)):
+        return right in left or any(to_text(item) == right_text for item in left)
+    if isinstance(left, dict):
+        return right_text in left
+    return right_text in to_text(left)
+
+COMPARATORS = {
+    "eq": _equal,
+    "ne": lambda *args: not _equal(*args),
+    "gt": _ordered(operator.gt),
+    "lt": _ordered(operator.lt),
+    "gte": _ordered(operator.ge),
+    "lte": _ordered(operator.le),
+    "contains": _contains,
+    "not_contains": lambda *args: not _contains(*args),
+}
+
+# --- Compilation ---
+
+def compile_path(path):
+    """Accessor for `data.items[0].name`; a missing key or index resolves to None"""
+    parts = tuple(
+        int(index) if index else (int(token) if token.isdigit() else token)
+        for token, index in ((m.group(0), m.group(1)) for m in PATH_PART.finditer(path))
+    )
+    if len(parts) == 1:
+        key = parts[0]
+
+        def resolve_one(scope):
+            try:
+                return scope[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return resolve_one
+
+    def resolve(scope):
+        value = scope
+        try:
+            for part in parts:
+                value = value[part]
+        except (KeyError, IndexError, TypeError):
+            return None
+        return value
+    return resolve
+
+def _constant(value):
+    return lambda scope: value
+
+def compile_template(value):
+    """scope -> value for anything in a node's config/params.
+
+    A string that is exactly one {{path}} keeps the referenced value's type;
+    mixed strings are formatted. Values without placeholders come back as-is
+    (shared, so callers must not mutate rendered configs).
+    """
+    if isinstance(value, dict):
+        compiled = {k: compile_template(v) for k, v in value.items()}
+        if not any(getattr(f, "dynamic", False) for f in compiled.values()):
+            return _constant(value)
+        items = tuple(compiled.items())
+        render = lambda scope: {k: f(scope) for k, f in items}
+    elif isinstance(value, list):
+        compiled = tuple(compile_template(v) for v in value)
+        if not any(getattr(f, "dynamic", False) for f in compiled):
+            return _constant(value)
+        render = lambda scope: [f(scope) for f in compiled]
+    elif isinstance(value, str) and "{{" in value:
+        pieces = TEMPLATE_PATTERN.split(value)
+        if len(pieces) == 3 and pieces[0] == "" and pieces[2] == "":
+            render = compile_path(pieces[1])
+        else:
+            # Odd positions are paths, even positions literal text
+            parts = tuple(compile_path(p) if i % 2 else p for i, p in enumerate(pieces) if p or i % 2)
+            render = lambda scope: "".join(p if isinstance(p, str) else to_text(p(scope)) for p in parts)
+    else:
+        return _constant(value)
+    render.dynamic = True
+    return render
+
+def compile_condition(condition):
+    """scope -> bool for a condition node's {"left", "operator", "right"}.
+
+    The right-hand side is usually a literal, so its numeric and text forms
+    are worked out here once instead of on every evaluation.
+    """
+    compare = COMPARATORS[condition.get("operator")]
+    left = compile_template(condition.get("left"))
+    right = compile_template(condition.get("right"))
+    if getattr(right, "dynamic", False):
+        return lambda scope: bool(compare(left(scope), (r := right(scope)), to_number(r), to_text(r)))
+
+    constant = condition.get("right")
+    right_number, right_text = to_number(constant), to_text(constant)
+    return lambda scope: bool(compare(left(scope), constant, right_number, right_text))
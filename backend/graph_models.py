@@ -1,24 +1,84 @@
 from typing import List, Dict, Optional, Any, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-class NodeData(BaseModel):
-    label: str = Field(description="Display label of the node")
-    nodeType: Literal['trigger', 'action', 'condition', 'utility'] = Field(description="Category of the node")
-    actionType: Optional[str] = Field(description="Specific action type e.g., 'http_request', 'run_script'")
-    config: Dict[str, Any] = Field(default_factory=dict, description="Configuration parameters for the node")
+# These models mirror the company export format consumed by the frontend
+# (workflows[].workflow_data.nodes/connections). They are sent to Bedrock as the
+# tool schema for structured output and used to validate the model's answer.
+
+NodeType = Literal['webhook', 'trigger', 'condition', 'integration', 'log', 'script', 'http']
+
+class Condition(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
+    format: Optional[str] = Field(default="simple", description="Always 'simple'")
+    type: Optional[str] = Field(default="simple", description="Always 'simple'")
+    left: Any = Field(description="Left operand, usually a '{{variable}}' placeholder e.g. '{{data.status}}'")
+    operator: str = Field(description="One of: eq, ne, gt, lt, gte, lte, contains, not_contains")
+    right: Any = Field(description="Right operand to compare against")
+
+class NodeConfig(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
+    accept_json_only: Optional[bool] = Field(default=None, description="webhook nodes: always true")
+    condition: Optional[Condition] = Field(default=None, description="condition nodes: the comparison to evaluate")
+    true_nodes: Optional[List[str]] = Field(default=None, description="condition nodes: leave empty, branches are expressed as connections")
+    false_nodes: Optional[List[str]] = Field(default=None, description="condition nodes: leave empty, branches are expressed as connections")
+    message: Optional[str] = Field(default=None, description="log nodes: message to log")
+    url: Optional[str] = Field(default=None, description="http nodes: request URL")
+    method: Optional[Literal['GET', 'POST', 'PUT', 'DELETE']] = Field(default=None, description="http nodes: HTTP method")
+    body: Optional[Dict[str, Any]] = Field(default=None, description="http nodes: JSON request body")
 
 class WorkflowNode(BaseModel):
-    id: str = Field(description="Unique string ID of the node")
-    type: str = Field(description="React Flow node type (usually 'default' or custom)")
-    data: NodeData
-    position: Dict[str, int] = Field(default={"x": 0, "y": 0}, description="Visual position (calculated later)")
-
-class WorkflowEdge(BaseModel):
-    id: str = Field(description="Unique string ID of the edge")
-    source: str = Field(description="Source Node ID")
-    target: str = Field(description="Target Node ID")
-    label: Optional[str] = Field(description="Label for the edge (e.g., 'True', 'False', 'On Success')")
-
-class WorkflowGraph(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
+    id: str = Field(description="Unique node ID: node-1, node-2, ...")
+    type: NodeType = Field(description="Node type")
+    label: str = Field(description="Descriptive, human readable label e.g. 'Check CPU'")
+    nodeNumber: int = Field(description="1-based position of the node, matches the number in its id")
+    config: Optional[NodeConfig] = Field(default=None, description="Type specific configuration (webhook, condition, log, http)")
+    params: Optional[Dict[str, Any]] = Field(default=None, description="integration nodes: task parameters; script nodes: {'script': 'python code'}")
+    integration_id: Optional[int] = Field(default=None, description="integration nodes: ID from the integration registry")
+    task: Optional[str] = Field(default=None, description="integration nodes: task name from the registry")
+    task_display_name: Optional[str] = Field(default=None, description="integration nodes: display name of the task")
+    integration_type_name: Optional[str] = Field(default=None, description="integration nodes: type_name from the registry")
+    continue_on_error: Optional[bool] = Field(default=None, description="integration nodes: false")
+    run_all_tasks: Optional[bool] = Field(default=None, description="integration nodes: false")
+    position: Optional[Dict[str, float]] = Field(default=None, description="Visual position, leave unset (calculated later)")
+
+class WorkflowConnection(BaseModel):
+    model_config = ConfigDict(extra='allow', populate_by_name=True)
+
+    from_: str = Field(alias='from', description="Source node ID")
+    to: str = Field(description="Target node ID")
+    sourceHandle: Optional[Literal['true', 'false']] = Field(default=None, description="Only for connections leaving a condition node")
+
+class WorkflowData(BaseModel):
     nodes: List[WorkflowNode]
-    edges: List[WorkflowEdge]
+    connections: List[WorkflowConnection]
+
+class Workflow(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
+    name: str = Field(description="Mandatory workflow name")
+    description: str = Field(description="Mandatory workflow description")
+    workflow_data: WorkflowData
+    is_active: bool = Field(default=True)
+
+class WorkflowExport(BaseModel):
+    """Emit the complete automation workflow designed for the user's request."""
+    model_config = ConfigDict(extra='allow')
+
+    version: str = Field(default="1.0", description="Always '1.0'")
+    exported_at: Optional[str] = Field(default=None, description="ISO-8601 timestamp")
+    workflows: List[Workflow] = Field(description="Exactly one workflow")
+    workflow_comments: Dict[str, Any] = Field(default_factory=dict)
+
+# Tool schema handed to the model and the compiled pydantic-core validator used on
+# its answer. Both are built once at import time.
+WORKFLOW_EXPORT_SCHEMA = WorkflowExport.model_json_schema(by_alias=True)
+WORKFLOW_EXPORT_VALIDATOR = WorkflowExport.__pydantic_validator__
+
+def parse_workflow_export(data):
+    """Validate a tool-call payload and return it as a plain export dict"""
+    export = WORKFLOW_EXPORT_VALIDATOR.validate_python(data)
+    return export.model_dump(by_alias=True, exclude_none=True)
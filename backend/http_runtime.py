@@ -0,0 +1,162 @@
+import json
+import os
+import random
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+
+from metrics import LATENCY_BUCKETS
+
+HTTP_MAX_PER_HOST = int(os.environ.get("HTTP_MAX_PER_HOST", "16"))  # in-flight requests and pooled connections
+HTTP_MAX_HOSTS = int(os.environ.get("HTTP_MAX_HOSTS", "64"))  # hosts with a pool kept open
+HTTP_DEFAULT_TIMEOUT = float(os.environ.get("HTTP_DEFAULT_TIMEOUT", "30"))  # when the node has no timeout_seconds
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+HTTP_MAX_BODY_BYTES = int(os.environ.get("HTTP_MAX_BODY_BYTES", str(1 << 20)))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+CHUNK_SIZE = 64 * 1024
+
+HTTP_DURATION = Histogram("http_node_duration_seconds", "HTTP node requests including retries", ["host"], buckets=LATENCY_BUCKETS)
+HTTP_OUTCOMES = Counter("http_node_requests_total", "HTTP node attempts by outcome", ["host", "outcome"])
+
+class HttpNodeError(Exception):
+    """The request could not be completed within the node's budget"""
+
+def make_session(pool_maxsize=HTTP_MAX_PER_HOST, pool_connections=HTTP_MAX_HOSTS):
+    """Keep-alive session; urllib3 keeps one pool of up to `pool_maxsize` connections per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Shared across workflows, so never carry cookies from one run into another
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+class HttpRuntime:
+    """Pooled HTTP client for http nodes with per-host concurrency caps.
+
+    Calls are synchronous (workflow runs are threads); the pools make every
+    call after the first to a host reuse a warm TCP/TLS connection.
+    """
+
+    def __init__(self, max_per_host=HTTP_MAX_PER_HOST, max_body_bytes=HTTP_MAX_BODY_BYTES, max_retries=HTTP_MAX_RETRIES):
+        self.session = make_session(pool_maxsize=max_per_host)
+        self.max_per_host = max_per_host
+        self.max_body_bytes = max_body_bytes
+        self.max_retries = max_retries
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def _slot(self, host):
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self.slots[host]
+
+    def _read_body(self, response, deadline, budget):
+        """Stream the body, keeping at most max_body_bytes; returns (bytes, truncated).
+
+        The read timeout applies per socket read, so a server trickling bytes
+        would never trip it; the node's deadline is checked between reads.
+        read1 returns whatever has arrived instead of waiting for a full chunk.
+        """
+        chunks, size = [], 0
+        while True:
+            if time.monotonic() > deadline:
+                raise HttpNodeError(f"{response.request.method} {response.url} exceeded {budget:g}s reading the body")
+            chunk = response.raw.read1(CHUNK_SIZE, decode_content=True)
+            if not chunk:
+                return b"".join(chunks), False
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return b"".join(chunks)[:self.max_body_bytes], True
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """One http node call: retried (idempotent methods only) while the timeout budget lasts"""
+        method = (method or "GET").upper()
+        budget = float(timeout or HTTP_DEFAULT_TIMEOUT)
+        deadline = time.monotonic() + budget
+        host = urlsplit(url).netloc
+        if not host:
+            raise HttpNodeError(f"Invalid URL: {url!r}")
+
+        kwargs = {"headers": headers or None}
+        if isinstance(body, (dict, list)):
+            if body and method not in ("GET", "HEAD"):
+                kwargs["json"] = body
+        elif body:
+            kwargs["data"] = body if isinstance(body, (str, bytes)) else str(body)
+
+        started = time.perf_counter()
+        slot = self._slot(host)
+        if not slot.acquire(timeout=budget):
+            HTTP_OUTCOMES.labels(host, "saturated").inc()
+            raise HttpNodeError(f"Too many concurrent requests to {host}")
+        try:
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise HttpNodeError(f"{method} {url} exceeded {budget:g}s")
+                try:
+                    response = self.session.request(
+                        method, url, stream=True,
+                        timeout=(min(HTTP_CONNECT_TIMEOUT, remaining), remaining), **kwargs
+                    )
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    HTTP_OUTCOMES.labels(host, "connection_error").inc()
+                    if not self._retry(method, attempt, deadline):
+                        raise HttpNodeError(f"{method} {url} failed: {e}") from e
+                    attempt += 1
+                    continue
+
+                with response:
+                    if response.status_code in RETRY_STATUSES and self._retry(method, attempt, deadline):
+                        HTTP_OUTCOMES.labels(host, "retried").inc()
+                        attempt += 1
+                        continue
+                    content, truncated = self._read_body(response, deadline, budget)
+                    HTTP_OUTCOMES.labels(host, str(response.status_code // 100) + "xx").inc()
+                    return self._result(response, content, truncated, started)
+        finally:
+            slot.release()
+            HTTP_DURATION.labels(host).observe(time.perf_counter() - started)
+
+    def _retry(self, method, attempt, deadline):
+        """Back off and return True if another attempt is allowed and fits in the budget"""
+        if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+            return False
+        delay = random.uniform(0, 0.1 * 2 ** attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _result(self, response, content, truncated, started):
+        content_type = response.headers.get("Content-Type", "")
+        data = None
+        if content and not truncated and "json" in content_type:
+            try:
+                data = json.loads(content)
+            except ValueError:
+                pass
+        if data is None and content:
+            data = content.decode(response.encoding or "utf-8", "replace")
+        return {
+            "status_code": response.status_code,
+            "ok": response.ok,
+            "data": data,
+            "content_type": content_type,
+            "truncated": truncated,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+http_runtime = HttpRuntime()
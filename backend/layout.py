@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+from metrics import stage, record_cache
+
+# Same footprint and spacing WorkflowCanvas.jsx hands to dagre (rankdir LR),
+# so server and browser layouts look alike.
+NODE_SIZE = {"diamond": (300, 150), "box": (250, 120)}
+RANK_SEP = 200
+NODE_SEP = 100
+ORDERING_SWEEPS = 4
+
+LAYOUT_CACHE_SIZE = int(os.environ.get("LAYOUT_CACHE_SIZE", "512"))
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _size(node):
+    return NODE_SIZE["diamond" if node.get("type") in ("condition", "control") else "box"]
+
+def graph_hash(nodes, connections):
+    """Hash of the parts of a graph that influence its layout"""
+    key = json.dumps(
+        [
+            [(n["id"], n.get("type")) for n in nodes],
+            [(c.get("from"), c.get("to"), c.get("sourceHandle")) for c in connections],
+        ],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def _assign_ranks(node_ids, successors, predecessors):
+    """Longest-path layering; nodes left over by a cycle go after everything else"""
+    indegree = {nid: len(predecessors[nid]) for nid in node_ids}
+    rank = {nid: 0 for nid in node_ids}
+    queue = [nid for nid in node_ids if indegree[nid] == 0]
+    done = 0
+    while done < len(queue):
+        nid = queue[done]
+        done += 1
+        for succ in successors[nid]:
+            rank[succ] = max(rank[succ], rank[nid] + 1)
+            indegree[succ] -= 1
+            if indegree[succ] == 0:
+                queue.append(succ)
+    if done < len(node_ids):
+        last = max(rank.values(), default=0) + 1
+        for nid in node_ids:
+            if indegree[nid] > 0:
+                rank[nid] = last
+    return rank
+
+def _order_layers(node_ids, edges, rank):
+    """Split long edges with virtual nodes and reduce crossings with barycenter sweeps"""
+    layers = defaultdict(list)
+    for nid in node_ids:
+        layers[rank[nid]].append(nid)
+
+    up = defaultdict(list)    # node -> neighbours in the previous layer
+    down = defaultdict(list)  # node -> neighbours in the next layer
+    virtual = 0
+    for src, dst in edges:
+        if rank[dst] <= rank[src]:
+            continue  # back edge from a cycle, not worth routing
+        prev = src
+        for r in range(rank[src] + 1, rank[dst]):
+            vid = ("v", virtual)
+            virtual += 1
+            rank[vid] = r
+            layers[r].append(vid)
+            down[prev].append(vid)
+            up[vid].append(prev)
+            prev = vid
+        down[prev].append(dst)
+        up[dst].append(prev)
+
+    depth = max(layers) + 1 if layers else 0
+    ordered = [layers[r] for r in range(depth)]
+    position = {nid: i for layer in ordered for i, nid in enumerate(layer)}
+
+    def sweep(layer_range, neighbours):
+        for r in layer_range:
+            layer = ordered[r]
+            def barycenter(nid):
+                ns = neighbours[nid]
+                return sum(position[n] for n in ns) / len(ns) if ns else position[nid]
+            layer.sort(key=barycenter)
+            for i, nid in enumerate(layer):
+                position[nid] = i
+
+    for _ in range(ORDERING_SWEEPS):
+        sweep(range(1, depth), up)
+        sweep(range(depth - 2, -1, -1), down)
+    return ordered
+
+def compute_layout(nodes, connections):
+    """Top-left positions keyed by node id for a left-to-right layered layout"""
+    node_ids = [n["id"] for n in nodes]
+    by_id = {n["id"]: n for n in nodes}
+    successors = {nid: [] for nid in node_ids}
+    predecessors = {nid: [] for nid in node_ids}
+    edges = []
+    for conn in connections:
+        src, dst = conn.get("from"), conn.get("to")
+        if src in successors and dst in successors and src != dst:
+            successors[src].append(dst)
+            predecessors[dst].append(src)
+            edges.append((src, dst))
+
+    rank = _assign_ranks(node_ids, successors, predecessors)
+    ordered = _order_layers(node_ids, edges, rank)
+
+    positions = {}
+    x = 0
+    for layer in ordered:
+        sizes = [_size(by_id[nid]) if nid in by_id else (0, 0) for nid in layer]
+        width = max((w for w, _ in sizes), default=0)
+        total_height = sum(h for _, h in sizes) + NODE_SEP * (len(layer) - 1)
+        y = -total_height / 2
+        for nid, (w, h) in zip(layer, sizes):
+            if nid in by_id:
+                # Centre within the rank column, like dagre does
+                positions[nid] = {"x": x + (width - w) / 2, "y": y}
+            y += h + NODE_SEP
+        x += width + RANK_SEP
+    return positions
+
+def cached_layout(nodes, connections):
+    key = graph_hash(nodes, connections)
+    with _cache_lock:
+        positions = _cache.get(key)
+        if positions is not None:
+            _cache.move_to_end(key)
+    record_cache("layout", positions is not None)
+    if positions is None:
+        positions = compute_layout(nodes, connections)
+        with _cache_lock:
+            _cache[key] = positions
+            while len(_cache) > LAYOUT_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return positions
+
+def apply_layout(graph_data):
+    """Fill `position` on every node of every workflow in an export, in place"""
+    with stage("layout"):
+        for wf in graph_data.get("workflows", []):
+            workflow_data = wf.get("workflow_data", {})
+            nodes = workflow_data.get("nodes", [])
+            positions = cached_layout(nodes, workflow_data.get("connections", []))
+            for node in nodes:
+                if node["id"] in positions:
+                    node["position"] = dict(positions[node["id"]])
+    return graph_data
@@ -0,0 +1,234 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from langchain_aws import ChatBedrock
+from prometheus_client import Counter, Gauge, Histogram
+
+from metrics import LATENCY_BUCKETS
+
+# --- Configuration (sized to the account's Bedrock quota) ---
+BEDROCK_REGION = os.environ.get("AWS_DEFAULT_REGION", "ap-south-1")
+BEDROCK_ENDPOINT_URL = os.environ.get("BEDROCK_ENDPOINT_URL")  # e.g. loadtest.mock_bedrock
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", "64"))
+BEDROCK_CONNECT_TIMEOUT = float(os.environ.get("BEDROCK_CONNECT_TIMEOUT", "5"))
+BEDROCK_READ_TIMEOUT = float(os.environ.get("BEDROCK_READ_TIMEOUT", "120"))
+BEDROCK_REQUESTS_PER_MINUTE = float(os.environ.get("BEDROCK_REQUESTS_PER_MINUTE", "200"))
+BEDROCK_TOKENS_PER_MINUTE = float(os.environ.get("BEDROCK_TOKENS_PER_MINUTE", "400000"))  # 0 disables
+LLM_INITIAL_CONCURRENCY = float(os.environ.get("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_MIN_CONCURRENCY = float(os.environ.get("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = float(os.environ.get("LLM_MAX_CONCURRENCY", "48"))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "60"))
+LLM_THROTTLE_RETRIES = int(os.environ.get("LLM_THROTTLE_RETRIES", "4"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+CONCURRENCY_LIMIT = Gauge("llm_gateway_concurrency_limit", "Current AIMD concurrency limit")
+IN_FLIGHT = Gauge("llm_gateway_in_flight", "LLM calls currently in flight")
+QUEUE_DEPTH = Gauge("llm_gateway_queue_depth", "Callers waiting for an LLM slot")
+QUEUE_WAIT = Histogram("llm_gateway_queue_wait_seconds", "Time spent waiting for a slot and rate tokens", ["priority"], buckets=LATENCY_BUCKETS)
+THROTTLES = Counter("llm_gateway_throttles_total", "Throttling responses from Bedrock", ["model"])
+
+class GatewayTimeout(Exception):
+    """No LLM slot became available within the queue timeout"""
+
+class Throttled(Exception):
+    """Bedrock kept throttling after the gateway's own retries"""
+
+def is_throttle(error):
+    """True if `error` (or anything it was raised from) is a Bedrock throttling response"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in THROTTLE_CODES:
+            return True
+        if any(code in str(error) for code in THROTTLE_CODES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def make_bedrock_client():
+    """bedrock-runtime client with a pool sized for our concurrency and botocore retries off.
+
+    Retries are owned by the gateway so that throttling backs off globally
+    instead of every thread retrying on its own schedule.
+    """
+    return boto3.client(
+        "bedrock-runtime",
+        region_name=BEDROCK_REGION,
+        endpoint_url=BEDROCK_ENDPOINT_URL,
+        config=Config(
+            max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+            connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+            read_timeout=BEDROCK_READ_TIMEOUT,
+            tcp_keepalive=True,
+            retries={"mode": "standard", "total_max_attempts": 1},
+        ),
+    )
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`; the level may go negative to repay debt"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        if self.rate:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+class LLMGateway:
+    """Admission control in front of Bedrock.
+
+    Callers queue by priority (lower value first) and are admitted while the
+    number of calls in flight is below an AIMD limit and the request and
+    token buckets allow it. Successes grow the limit by roughly one per
+    round trip; a throttle halves it (at most once per cooldown) and the call
+    is retried from the queue after a jittered backoff.
+    """
+
+    def __init__(self, requests_per_minute=BEDROCK_REQUESTS_PER_MINUTE, tokens_per_minute=BEDROCK_TOKENS_PER_MINUTE,
+                 initial_limit=LLM_INITIAL_CONCURRENCY, min_limit=LLM_MIN_CONCURRENCY, max_limit=LLM_MAX_CONCURRENCY,
+                 throttle_retries=LLM_THROTTLE_RETRIES, queue_timeout=LLM_QUEUE_TIMEOUT, decrease_cooldown=1.0):
+        # Allow a burst of ~5 seconds worth of quota
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute / 12.0))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, max(1.0, tokens_per_minute / 12.0))
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.throttle_retries = throttle_retries
+        self.queue_timeout = queue_timeout
+        self.decrease_cooldown = decrease_cooldown
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.cond = threading.Condition()
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    def _acquire(self, priority, tokens):
+        entry = (priority, next(self.sequence))
+        deadline = time.monotonic() + self.queue_timeout
+        started = time.perf_counter()
+        with self.cond:
+            heapq.heappush(self.waiters, entry)
+            QUEUE_DEPTH.set(len(self.waiters))
+            try:
+                while True:
+                    wait = None
+                    if self.waiters[0] == entry and self.in_flight < int(self.limit):
+                        wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+                        if wait == 0.0:
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise GatewayTimeout(f"No LLM capacity within {self.queue_timeout:.0f}s")
+                    self.cond.wait(min(remaining, wait) if wait else remaining)
+            except BaseException:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+                QUEUE_DEPTH.set(len(self.waiters))
+                self.cond.notify_all()
+                raise
+            heapq.heappop(self.waiters)
+            self.request_bucket.take(1)
+            self.token_bucket.take(tokens)
+            self.in_flight += 1
+            QUEUE_DEPTH.set(len(self.waiters))
+            IN_FLIGHT.set(self.in_flight)
+            self.cond.notify_all()
+        QUEUE_WAIT.labels(str(priority)).observe(time.perf_counter() - started)
+
+    def _release(self, throttled=False, success=False, token_adjustment=0):
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self.last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.last_decrease = now
+            elif success:
+                self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+            if token_adjustment:
+                self.token_bucket.take(token_adjustment)
+            CONCURRENCY_LIMIT.set(self.limit)
+            IN_FLIGHT.set(self.in_flight)
+            self.cond.notify_all()
+
+    def invoke(self, runnable, inputs, priority=PRIORITY_INTERACTIVE, model="unknown", estimated_tokens=1000):
+        """Run `runnable.invoke(inputs)` under admission control, retrying throttles with backoff"""
+        for attempt in range(self.throttle_retries + 1):
+            self._acquire(priority, estimated_tokens)
+            try:
+                response = runnable.invoke(inputs)
+            except Exception as e:
+                throttled = is_throttle(e)
+                self._release(throttled=throttled)
+                if not throttled:
+                    raise
+                THROTTLES.labels(model).inc()
+                if attempt == self.throttle_retries:
+                    raise Throttled(f"Bedrock throttled {model} {attempt + 1} times") from e
+                # Full jitter keeps retries from synchronising into a storm
+                time.sleep(random.uniform(0, min(20.0, 0.5 * 2 ** attempt)))
+                continue
+            used = _used_tokens(response)
+            self._release(success=True, token_adjustment=used - estimated_tokens if used else 0)
+            return response
+
+def _used_tokens(response):
+    raw = response.get("raw") if isinstance(response, dict) else response
+    usage = getattr(raw, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0) or 0
+
+def estimate_tokens(*texts, max_tokens=0):
+    """Rough token estimate (~4 chars/token) used to reserve TPM quota before a call"""
+    return sum(len(t) for t in texts) // 4 + max_tokens
+
+# --- Shared process-wide instances ---
+bedrock_client = make_bedrock_client()
+gateway = LLMGateway()
+
+_models = {}
+_models_lock = threading.Lock()
+
+def chat_model(model_id, max_tokens, temperature=0.4, top_p=0.9):
+    """ChatBedrock bound to the shared pooled client, one instance per (model, max_tokens)"""
+    key = (model_id, max_tokens, temperature, top_p)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = ChatBedrock(
+                model_id=model_id,
+                model_kwargs={"temperature": temperature, "top_p": top_p},
+                max_tokens=max_tokens,
+                region_name=BEDROCK_REGION,
+                endpoint_url=BEDROCK_ENDPOINT_URL,
+                client=bedrock_client,
+            )
+        return _models[key]
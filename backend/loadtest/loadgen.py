@@ -0,0 +1,190 @@
+"""Replay a prompt corpus against the HTTP API and report throughput and latency.
+
+Closed loop (N workers, each sends its next request as soon as the last returns):
+
+    python -m loadtest.loadgen --concurrency 16 --duration 60
+
+Open loop (fixed arrival rate, independent of how fast the server answers):
+
+    python -m loadtest.loadgen --rate 5 --duration 60
+
+In open-loop mode latency is measured from each request's scheduled start, so
+time spent queueing behind a saturated server is included (no coordinated
+omission). --body is a JSON template; "$PROMPT" is replaced per request, which
+lets the same tool drive other endpoints such as webhook receivers.
+
+Start the backend with SEMANTIC_CACHE_ENABLED=false to load the planner
+itself: otherwise every prompt after the first pass over the corpus is
+answered from the semantic cache without reaching the model.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.run import percentile
+
+DEFAULT_PROMPTS = os.path.join(os.path.dirname(__file__), "prompts.txt")
+DEFAULT_BODY = '{"prompt": "$PROMPT"}'
+
+_local = threading.local()
+
+def session():
+    """One keep-alive session per worker thread"""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def load_prompts(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def render_body(template, prompt):
+    # json.dumps()[1:-1] escapes the prompt for use inside a JSON string literal
+    return template.replace("$PROMPT", json.dumps(prompt)[1:-1])
+
+def classify(response):
+    """'ok', 'plan_error' (200 without a graph) or 'http_<status>'"""
+    if response.status_code >= 400:
+        return f"http_{response.status_code}"
+    try:
+        payload = response.json()
+    except ValueError:
+        return "ok"
+    results = payload.get("results") if isinstance(payload, dict) else None
+    if isinstance(results, dict) and "graph" in results:
+        if results.get("validation_errors") or results.get("json_errors"):
+            return "plan_error"
+        return "ok"
+    if isinstance(results, dict):
+        return "plan_error"
+    return "ok"
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.outcomes = Counter()
+
+    def record(self, latency, outcome):
+        with self.lock:
+            self.latencies.append(latency)
+            self.outcomes[outcome] += 1
+
+def send(args, prompt, recorder, scheduled_at=None):
+    start = time.perf_counter()
+    try:
+        response = session().post(
+            args.url.rstrip("/") + args.endpoint,
+            data=render_body(args.body, prompt).encode(),
+            headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"},
+            timeout=args.timeout,
+        )
+        outcome = classify(response)
+    except requests.Timeout:
+        outcome = "timeout"
+    except requests.RequestException as e:
+        outcome = f"transport_{type(e).__name__}"
+    end = time.perf_counter()
+    recorder.record(end - (scheduled_at if scheduled_at is not None else start), outcome)
+
+def run_closed_loop(args, prompts, recorder):
+    deadline = time.perf_counter() + args.duration
+    counter = iter(range(10 ** 12))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter)
+            if (args.requests and i >= args.requests) or time.perf_counter() >= deadline:
+                return
+            send(args, prompts[i % len(prompts)], recorder)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def run_open_loop(args, prompts, recorder):
+    total = args.requests or int(args.rate * args.duration)
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, args, prompts[i % len(prompts)], recorder, scheduled)
+
+def summarize(recorder, elapsed):
+    latencies = recorder.latencies
+    total = len(latencies)
+    ok = recorder.outcomes.get("ok", 0)
+    report = {
+        "requests": total,
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "goodput_rps": ok / elapsed if elapsed else 0.0,
+        "error_rate": (total - ok) / total if total else 0.0,
+        "outcomes": dict(recorder.outcomes),
+    }
+    if latencies:
+        report["latency_s"] = {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+        }
+    return report
+
+def print_report(report):
+    print(f"requests      {report['requests']} in {report['elapsed_s']:.1f}s")
+    print(f"throughput    {report['throughput_rps']:.2f} req/s (goodput {report['goodput_rps']:.2f} req/s)")
+    print(f"error rate    {report['error_rate']:.2%}")
+    if "latency_s" in report:
+        lat = report["latency_s"]
+        print(f"latency       p50={lat['p50']:.3f}s p90={lat['p90']:.3f}s p99={lat['p99']:.3f}s max={lat['max']:.3f}s")
+    for outcome, count in sorted(report["outcomes"].items()):
+        print(f"  {outcome:<24} {count}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--endpoint", default="/api/run_workflow")
+    parser.add_argument("--prompts", default=DEFAULT_PROMPTS, help="One prompt per line")
+    parser.add_argument("--body", default=DEFAULT_BODY, help="JSON request template, $PROMPT is substituted")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers")
+    mode.add_argument("--rate", type=float, help="Open-loop arrival rate (requests/second)")
+    parser.add_argument("--max-workers", type=int, default=256, help="Open-loop in-flight cap")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = use --duration)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    prompts = load_prompts(args.prompts)
+    recorder = Recorder()
+    started = time.perf_counter()
+    if args.rate:
+        run_open_loop(args, prompts, recorder)
+    else:
+        run_closed_loop(args, prompts, recorder)
+    report = summarize(recorder, time.perf_counter() - started)
+    report["mode"] = {"rate": args.rate} if args.rate else {"concurrency": args.concurrency}
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Local stand-in for the Bedrock runtime API.
+
+Answers Converse/InvokeModel calls with recorded WorkflowExport tool calls
+(benchmarks/recordings) after a configurable delay, and throttles a share of
+requests the way Bedrock does (HTTP 429 + ThrottlingException). Point the
+backend at it with:
+
+    python -m loadtest.mock_bedrock --port 8700 --latency-ms 2500 --jitter-ms 800 --throttle-rate 0.05
+    BEDROCK_ENDPOINT_URL=http://localhost:8700 AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test python app.py
+
+GET /stats returns request/throttle counters.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import load_recordings
+
+ROUTE = re.compile(r"^/model/(?P<model>[^/]+)/(?P<action>converse|invoke)$")
+
+class MockBedrock:
+    def __init__(self, recordings, latency_ms, jitter_ms, throttle_rate, max_in_flight, seed=None):
+        self.recordings = itertools.cycle(recordings)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.max_in_flight = max_in_flight
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0}
+
+    def admit(self):
+        """Reserve an in-flight slot, or return False to throttle this request"""
+        with self.lock:
+            self.stats["requests"] += 1
+            over_quota = self.max_in_flight and self.in_flight >= self.max_in_flight
+            if over_quota or self.rng.random() < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.stats["ok"] += 1
+
+    def delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+            recording = next(self.recordings)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000.0)
+        return recording
+
+    def respond(self, request_body, recording):
+        tools = (request_body.get("toolConfig") or {}).get("tools") or []
+        tool_name = tools[0]["toolSpec"]["name"] if tools else "WorkflowExport"
+        usage = recording.get("usage", {})
+        return {
+            "output": {"message": {"role": "assistant", "content": [{
+                "toolUse": {"toolUseId": f"tooluse_{uuid.uuid4().hex[:20]}", "name": tool_name, "input": recording["parsed"]},
+            }]}},
+            "stopReason": "tool_use",
+            "usage": {
+                "inputTokens": usage.get("input_tokens", 0),
+                "outputTokens": usage.get("output_tokens", 0),
+                "totalTokens": usage.get("input_tokens", 0) + usage.get("output_tokens", 0),
+            },
+            "metrics": {"latencyMs": self.latency_ms},
+        }
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("x-amzn-RequestId", str(uuid.uuid4()))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with mock.lock:
+                    self.send_json(200, dict(mock.stats, in_flight=mock.in_flight))
+            else:
+                self.send_json(404, {"message": "Not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            if not ROUTE.match(self.path):
+                self.send_json(404, {"message": f"Unknown route {self.path}"})
+                return
+            if not mock.admit():
+                self.send_json(
+                    429,
+                    {"message": "Too many requests, please wait before trying again."},
+                    {"x-amzn-ErrorType": "ThrottlingException"},
+                )
+                return
+            try:
+                recording = mock.delay()
+                self.send_json(200, mock.respond(json.loads(raw or b"{}"), recording))
+            finally:
+                mock.release()
+
+    return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency-ms", type=float, default=2000.0, help="Mean model latency")
+    parser.add_argument("--jitter-ms", type=float, default=500.0, help="Uniform +/- jitter around the mean")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Throttle everything above this many concurrent calls (0 = unlimited)")
+    parser.add_argument("--recordings", help="Recorded planner responses (JSON list)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    mock = MockBedrock(load_recordings(args.recordings), args.latency_ms, args.jitter_ms,
+                       args.throttle_rate, args.max_in_flight, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mock))
+    server.daemon_threads = True
+    print(f"Mock Bedrock listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
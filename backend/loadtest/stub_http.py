@@ -0,0 +1,119 @@
+"""Local stub of the internal APIs that http nodes call.
+
+    python -m loadtest.stub_http --port 8720
+
+GET|POST /json?size=N&delay_ms=M   JSON object with N items after M ms
+GET /bytes?n=N                     N bytes of text (for body cap checks)
+GET /trickle?n=N&interval_ms=M     N bytes, one every M ms (for total timeout checks)
+GET /status/<code>                 empty response with that status
+GET /flaky?every=K                 503 except on every K-th call
+GET /stats                         request and connection counters
+
+Connections are kept alive (HTTP/1.1), so the counters show how well the
+client reuses them.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, StubHandler)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "connections": 0}
+        self.flaky_calls = 0
+
+    def handle_error(self, request, client_address):
+        # Clients hang up early on purpose (timeouts, body caps)
+        pass
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+            return self.stats[key]
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every request on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        self.server.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/json":
+            time.sleep(int(query.get("delay_ms", 0)) / 1000.0)
+            size = int(query.get("size", 1))
+            body = {"status": "ok", "usage": 91, "items": [{"id": i, "value": f"item-{i}"} for i in range(size)]}
+            return self._send(200, json.dumps(body).encode())
+        if url.path == "/bytes":
+            return self._send(200, b"x" * int(query.get("n", 0)), "text/plain")
+        if url.path == "/trickle":
+            n, interval = int(query.get("n", 10)), int(query.get("interval_ms", 100)) / 1000.0
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(n))
+            self.end_headers()
+            for _ in range(n):
+                self.wfile.write(b"x")
+                self.wfile.flush()
+                time.sleep(interval)
+            return
+        if url.path.startswith("/status/"):
+            return self._send(int(url.path.rsplit("/", 1)[1]))
+        if url.path == "/flaky":
+            with self.server.lock:
+                self.server.flaky_calls += 1
+                ok = self.server.flaky_calls % int(query.get("every", 2)) == 0
+            return self._send(200, b'{"status":"ok"}') if ok else self._send(503)
+        if url.path == "/stats":
+            with self.server.lock:
+                return self._send(200, json.dumps(self.server.stats).encode())
+        return self._send(404)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _route
+
+def start(port=0):
+    """Run a stub server on a background thread; returns (server, base_url)"""
+    server = StubServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8720)
+    args = parser.parse_args()
+    server = StubServer((args.host, args.port))
+    print(f"Stub HTTP API on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from opentelemetry import trace
+
+# Spans go through the OpenTelemetry API; they are no-ops until an SDK/exporter
+# is configured (e.g. via opentelemetry-instrument), so the hot path stays cheap.
+tracer = trace.get_tracer("workflow_agentic")
+
+# LLM calls take seconds, validators take microseconds; one bucket set covers both.
+LATENCY_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+STAGE_LATENCY = Histogram(
+    "workflow_stage_duration_seconds",
+    "Time spent in each planning pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "workflow_stage_errors_total",
+    "Exceptions raised inside a pipeline stage",
+    ["stage"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "End to end HTTP request latency",
+    ["endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_ATTEMPTS = Counter(
+    "llm_attempts_total",
+    "LLM invocations, one per tenacity attempt",
+    ["model", "outcome"],
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "LLM attempts that failed and were scheduled for a retry",
+    ["model"],
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the model (input, output, cache_read, cache_creation)",
+    ["model", "kind"],
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"],
+)
+VALIDATION_FAILURES = Counter(
+    "workflow_validation_failures_total",
+    "Planner responses rejected, by phase",
+    ["phase"],
+)
+
+@contextmanager
+def stage(name, **attributes):
+    """Time a pipeline stage into the stage histogram and wrap it in a span"""
+    start = time.perf_counter()
+    with tracer.start_as_current_span(name, attributes=attributes) as span:
+        try:
+            yield span
+        except Exception as e:
+            STAGE_ERRORS.labels(name).inc()
+            span.record_exception(e)
+            raise
+        finally:
+            STAGE_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+def record_tokens(model, message):
+    """Count the usage_metadata of an AIMessage, if the provider returned one"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if not usage:
+        return
+    LLM_TOKENS.labels(model, "input").inc(usage.get("input_tokens", 0))
+    LLM_TOKENS.labels(model, "output").inc(usage.get("output_tokens", 0))
+    details = usage.get("input_token_details") or {}
+    for kind in ("cache_read", "cache_creation"):
+        if details.get(kind):
+            LLM_TOKENS.labels(model, kind).inc(details[kind])
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+def metrics_payload():
+    """Body and content type for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
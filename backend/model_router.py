@@ -0,0 +1,85 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+from prometheus_client import Counter, Histogram
+
+# Ordered cheapest/fastest first. `max_score` is the highest complexity score a
+# tier is picked for up front; the last tier takes everything else and is
+# where escalation ends. Override with MODEL_TIERS (same JSON shape).
+DEFAULT_TIERS = [
+    {"name": "simple", "model_id": "apac.amazon.nova-micro-v1:0", "max_tokens": 2048, "max_score": 5},
+    {"name": "standard", "model_id": "apac.amazon.nova-lite-v1:0", "max_tokens": 8192, "max_score": 20},
+    {"name": "complex", "model_id": "apac.amazon.nova-pro-v1:0", "max_tokens": 8192, "max_score": None},
+]
+MODEL_TIERS = json.loads(os.environ["MODEL_TIERS"]) if os.environ.get("MODEL_TIERS") else DEFAULT_TIERS
+MODEL_ROUTING_ENABLED = os.environ.get("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+MODEL_DEFAULT_TIER = os.environ.get("MODEL_DEFAULT_TIER", "standard")  # used when routing is off
+MODEL_MAX_ESCALATIONS = int(os.environ.get("MODEL_MAX_ESCALATIONS", "2"))
+
+ROUTE_DECISIONS = Counter("planner_route_decisions_total", "Initial tier picked by the router", ["tier"])
+ROUTE_OUTCOMES = Counter("planner_route_outcomes_total", "Planner attempts per tier and outcome", ["tier", "outcome"])
+ROUTE_ESCALATIONS = Counter("planner_route_escalations_total", "Escalations after a failed attempt", ["from_tier", "to_tier"])
+COMPLEXITY_SCORE = Histogram("planner_complexity_score", "Estimated prompt complexity", buckets=(1, 2, 4, 6, 8, 12, 16, 24, 32))
+
+# Things that usually become their own integration/http/script node
+INTEGRATION_PATTERNS = {
+    "email": r"\b(e-?mail|mail|notify|notification)\b",
+    "aws": r"\b(aws|waf|ipset|block ?list|blocklist|unblock|block)\b",
+    "github": r"\bgithub\b",
+    "gitlab": r"\bgitlab\b",
+    "http": r"\b(https?://\S+|http|api|endpoint|webhook)\b",
+    "script": r"\b(script|extract|parse|normali[sz]e|transform)\b",
+    "other": r"\b(slack|jira|pagerduty|teams|servicenow|datadog|splunk)\b",
+}
+CONDITIONAL_PATTERN = r"\b(if|when|whether|unless|otherwise|else|in case|depending|only if)\b"
+STEP_PATTERN = r"\b(then|after|afterwards|next|finally|and also)\b|[,;]"
+COMPILED_INTEGRATIONS = {name: re.compile(p, re.IGNORECASE) for name, p in INTEGRATION_PATTERNS.items()}
+COMPILED_CONDITIONAL = re.compile(CONDITIONAL_PATTERN, re.IGNORECASE)
+COMPILED_STEP = re.compile(STEP_PATTERN, re.IGNORECASE)
+
+@dataclass
+class Route:
+    tier_index: int
+    score: float
+    features: dict = field(default_factory=dict)
+
+    @property
+    def tier(self):
+        return MODEL_TIERS[self.tier_index]
+
+def estimate_complexity(prompt):
+    """Cheap lexical features of the request and a combined score"""
+    integrations = sorted(name for name, pattern in COMPILED_INTEGRATIONS.items() if pattern.search(prompt))
+    conditionals = len(COMPILED_CONDITIONAL.findall(prompt))
+    steps = len(COMPILED_STEP.findall(prompt))
+    words = len(prompt.split())
+    score = 2 * len(integrations) + 2 * conditionals + steps + words / 30.0
+    return score, {"integrations": integrations, "conditionals": conditionals, "steps": steps, "words": words}
+
+def _tier_index(name):
+    for i, tier in enumerate(MODEL_TIERS):
+        if tier["name"] == name:
+            return i
+    return len(MODEL_TIERS) - 1
+
+def route_prompt(prompt):
+    """Pick the cheapest tier whose max_score covers the prompt"""
+    score, features = estimate_complexity(prompt)
+    COMPLEXITY_SCORE.observe(score)
+    if not MODEL_ROUTING_ENABLED:
+        index = _tier_index(MODEL_DEFAULT_TIER)
+    else:
+        index = len(MODEL_TIERS) - 1
+        for i, tier in enumerate(MODEL_TIERS):
+            if tier.get("max_score") is None or score <= tier["max_score"]:
+                index = i
+                break
+    ROUTE_DECISIONS.labels(MODEL_TIERS[index]["name"]).inc()
+    return Route(index, score, features)
+
+def escalation_path(route):
+    """Tier indexes to try, starting with the routed tier"""
+    last = min(len(MODEL_TIERS) - 1, route.tier_index + MODEL_MAX_ESCALATIONS)
+    return list(range(route.tier_index, last + 1))
@@ -68,3 +68,34 @@ class ApiKey(db.Model):
     organization_id = db.Column(db.Integer, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Pre-aggregated run statistics, maintained by rollups.py as runs complete.
+# scope is "workflow" (key = workflow id) or "integration" (key = task name,
+# "http" or "script"); hour is the UTC hour the run started in.
+class ExecutionRollup(db.Model):
+    __tablename__ = 'execution_rollups'
+
+    scope = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(200), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    succeeded = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    total_ms = db.Column(db.Float, nullable=False, default=0)
+    max_ms = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_execution_rollups_scope_hour', 'scope', 'hour'),)
+
+# Latency histogram per rollup row: how many runs fell in each of
+# rollups.LATENCY_BOUNDS_MS; percentiles are read off the summed buckets
+class ExecutionLatencyRollup(db.Model):
+    __tablename__ = 'execution_latency_rollups'
+
+    scope = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(200), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)
+    bucket = db.Column(db.SmallInteger, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_execution_latency_rollups_scope_hour', 'scope', 'hour'),)
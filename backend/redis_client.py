@@ -0,0 +1,20 @@
+import os
+import threading
+
+import redis
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+_client = None
+_lock = threading.Lock()
+
+def get_redis():
+    """Shared Redis client (thread-safe connection pool), or None when REDIS_URL is unset"""
+    global _client
+    if not REDIS_URL:
+        return None
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(REDIS_URL, health_check_interval=30)
+    return _client
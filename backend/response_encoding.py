@@ -0,0 +1,53 @@
+import gzip
+import json
+
+from flask import Response, request
+
+# Optional codecs: fall back to JSON / gzip when they are not installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_MIMETYPE = "application/msgpack"
+# Below this size compression costs more than it saves
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _accepted_encodings():
+    """Content codings the client accepts (q=0 excluded)"""
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(coding.lower())
+    return accepted
+
+def encode_response(payload, status=200):
+    """Serialize `payload` compactly (msgpack or minified JSON) and compress it if worthwhile"""
+    if msgpack is not None and request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE:
+        body = msgpack.packb(payload, use_bin_type=True)
+        mimetype = MSGPACK_MIMETYPE
+    else:
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        mimetype = "application/json"
+
+    response = Response(body, status=status, mimetype=mimetype)
+    response.vary.update(("Accept", "Accept-Encoding"))
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    accepted = _accepted_encodings()
+    if brotli is not None and "br" in accepted:
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        response.headers["Content-Encoding"] = "br"
+    elif "gzip" in accepted:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
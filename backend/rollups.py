@@ -0,0 +1,327 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from prometheus_client import Counter as MetricCounter, Histogram
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import db
+from models import AdminWorkflow, ExecutionLatencyRollup, ExecutionLog, ExecutionRollup
+
+ROLLUP_FLUSH_INTERVAL = float(os.environ.get("ROLLUP_FLUSH_INTERVAL", "5"))  # seconds
+ROLLUP_FLUSH_RUNS = int(os.environ.get("ROLLUP_FLUSH_RUNS", "500"))  # flush early once this many runs are pending
+ROLLUP_MAX_DAYS = 366
+
+# Upper bounds of the latency buckets; the last bucket is everything above
+LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+ROLLUP_FLUSHES = MetricCounter("rollup_flushes_total", "Rollup batches written", ["outcome"])
+ROLLUP_BATCH_RUNS = Histogram("rollup_batch_runs", "Runs folded into one rollup write", buckets=(1, 5, 10, 50, 100, 500, 1000, 5000))
+
+def hour_of(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def latency_bucket(ms):
+    return bisect_left(LATENCY_BOUNDS_MS, ms)
+
+def integration_key(step):
+    """Rollup key for steps that call out of the service, None for the rest"""
+    if step.get("type") == "integration":
+        return step.get("task") or "integration"
+    if step.get("type") in ("http", "script"):
+        return step["type"]
+    return None
+
+def _empty_row():
+    return {"runs": 0, "succeeded": 0, "failed": 0, "skipped": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+class Rollup:
+    """Counts and latency buckets for a set of runs, keyed like the rollup tables"""
+
+    def __init__(self):
+        self.rows = {}  # (scope, key, hour) -> counters
+        self.latency = Counter()  # (scope, key, hour, bucket) -> runs
+        self.runs = 0
+
+    def add(self, scope, key, hour, status, ms):
+        row = self.rows.setdefault((scope, key, hour), _empty_row())
+        row["runs"] += 1
+        if status == "success":
+            row["succeeded"] += 1
+        elif status == "failed":
+            row["failed"] += 1
+        elif status == "skipped":
+            row["skipped"] += 1
+        row["total_ms"] += ms
+        row["max_ms"] = max(row["max_ms"], ms)
+        self.latency[(scope, key, hour, latency_bucket(ms))] += 1
+
+    def add_run(self, workflow_id, started_at, duration_ms, status, steps):
+        hour = hour_of(started_at)
+        self.add("workflow", str(workflow_id), hour, status, duration_ms)
+        for step in steps or ():
+            key = integration_key(step)
+            if key is not None:
+                self.add("integration", key, hour, step.get("status"), step.get("duration_ms") or 0.0)
+        self.runs += 1
+
+    def merge(self, other):
+        for k, row in other.rows.items():
+            mine = self.rows.setdefault(k, _empty_row())
+            for field in ("runs", "succeeded", "failed", "skipped", "total_ms"):
+                mine[field] += row[field]
+            mine["max_ms"] = max(mine["max_ms"], row["max_ms"])
+        self.latency.update(other.latency)
+        self.runs += other.runs
+
+def _upsert(conn, model, rows, keys, increments, maxima=()):
+    """INSERT ... ON CONFLICT adding to the existing counters, so concurrent writers never lose counts"""
+    if not rows:
+        return
+    postgres = conn.dialect.name == "postgresql"
+    stmt = (pg_insert if postgres else sqlite_insert)(model.__table__)
+    greatest = db.func.greatest if postgres else db.func.max
+    table = model.__table__
+    set_ = {c: table.c[c] + stmt.excluded[c] for c in increments}
+    set_.update({c: greatest(table.c[c], stmt.excluded[c]) for c in maxima})
+    conn.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_), rows)
+
+def write_rollup(conn, rollup, execution_counts=None):
+    """Add a Rollup (and per-workflow run counts) to the tables in one transaction"""
+    # Sorted so concurrent writers take row locks in the same order
+    _upsert(conn, ExecutionRollup, [
+        {"scope": scope, "key": key, "hour": hour, **row}
+        for (scope, key, hour), row in sorted(rollup.rows.items())
+    ], ["scope", "key", "hour"], ["runs", "succeeded", "failed", "skipped", "total_ms"], ["max_ms"])
+    _upsert(conn, ExecutionLatencyRollup, [
+        {"scope": scope, "key": key, "hour": hour, "bucket": bucket, "count": count}
+        for (scope, key, hour, bucket), count in sorted(rollup.latency.items())
+    ], ["scope", "key", "hour", "bucket"], ["count"])
+    if execution_counts:
+        table = AdminWorkflow.__table__
+        conn.execute(
+            table.update()
+            .where(table.c.id == db.bindparam("workflow_id"))
+            .values(execution_count=db.func.coalesce(table.c.execution_count, 0) + db.bindparam("runs")),
+            [{"workflow_id": wid, "runs": n} for wid, n in sorted(execution_counts.items())],
+        )
+
+class RollupAggregator:
+    """Folds finished runs into rollups in memory and writes them in batches.
+
+    One upsert per (scope, key, hour) every ROLLUP_FLUSH_INTERVAL seconds
+    replaces per-run writes, including the execution_count increment. Runs
+    not yet flushed are lost if the process dies; `python rollups.py
+    --backfill` rebuilds the tables from execution_logs.
+    """
+
+    def __init__(self, interval=ROLLUP_FLUSH_INTERVAL, max_runs=ROLLUP_FLUSH_RUNS):
+        self.interval = interval
+        self.max_runs = max_runs
+        self.pending = Rollup()
+        self.execution_counts = Counter()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.app = None
+        self.thread = None
+
+    def _start(self):
+        if self.app is None:
+            self.app = current_app._get_current_object()
+            atexit.register(self.flush)
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="rollup-flush", daemon=True)
+            self.thread.start()
+
+    def record(self, workflow_id, started_at, completed_at, status, steps):
+        """Count a finished run (call inside an app context, after its log is committed)"""
+        duration_ms = (completed_at - started_at).total_seconds() * 1000
+        with self.lock:
+            self._start()
+            self.pending.add_run(workflow_id, started_at, duration_ms, status, steps)
+            self.execution_counts[workflow_id] += 1
+            if self.pending.runs >= self.max_runs:
+                self.wake.set()
+
+    def flush(self):
+        """Write everything pending; on failure it is kept for the next attempt. Returns success."""
+        with self.lock:
+            batch, counts = self.pending, self.execution_counts
+            self.pending, self.execution_counts = Rollup(), Counter()
+        if not batch.runs:
+            return True
+        try:
+            with self.app.app_context(), db.engine.begin() as conn:
+                write_rollup(conn, batch, counts)
+        except Exception as e:
+            with self.lock:
+                self.pending.merge(batch)
+                self.execution_counts.update(counts)
+            ROLLUP_FLUSHES.labels("error").inc()
+            print(f"DEBUG: Rollup flush of {batch.runs} runs failed, will retry: {e}", flush=True)
+            return False
+        ROLLUP_FLUSHES.labels("ok").inc()
+        ROLLUP_BATCH_RUNS.observe(batch.runs)
+        return True
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if not self.flush():
+                time.sleep(self.interval)
+
+aggregator = RollupAggregator()
+
+# --- Queries ---
+
+def since_days(days):
+    """Start of the window for "the last `days` days", on an hour boundary"""
+    return hour_of(datetime.utcnow()) - timedelta(days=days)
+
+def percentile_ms(buckets, pct, max_ms):
+    """Estimate a percentile from {bucket: count}, interpolating inside the bucket"""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    rank = pct / 100.0 * total
+    seen = 0
+    for bucket in sorted(buckets):
+        count = buckets[bucket]
+        if seen + count >= rank:
+            lower = LATENCY_BOUNDS_MS[bucket - 1] if bucket > 0 else 0
+            upper = LATENCY_BOUNDS_MS[bucket] if bucket < len(LATENCY_BOUNDS_MS) else max_ms
+            return round(min(lower + (upper - lower) * (rank - seen) / count, max_ms), 1)
+        seen += count
+    return round(max_ms, 1)
+
+def _stats(row, buckets):
+    runs = row["runs"]
+    finished = row["succeeded"] + row["failed"]  # skipped steps don't count either way
+    return {
+        "runs": runs,
+        "succeeded": row["succeeded"],
+        "failed": row["failed"],
+        "skipped": row["skipped"],
+        "success_rate": round(row["succeeded"] / finished, 4) if finished else None,
+        "avg_ms": round(row["total_ms"] / runs, 1) if runs else None,
+        "p50_ms": percentile_ms(buckets, 50, row["max_ms"]),
+        "p95_ms": percentile_ms(buckets, 95, row["max_ms"]),
+        "p99_ms": percentile_ms(buckets, 99, row["max_ms"]),
+        "max_ms": round(row["max_ms"], 1),
+    }
+
+def summarize(scope, since, key=None):
+    """{key: stats} over rollup hours >= since, for every key in the scope or just `key`"""
+    R, L = ExecutionRollup, ExecutionLatencyRollup
+    filters = [R.scope == scope, R.hour >= since] + ([R.key == key] if key is not None else [])
+    rows = db.session.execute(
+        db.select(
+            R.key, db.func.sum(R.runs), db.func.sum(R.succeeded), db.func.sum(R.failed),
+            db.func.sum(R.skipped), db.func.sum(R.total_ms), db.func.max(R.max_ms),
+        ).where(*filters).group_by(R.key)
+    ).all()
+    latency_filters = [L.scope == scope, L.hour >= since] + ([L.key == key] if key is not None else [])
+    buckets = {}
+    for k, bucket, count in db.session.execute(
+        db.select(L.key, L.bucket, db.func.sum(L.count)).where(*latency_filters).group_by(L.key, L.bucket)
+    ):
+        buckets.setdefault(k, {})[bucket] = int(count)
+    fields = ("runs", "succeeded", "failed", "skipped", "total_ms", "max_ms")
+    return {
+        k: _stats(dict(zip(fields, (v or 0 for v in values))), buckets.get(k, {}))
+        for k, *values in rows
+    }
+
+def timeseries(scope, key, since, granularity="hour"):
+    """Per-hour (or per-day) stats for one key, oldest first"""
+    R, L = ExecutionRollup, ExecutionLatencyRollup
+    period = hour_of if granularity == "hour" else (lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0))
+    merged, buckets = {}, {}
+    for row in db.session.execute(
+        db.select(R).where(R.scope == scope, R.key == key, R.hour >= since)
+    ).scalars():
+        target = merged.setdefault(period(row.hour), _empty_row())
+        for field in ("runs", "succeeded", "failed", "skipped", "total_ms"):
+            target[field] += getattr(row, field)
+        target["max_ms"] = max(target["max_ms"], row.max_ms)
+    for hour, bucket, count in db.session.execute(
+        db.select(L.hour, L.bucket, L.count).where(L.scope == scope, L.key == key, L.hour >= since)
+    ):
+        per_period = buckets.setdefault(period(hour), {})
+        per_period[bucket] = per_period.get(bucket, 0) + count
+    return [
+        {"period": start.isoformat(), **_stats(merged[start], buckets.get(start, {}))}
+        for start in sorted(merged)
+    ]
+
+# --- Backfill ---
+
+def backfill(days, batch_size=10000):
+    """Rebuild the rollups for the last `days` days from execution_logs.
+
+    Covers whole hours before the current one, so it can run next to live
+    writers; runs still in flight when it starts may be counted twice.
+    Does not touch execution_count.
+    """
+    since, until = since_days(days), hour_of(datetime.utcnow())
+    for model in (ExecutionRollup, ExecutionLatencyRollup):
+        db.session.execute(db.delete(model).where(model.hour >= since, model.hour < until))
+    db.session.commit()
+
+    query = (
+        db.select(ExecutionLog)
+        .where(
+            ExecutionLog.log_type == "workflow",
+            ExecutionLog.workflow_id.is_not(None),
+            ExecutionLog.started_at >= since,
+            ExecutionLog.started_at < until,
+            ExecutionLog.status.in_(("success", "failed")),
+        )
+        .execution_options(yield_per=1000)
+    )
+    rollup, total = Rollup(), 0
+    for log in db.session.execute(query).scalars():
+        if log.completed_at is not None:
+            duration_ms = (log.completed_at - log.started_at).total_seconds() * 1000
+        else:
+            duration_ms = (log.execution_time_seconds or 0) * 1000.0
+        try:
+            steps = json.loads(log.execution_data or "{}").get("steps")
+        except (ValueError, AttributeError):
+            steps = None
+        rollup.add_run(log.workflow_id, log.started_at, duration_ms, log.status, steps)
+        if rollup.runs >= batch_size:
+            total += _write_backfill(rollup)
+            rollup = Rollup()
+    total += _write_backfill(rollup)
+    return total
+
+def _write_backfill(rollup):
+    with db.engine.begin() as conn:
+        write_rollup(conn, rollup)
+    print(f"DEBUG: Backfilled {rollup.runs} runs", flush=True)
+    return rollup.runs
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild execution rollups from execution_logs")
+    parser.add_argument("--backfill", action="store_true", help="recompute the rollups for the window")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.error("nothing to do (use --backfill)")
+
+    from app import app
+
+    with app.app_context():
+        runs = backfill(max(1, min(args.days, ROLLUP_MAX_DAYS)))
+    print(f"DEBUG: Rollups rebuilt from {runs} runs over {args.days} days", flush=True)
@@ -0,0 +1,167 @@
+import json
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from prometheus_client import Counter, Histogram
+
+from metrics import LATENCY_BUCKETS, record_cache
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SCRIPT_POOL_SIZE = int(os.environ.get("SCRIPT_POOL_SIZE", "4"))
+SCRIPT_TIMEOUT = float(os.environ.get("SCRIPT_TIMEOUT", "5"))  # seconds per script, wall clock
+SCRIPT_MEMORY_MB = int(os.environ.get("SCRIPT_MEMORY_MB", "256"))
+SCRIPT_WORKER_CPU_SECONDS = int(os.environ.get("SCRIPT_WORKER_CPU_SECONDS", "300"))
+SCRIPT_WORKER_MAX_RUNS = int(os.environ.get("SCRIPT_WORKER_MAX_RUNS", "1000"))  # then recycle
+SCRIPT_WORKER_UID = int(os.environ.get("SCRIPT_WORKER_UID", "65534"))  # workers started as root switch to this uid (nobody)
+SCRIPT_CHECKOUT_TIMEOUT = float(os.environ.get("SCRIPT_CHECKOUT_TIMEOUT", "10"))
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "script_worker.py")
+HEADER = struct.Struct(">I")
+CODEC = "msgpack" if msgpack is not None else "json"
+
+SCRIPT_DURATION = Histogram("script_run_duration_seconds", "Script node round trip through the pool", buckets=LATENCY_BUCKETS)
+SCRIPT_OUTCOMES = Counter("script_runs_total", "Script node runs by outcome", ["outcome"])
+SCRIPT_WORKERS_STARTED = Counter("script_workers_started_total", "Script worker processes spawned")
+SCRIPT_WORKERS_RECYCLED = Counter("script_workers_recycled_total", "Workers replaced because a different owner checked them out")
+
+class ScriptError(Exception):
+    """The script raised, timed out or took its worker down"""
+
+def _dumps(obj):
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True, default=str)
+    return json.dumps(obj, default=str).encode()
+
+def _loads(data):
+    if msgpack is not None:
+        return msgpack.unpackb(data)
+    return json.loads(data)
+
+class ScriptWorker:
+    """One sandboxed interpreter speaking length-prefixed frames over its stdin/stdout"""
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-I", WORKER_PATH, CODEC, str(SCRIPT_MEMORY_MB), str(SCRIPT_WORKER_CPU_SECONDS), str(SCRIPT_WORKER_UID)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            # Nothing from our environment (database URLs, AWS credentials) reaches scripts
+            env={"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "LANG": "C.UTF-8"},
+            close_fds=True,
+        )
+        self.fd = self.proc.stdout.fileno()
+        self.runs = 0
+        self.owner = None  # first workflow to run here; nobody else's scripts follow it
+        SCRIPT_WORKERS_STARTED.inc()
+
+    def _read_exact(self, n, deadline):
+        chunks = []
+        while n:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                raise TimeoutError
+            chunk = os.read(self.fd, n)
+            if not chunk:
+                raise EOFError
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def call(self, request, timeout):
+        body = _dumps(request)
+        self.proc.stdin.write(HEADER.pack(len(body)) + body)
+        self.proc.stdin.flush()
+        deadline = time.monotonic() + timeout
+        (length,) = HEADER.unpack(self._read_exact(HEADER.size, deadline))
+        self.runs += 1
+        return _loads(self._read_exact(length, deadline))
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=1)
+        except Exception:
+            pass
+
+class ScriptPool:
+    """Pre-warmed worker processes; a worker that times out or dies is killed and replaced.
+
+    A script can reach past its restricted builtins and change interpreter
+    state (patch a module, stash data), so a worker only ever serves one
+    owner: checking it out for another one swaps it for a fresh process.
+    """
+
+    def __init__(self, size=SCRIPT_POOL_SIZE):
+        self.size = size
+        self.idle = queue.LifoQueue()  # most recently used first, so hot workers stay hot
+        self.lock = threading.Lock()
+        self.started = False
+
+    def warm(self):
+        """Spawn the workers now instead of on the first script node"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        for _ in range(self.size):
+            self.idle.put(ScriptWorker())
+
+    def _replace(self, worker):
+        worker.kill()
+        # Respawn off the request path
+        threading.Thread(target=lambda: self.idle.put(ScriptWorker()), daemon=True).start()
+
+    def run(self, script, data, trigger=None, timeout=SCRIPT_TIMEOUT, owner=None):
+        """Execute `script` with `data` in a worker; returns the variables it defined.
+        Workers are never shared between different `owner`s (e.g. workflows)."""
+        self.warm()
+        try:
+            worker = self.idle.get(timeout=SCRIPT_CHECKOUT_TIMEOUT)
+        except queue.Empty:
+            SCRIPT_OUTCOMES.labels("no_worker").inc()
+            raise ScriptError("No script worker available")
+        if worker.owner is not None and worker.owner != owner:
+            worker.kill()
+            SCRIPT_WORKERS_RECYCLED.inc()
+            worker = ScriptWorker()
+        worker.owner = owner
+
+        started = time.perf_counter()
+        try:
+            response = worker.call({"script": script, "data": data, "trigger": trigger}, timeout)
+        except TimeoutError:
+            self._replace(worker)
+            SCRIPT_OUTCOMES.labels("timeout").inc()
+            raise ScriptError(f"Script exceeded {timeout:g}s")
+        except (EOFError, OSError):
+            # Killed by its CPU/memory limits or crashed
+            self._replace(worker)
+            SCRIPT_OUTCOMES.labels("crashed").inc()
+            raise ScriptError("Script worker died (resource limit exceeded?)")
+        finally:
+            SCRIPT_DURATION.observe(time.perf_counter() - started)
+
+        if worker.runs >= SCRIPT_WORKER_MAX_RUNS:
+            self._replace(worker)
+        else:
+            self.idle.put(worker)
+
+        record_cache("script_code", response["cached"])
+        if not response["ok"]:
+            SCRIPT_OUTCOMES.labels("error").inc()
+            raise ScriptError(response["error"])
+        SCRIPT_OUTCOMES.labels("ok").inc()
+        return response["variables"]
+
+script_pool = ScriptPool()
@@ -0,0 +1,187 @@
+# Worker process for script nodes, started by script_runner. Stdlib only (plus
+# msgpack when available): it must not import the app, its config or credentials.
+import builtins
+import ctypes
+import hashlib
+import io
+import os
+import platform
+import resource
+import struct
+import sys
+from collections import OrderedDict
+
+# Modules scripts may import; loaded before seccomp stops file access
+ALLOWED_MODULES = (
+    "base64", "collections", "datetime", "hashlib", "ipaddress", "itertools",
+    "json", "math", "re", "statistics", "string", "time", "urllib.parse",
+)
+SAFE_BUILTINS = (
+    "abs", "all", "any", "bin", "bool", "bytes", "chr", "dict", "divmod", "enumerate",
+    "filter", "float", "format", "frozenset", "hash", "hex", "int", "isinstance",
+    "issubclass", "iter", "len", "list", "map", "max", "min", "next", "oct", "ord",
+    "pow", "print", "range", "repr", "reversed", "round", "set", "slice", "sorted",
+    "str", "sum", "tuple", "zip",
+    "ArithmeticError", "AttributeError", "Exception", "IndexError", "KeyError",
+    "LookupError", "TypeError", "ValueError", "ZeroDivisionError",
+)
+CODE_CACHE_SIZE = 256
+MAX_STDOUT = 4096
+HEADER = struct.Struct(">I")
+
+def _codec(name):
+    if name == "msgpack":
+        import msgpack
+        return (lambda obj: msgpack.packb(obj, use_bin_type=True, default=str)), msgpack.unpackb
+    import json
+    return (lambda obj: json.dumps(obj, default=str).encode()), json.loads
+
+def _restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name not in ALLOWED_MODULES:
+        raise ImportError(f"Import of '{name}' is not allowed in scripts")
+    return __import__(name, globals, locals, fromlist, level)
+
+# --- OS-level isolation ---
+# The restricted builtins above only keep honest scripts honest: any script
+# can walk object.__subclasses__() back to `os` and `socket`. What actually
+# contains it is below: an unprivileged uid, rlimits, and a seccomp filter
+# that refuses network sockets, new processes, namespace tricks and any
+# path-based file access (open, create, rename, unlink).
+SECCOMP_ARCHES = {
+    # machine: (AUDIT_ARCH_*, {syscall: number})
+    "x86_64": (0xC000003E, {
+        "socket": 41, "connect": 42, "bind": 49, "listen": 50, "socketpair": 53,
+        "clone": 56, "fork": 57, "vfork": 58, "execve": 59, "ptrace": 101,
+        "unshare": 272, "setns": 308, "execveat": 322, "io_uring_setup": 425, "clone3": 435,
+        # Files: nothing is opened, created or renamed once setup is done
+        "open": 2, "truncate": 76, "rename": 82, "mkdir": 83, "rmdir": 84, "creat": 85,
+        "link": 86, "unlink": 87, "symlink": 88, "mknod": 133, "openat": 257, "mkdirat": 258,
+        "mknodat": 259, "unlinkat": 263, "renameat": 264, "linkat": 265, "symlinkat": 266,
+        "open_by_handle_at": 304, "renameat2": 316, "openat2": 437,
+    }),
+    "aarch64": (0xC00000B7, {
+        "unshare": 97, "ptrace": 117, "socket": 198, "socketpair": 199, "bind": 200,
+        "listen": 201, "connect": 203, "clone": 220, "execve": 221, "setns": 268,
+        "execveat": 281, "io_uring_setup": 425, "clone3": 435,
+        "mknodat": 33, "mkdirat": 34, "unlinkat": 35, "symlinkat": 36, "linkat": 37,
+        "renameat": 38, "truncate": 45, "openat": 56, "open_by_handle_at": 265,
+        "renameat2": 276, "openat2": 437,
+    }),
+}
+PR_SET_NO_NEW_PRIVS, PR_SET_SECCOMP, SECCOMP_MODE_FILTER = 38, 22, 2
+SECCOMP_RET_KILL_PROCESS, SECCOMP_RET_ALLOW, SECCOMP_RET_EPERM = 0x80000000, 0x7FFF0000, 0x00050001
+BPF_LD_ABS_W, BPF_JEQ_K, BPF_JGE_K, BPF_RET_K = 0x20, 0x15, 0x35, 0x06
+X32_SYSCALL_BIT = 0x40000000
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [("code", ctypes.c_ushort), ("jt", ctypes.c_ubyte), ("jf", ctypes.c_ubyte), ("k", ctypes.c_uint)]
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.POINTER(_SockFilter))]
+
+def _seccomp_program():
+    """BPF: kill on a foreign syscall ABI, EPERM for denied syscalls, allow the rest"""
+    arch, syscalls = SECCOMP_ARCHES[platform.machine()]
+    denied = sorted(syscalls.values())
+    n = len(denied)
+    program = [
+        (BPF_LD_ABS_W, 0, 0, 4),  # seccomp_data.arch
+        (BPF_JEQ_K, 1, 0, arch),
+        (BPF_RET_K, 0, 0, SECCOMP_RET_KILL_PROCESS),
+        (BPF_LD_ABS_W, 0, 0, 0),  # seccomp_data.nr
+        (BPF_JGE_K, n + 1, 0, X32_SYSCALL_BIT),
+    ]
+    # Each match jumps over the remaining checks and the ALLOW to the EPERM
+    program += [(BPF_JEQ_K, n - i, 0, nr) for i, nr in enumerate(denied)]
+    program += [(BPF_RET_K, 0, 0, SECCOMP_RET_ALLOW), (BPF_RET_K, 0, 0, SECCOMP_RET_EPERM)]
+    return (_SockFilter * len(program))(*program)
+
+def _install_seccomp(libc, program):
+    fprog = _SockFprog(len(program), program)
+    if libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_NO_NEW_PRIVS) failed")
+    if libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.byref(fprog), 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_SECCOMP) failed")
+
+def _drop_privileges(uid):
+    if os.getuid() != 0:
+        return
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+
+def _sandbox(memory_mb, cpu_seconds, uid):
+    """Fail closed: a worker that can't isolate itself exits instead of serving"""
+    for name in ALLOWED_MODULES:
+        __import__(name)
+    libc = ctypes.CDLL(None, use_errno=True)
+    program = _seccomp_program()
+    _drop_privileges(uid)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024,) * 2)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds,) * 2)  # lifetime total; the parent recycles before this
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))  # effective now that we are not root
+    _install_seccomp(libc, program)
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    if len(data) < n:
+        raise EOFError
+    return data
+
+def serve(codec_name, memory_mb, cpu_seconds, uid):
+    dumps, loads = _codec(codec_name)
+    requests = sys.stdin.buffer
+    # Keep the protocol on a private fd; anything written to fd 1 goes nowhere
+    responses = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    _sandbox(memory_mb, cpu_seconds, uid)
+
+    safe_builtins = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+    safe_builtins["__import__"] = _restricted_import
+    codes = OrderedDict()
+
+    while True:
+        try:
+            (length,) = HEADER.unpack(_read_exact(requests, HEADER.size))
+            request = loads(_read_exact(requests, length))
+        except EOFError:
+            return
+
+        script = request["script"]
+        digest = hashlib.sha256(script.encode()).hexdigest()
+        cached = digest in codes
+        output = io.StringIO()
+        sys.stdout = output
+        try:
+            if cached:
+                codes.move_to_end(digest)
+            else:
+                codes[digest] = compile(script, "<script>", "exec")
+                if len(codes) > CODE_CACHE_SIZE:
+                    codes.popitem(last=False)
+            data = request["data"]
+            # Fresh builtins every run: a script rebinding `sum` must not change the next one
+            scope = {"__builtins__": dict(safe_builtins), "data": data, "trigger": request.get("trigger")}
+            exec(codes[digest], scope)
+            # Script variables become workflow variables; `data` only if reassigned
+            variables = {
+                k: v for k, v in scope.items()
+                if not k.startswith("_") and k != "trigger" and (k != "data" or v is not data)
+                and isinstance(v, (str, int, float, bool, list, dict, tuple, type(None)))
+            }
+            response = {"ok": True, "variables": variables}
+        except BaseException as e:
+            # Includes SystemExit/KeyboardInterrupt raised by the script itself
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            sys.stdout = sys.__stdout__
+        response["cached"] = cached
+        response["stdout"] = output.getvalue()[:MAX_STDOUT]
+        body = dumps(response)
+        responses.write(HEADER.pack(len(body)) + body)
+        responses.flush()
+
+if __name__ == "__main__":
+    serve(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
@@ -0,0 +1,189 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import blob_store
+from metrics import record_cache
+
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "2048"))  # prompts kept, least recently used dropped first
+
+# --- Entities ---
+# Values that change between otherwise identical requests. They are lifted out
+# of the prompt as parameters (ip0, email0, ...) so "unblock 1.2.3.4" and
+# "unblock 5.6.7.8" embed identically, and are swapped into a reused graph.
+# Order matters: earlier patterns claim their text first.
+ENTITY_PATTERNS = [
+    ("url", r"https?://[^\s,;'\"]+"),
+    ("email", r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    ("ip", r"\b\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?\b"),
+    ("host", r"\b[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|net|org|io|internal|local|lan|corp)\b"),
+    ("service", r"\b[a-z][a-z0-9]*(?:[-_][a-z0-9]+)+\b"),  # payment-api, auth_service
+]
+COMPILED_ENTITIES = re.compile("|".join(f"(?P<{kind}>{p})" for kind, p in ENTITY_PATTERNS), re.IGNORECASE)
+# "restart the nginx service": a bare name is only an entity next to the word service
+NAMED_SERVICE = re.compile(r"\b(?!(?:the|a|this|that|each|every|email|mail|web|api)\b|(?:url|email|ip|host|service)\d+\b)([a-z][a-z0-9]+) (?=service\b)", re.IGNORECASE)
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+PLACEHOLDER = re.compile(r"\b(?:url|email|ip|host|service)\d+\b")
+
+# Paraphrases seen in incident prompts, folded to one wording before keying
+PHRASES = [
+    (r"\b(?:remove|delete|drop|take)\b(.*?)\b(?:from|off|out of)\b(.*?)\b(?:block ?list|deny ?list|black ?list|ip ?set)\b", r"unblock \1 \2"),
+    (r"\b(?:allow ?list|white ?list)\b", "unblock"),
+    (r"\b(?:add)\b(.*?)\b(?:to)\b(.*?)\b(?:block ?list|deny ?list|black ?list)\b", r"block \1 \2"),
+    (r"\b(?:block ?list|deny ?list|black ?list)\b", "block"),
+    (r"\b(?:notify|alert|inform|mail|e-mail|message|ping)\b", "email"),
+    (r"\b(?:reboot|bounce|restart(?:s|ed|ing)?)\b", "restart"),
+    (r"\b(?:ban|blocks|blocked|blocking)\b", "block"),
+    (r"\b(?:unban|unblocks|unblocked|unblocking)\b", "unblock"),
+    # Comparison and negation words decide a condition's operator
+    (r"\b(?:greater|more|higher) than\b|\b(?:above|over|exceeds?|exceeding)\b", "gt"),
+    (r"\b(?:less|lower|fewer) than\b|\b(?:below|under)\b", "lt"),
+    (r"\bat least\b", "gte"),
+    (r"\bat most\b", "lte"),
+    (r"\b(?:not|no|never|without|unless|isn't|doesn't|don't)\b", "not"),
+]
+COMPILED_PHRASES = [(re.compile(p), repl) for p, repl in PHRASES]
+STOPWORDS = frozenset(
+    "a an the and then also after afterwards next finally to from in on of for with by at via into than "
+    "please can you could i we want need me us our my it its this that is are be ip address addresses team".split()
+)
+WORD = re.compile(r"[a-z0-9]+")
+
+# Words whose position matters, not just their presence: which side of a
+# comparison they sit on, and the order steps come in
+OPERATORS = frozenset(("gt", "lt", "gte", "lte", "not"))
+INTEGRATIONS = frozenset(
+    "aws waf ipset s3 ec2 email github gitlab slack jira pagerduty teams servicenow "
+    "datadog splunk http api webhook script".split()
+)
+# Order matters too: "email, then unblock" is a different graph from "unblock, then email"
+ACTIONS = frozenset(
+    "restart scale unblock block email create open close delete update check query fetch get "
+    "post send run deploy rollback stop start kill disable enable escalate assign comment "
+    "merge archive tag log extract parse transform".split()
+)
+
+def extract_entities(prompt):
+    """(template, params): the prompt with entities replaced by kind+index, and their values"""
+    params, seen = {}, {}
+    counts = {}
+
+    def placeholder(kind, value):
+        key = (kind, value.lower())
+        if key not in seen:
+            seen[key] = f"{kind}{counts.get(kind, 0)}"
+            counts[kind] = counts.get(kind, 0) + 1
+            params[seen[key]] = value
+        return seen[key]
+
+    template = COMPILED_ENTITIES.sub(lambda m: placeholder(m.lastgroup, m.group(0)), prompt)
+    template = NAMED_SERVICE.sub(lambda m: placeholder("service", m.group(1)) + " ", template)
+    return template, params
+
+def normalize(template):
+    """Lowercase, fold known paraphrases and drop filler words"""
+    text = template.lower()
+    for pattern, repl in COMPILED_PHRASES:
+        text = pattern.sub(repl, text)
+    return " ".join(w for w in WORD.findall(text) if w not in STOPWORDS)
+
+def signature(normalized):
+    """The structure a word set can't capture, for the cache key.
+
+    Entities only need the same kinds and counts (their values are substituted).
+    Literal numbers, each comparison with its neighbours ("cpu gt 90"), the
+    integrations named and the actions in order must all match, since
+    "cpu above 90 and memory below 50" has the same words as "cpu below 90 and
+    memory above 50".
+    """
+    words = normalized.split()
+    placeholders = sorted(set(PLACEHOLDER.findall(normalized)))
+    numbers = sorted(set(NUMBER.findall(PLACEHOLDER.sub(" ", normalized))))
+    comparisons = sorted(
+        " ".join(words[max(i - 1, 0):i + 2]) for i, w in enumerate(words) if w in OPERATORS
+    )
+    integrations = sorted(set(w for w in words if w in INTEGRATIONS))
+    actions = [w for i, w in enumerate(words) if w in ACTIONS and (i == 0 or words[i - 1] != w)]
+    return "|".join((
+        " ".join(placeholders), " ".join(numbers), ",".join(comparisons),
+        " ".join(integrations), " ".join(actions),
+    ))
+
+def substitute(value, replacements, pattern):
+    """Copy of a JSON value with every cached entity value swapped for the new one"""
+    if isinstance(value, dict):
+        return {k: substitute(v, replacements, pattern) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, replacements, pattern) for v in value]
+    if isinstance(value, str) and pattern is not None:
+        return pattern.sub(lambda m: replacements[m.group(0).lower()], value)
+    return value
+
+def _replacement_pattern(replacements):
+    if not replacements:
+        return None
+    # Longest first, and never inside a longer token (1.2.3.4 in 1.2.3.45)
+    values = sorted(replacements, key=len, reverse=True)
+    return re.compile(r"(?<![\w.@-])(?:" + "|".join(re.escape(v) for v in values) + r")(?![\w@-]|\.\w)", re.IGNORECASE)
+
+class SemanticCache:
+    """Planner results keyed by prompt meaning rather than exact text.
+
+    Prompts are reduced to their normalized words (entities lifted out,
+    paraphrases folded, filler dropped) plus a signature, so rewording and
+    reordering map to the same key but a changed word does not. Graphs stay
+    in blob_store; only their references are kept here.
+    """
+
+    def __init__(self, capacity=SEMANTIC_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()  # (signature, frozenset of words) -> entry
+        self.lock = threading.Lock()
+
+    def _key(self, prompt):
+        template, params = extract_entities(prompt)
+        normalized = normalize(template)
+        return (signature(normalized), frozenset(normalized.split())), params
+
+    def lookup(self, prompt):
+        """The cached graph for an equivalent prompt with this prompt's entities, or None.
+
+        Returns {"graph", "source_prompt"} on a hit.
+        """
+        key, params = self._key(prompt)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        graph = blob_store.get(entry["graph_ref"]) if entry else None
+        record_cache("semantic_plan", graph is not None)
+        if graph is None:
+            if entry is not None:
+                # The blob expired; don't keep pointing at it
+                with self.lock:
+                    if self.entries.get(key) is entry:
+                        del self.entries[key]
+            return None
+
+        replacements = {old.lower(): params[name] for name, old in entry["params"].items() if name in params}
+        return {
+            "graph": substitute(graph, replacements, _replacement_pattern(replacements)),
+            "source_prompt": entry["prompt"],
+        }
+
+    def store(self, prompt, graph_ref):
+        """Remember the validated graph planned for `prompt`"""
+        key, params = self._key(prompt)
+        with self.lock:
+            self.entries[key] = {"prompt": prompt, "params": params, "graph_ref": graph_ref}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+semantic_cache = SemanticCache()
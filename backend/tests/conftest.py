@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Importable without a real environment: no checkpointer, in-memory database
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("CHECKPOINTER", "none")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.pop("REDIS_URL", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
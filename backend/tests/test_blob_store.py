@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+
+import pytest
+
+import blob_store
+
+class FakeConnection:
+    """Just enough of a psycopg connection for PostgresBlobs"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = None
+
+    def execute(self, sql, params=()):
+        if sql.startswith("INSERT"):
+            ref, data, _ = params
+            self.rows[ref] = data
+        elif sql.startswith("SELECT"):
+            data = self.rows.get(params[0])
+            self.result = {"data": memoryview(data)} if data is not None else None
+        return self
+
+    def fetchone(self):
+        return self.result
+
+class FakePool:
+    def __init__(self):
+        self.rows = {}
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self.rows)
+
+@pytest.fixture
+def durable(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(blob_store, "_durable", None)
+    monkeypatch.setattr(blob_store, "_local", blob_store.OrderedDict())
+    blob_store.use_postgres(pool)
+    return pool
+
+def test_blob_outlives_the_process_cache(durable, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_CACHE_SIZE", 1)
+    ref = blob_store.put({"nodes": [1, 2, 3]})
+    blob_store.put({"other": True})  # evicts the first from the local LRU
+    assert ref not in blob_store._local
+    assert ref in durable.rows
+
+    assert blob_store.get(ref) == {"nodes": [1, 2, 3]}
+    assert ref in blob_store._local  # read back into the cache
+
+def test_restart_keeps_refs(durable, monkeypatch):
+    ref = blob_store.put({"graph": "x"})
+    monkeypatch.setattr(blob_store, "_local", blob_store.OrderedDict())
+    assert blob_store.get(ref) == {"graph": "x"}
+    assert blob_store.get("sha256:missing") is None
@@ -0,0 +1,50 @@
+from contextlib import contextmanager, nullcontext
+
+import checkpointing
+
+class FakeConnection:
+    """Serves expired thread ids in batches and records the deletes"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def transaction(self):
+        return nullcontext()
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SELECT"):
+            ttl, limit = params
+            self.pool.ttls.append(ttl)
+            self.rows = [{"thread_id": t} for t in self.pool.expired[:limit]]
+        else:
+            table = sql.split()[2]
+            self.pool.deleted.setdefault(table, []).extend(params[0])
+            if table == "checkpoints":
+                self.pool.expired = [t for t in self.pool.expired if t not in params[0]]
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+class FakePool:
+    def __init__(self, expired):
+        self.expired = list(expired)
+        self.deleted = {}
+        self.ttls = []
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+def test_prune_deletes_expired_threads_from_every_table(monkeypatch):
+    monkeypatch.setattr(checkpointing, "CHECKPOINT_PRUNE_BATCH", 2)
+    pool = FakePool(["run-a", "run-b", "run-c"])
+    assert checkpointing.prune_postgres_checkpoints(pool, ttl=60) == 3
+    assert pool.ttls == [60, 60]
+    for table in checkpointing.POSTGRES_CHECKPOINT_TABLES:
+        assert pool.deleted[table] == ["run-a", "run-b", "run-c"]
+
+def test_prune_with_nothing_expired():
+    pool = FakePool([])
+    assert checkpointing.prune_postgres_checkpoints(pool) == 0
+    assert pool.deleted == {}
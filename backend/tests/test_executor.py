@@ -0,0 +1,74 @@
+import pytest
+
+from execution_plan import PlanError, compile_plan
+from executor import NODE_HANDLERS, run_plan
+
+def _workflow(*nodes):
+    ids = [n["id"] for n in nodes]
+    return {
+        "nodes": list(nodes),
+        "connections": [{"from": a, "to": b} for a, b in zip(ids, ids[1:])],
+    }
+
+def _run(workflow, payload=None, run_id="run-1"):
+    return run_plan(compile_plan(workflow, NODE_HANDLERS), payload or {}, run_id)
+
+TRIGGER = {"id": "node-1", "type": "webhook", "label": "Start"}
+
+def _script(node_id, script):
+    return {"id": node_id, "type": "script", "label": "Script", "params": {"script": script}}
+
+def _log(node_id, message):
+    return {"id": node_id, "type": "log", "label": "Log", "config": {"message": message}}
+
+def test_outputs_become_variables():
+    result = _run(_workflow(TRIGGER, _script("node-2", "usage = data['usage'] + 1"), _log("node-3", "usage {{usage}}")),
+                  {"usage": 90})
+    assert result["status"] == "success"
+    assert result["steps"][-1]["output"] == {"message": "usage 91"}
+
+def test_outputs_cannot_replace_executor_bookkeeping():
+    script = "nodes = [1]\nrun_id = 'other-run'\ntrigger = 'x'"
+    result = _run(_workflow(TRIGGER, _script("node-2", script), _log("node-3", "{{run_id}} {{trigger.usage}}")),
+                  {"usage": 90})
+    assert result["status"] == "success", result["error"]
+    assert result["steps"][-1]["output"] == {"message": "run-1 90"}
+
+def test_scripts_may_replace_data():
+    result = _run(_workflow(TRIGGER, _script("node-2", "data = {'usage': 5}"), _log("node-3", "usage {{data.usage}}")),
+                  {"usage": 90})
+    assert result["steps"][-1]["output"] == {"message": "usage 5"}
+
+def _condition(node_id, operator="eq", right="yes"):
+    return {"id": node_id, "type": "condition", "label": "Check",
+            "config": {"condition": {"left": "{{data.answer}}", "operator": operator, "right": right}}}
+
+def _branches(*false_edge_marks):
+    # node-2 is the condition; node-3 is its true branch, node-4 its false branch
+    nodes = [TRIGGER, _condition("node-2"), _log("node-3", "true branch"), _log("node-4", "false branch")]
+    connections = [{"from": "node-1", "to": "node-2"}, {"from": "node-2", "to": "node-3", "sourceHandle": "true"},
+                   {"from": "node-2", "to": "node-4", **dict(false_edge_marks)}]
+    return {"nodes": nodes, "connections": connections}
+
+@pytest.mark.parametrize("mark", [
+    {"sourceHandle": "false"},
+    {"label": "False"},
+    {"condition": {"value": "false"}},
+])
+def test_false_branch_marks(mark):
+    workflow = _branches(*mark.items())
+    ran = [s["id"] for s in _run(workflow, {"answer": "yes"})["steps"]]
+    assert ran == ["node-1", "node-2", "node-3"]
+    ran = [s["id"] for s in _run(workflow, {"answer": "no"})["steps"]]
+    assert ran == ["node-1", "node-2", "node-4"]
+
+@pytest.mark.parametrize("workflow_data, message", [
+    ("{not json", "not a valid workflow"),
+    ({"workflows": []}, "not a valid workflow"),
+    ({"nodes": [{"type": "log"}]}, "Node 0 has no id"),
+    ({"nodes": [{"id": "node-1", "type": "log", "config": []}]}, "config must be an object"),
+    ({"nodes": "x"}, "must be lists"),
+])
+def test_malformed_workflow_data_is_a_plan_error(workflow_data, message):
+    with pytest.raises(PlanError, match=message):
+        compile_plan(workflow_data, NODE_HANDLERS)
@@ -0,0 +1,26 @@
+import pytest
+
+from expressions import compile_condition
+
+def check(left, operator, right):
+    return compile_condition({"left": "{{ value }}", "operator": operator, "right": right})({"value": left})
+
+@pytest.mark.parametrize("left, right, expected", [
+    (True, "true", True),
+    (True, "TRUE", True),
+    (False, "false", True),
+    (True, True, True),
+    (1, True, False),
+    (1, "true", False),
+    (0, False, False),
+    (True, 1, False),
+    (True, "1", False),
+])
+def test_bools_compare_as_text(left, right, expected):
+    assert check(left, "eq", right) is expected
+    assert check(left, "ne", right) is not expected
+
+def test_numbers_still_coerce():
+    assert check("91", "eq", 91)
+    assert check(91.0, "eq", "91")
+    assert check("abc", "ne", 1)
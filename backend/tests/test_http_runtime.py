@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from http_runtime import HttpNodeError, HttpRuntime
+from loadtest import stub_http
+
+@pytest.fixture
+def stub():
+    server, base_url = stub_http.start()
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+def _requests_seen(server):
+    with server.lock:
+        return server.stats["requests"]
+
+def test_json_body_is_parsed(stub):
+    _, base_url = stub
+    result = HttpRuntime().request("GET", f"{base_url}/json?size=2")
+    assert result["ok"] and result["data"]["usage"] == 91 and len(result["data"]["items"]) == 2
+
+def test_idempotent_request_is_retried(stub):
+    server, base_url = stub
+    result = HttpRuntime(max_retries=2).request("GET", f"{base_url}/flaky?every=2", timeout=5)
+    assert result["status_code"] == 200
+    assert _requests_seen(server) == 2
+
+def test_post_is_not_retried(stub):
+    server, base_url = stub
+    result = HttpRuntime(max_retries=2).request("POST", f"{base_url}/flaky?every=2", body={"a": 1}, timeout=5)
+    assert result["status_code"] == 503
+    assert _requests_seen(server) == 1
+
+def test_body_is_truncated_at_cap(stub):
+    _, base_url = stub
+    result = HttpRuntime(max_body_bytes=1000).request("GET", f"{base_url}/bytes?n=5000")
+    assert result["truncated"] is True
+    assert len(result["data"]) == 1000
+
+def test_slow_response_stays_within_budget(stub):
+    _, base_url = stub
+    started = time.monotonic()
+    with pytest.raises(HttpNodeError):
+        HttpRuntime().request("GET", f"{base_url}/json?delay_ms=2000", timeout=0.3)
+    assert time.monotonic() - started < 1.0
+
+def test_trickling_body_stays_within_budget(stub):
+    _, base_url = stub
+    started = time.monotonic()
+    # Each byte arrives well inside the per-read timeout; only the total deadline stops it
+    with pytest.raises(HttpNodeError, match="reading the body"):
+        HttpRuntime().request("GET", f"{base_url}/trickle?n=30&interval_ms=100", timeout=0.5)
+    assert time.monotonic() - started < 1.0
+
+def test_per_host_cap(stub):
+    _, base_url = stub
+    runtime = HttpRuntime(max_per_host=1)
+    slow = threading.Thread(target=runtime.request, args=("GET", f"{base_url}/json?delay_ms=500"), kwargs={"timeout": 5})
+    slow.start()
+    time.sleep(0.1)
+    try:
+        with pytest.raises(HttpNodeError, match="Too many concurrent"):
+            runtime.request("GET", f"{base_url}/json", timeout=0.2)
+    finally:
+        slow.join()
+    # The slot is free again once the slow call finishes
+    assert runtime.request("GET", f"{base_url}/json", timeout=5)["ok"]
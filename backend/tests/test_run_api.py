@@ -0,0 +1,90 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+import sqlalchemy
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+import agent_graph
+import app as app_module
+from database import db
+from models import AdminWorkflow
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def fake_plan(request, tier, priority):
+        calls.append(request)
+        graph = {"workflows": [{"name": request, "workflow_data": {"nodes": [], "connections": []}}]}
+        return {"plan": [], "results": {"graph": graph}, "messages": [AIMessage(content="planned")]}, None
+
+    monkeypatch.setattr(agent_graph, "_plan_with_tier", fake_plan)
+    monkeypatch.setattr(agent_graph, "SEMANTIC_CACHE_ENABLED", False)
+    checkpointer = MemorySaver()
+    monkeypatch.setattr(app_module, "checkpointer", checkpointer)
+    monkeypatch.setattr(app_module, "app_graph", agent_graph.workflow.compile(checkpointer=checkpointer))
+    client = app_module.app.test_client()
+    client.calls = calls
+    return client
+
+def test_retry_with_run_id_resumes(client):
+    first = client.post("/api/run_workflow", json={"prompt": "check disk", "run_id": "run-a"}).get_json()
+    again = client.post("/api/run_workflow", json={"prompt": "check disk", "run_id": "run-a"}).get_json()
+    assert again["results"]["graph"] == first["results"]["graph"]
+    assert client.calls == ["check disk"]
+
+def test_run_id_with_different_prompt_conflicts(client):
+    client.post("/api/run_workflow", json={"prompt": "check disk", "run_id": "run-b"})
+    response = client.post("/api/run_workflow", json={"prompt": "restart payment-api", "run_id": "run-b"})
+    assert response.status_code == 409
+    assert client.calls == ["check disk"]
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.mark.parametrize("reloader", ["true", "false"])
+def test_sigterm_flushes_rollups(tmp_path, reloader):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    engine = sqlalchemy.create_engine(url)
+    db.metadata.create_all(engine)
+    workflow = {"nodes": [{"id": "node-1", "type": "log", "label": "Log", "config": {"message": "hi"}}], "connections": []}
+    with engine.begin() as conn:
+        conn.execute(AdminWorkflow.__table__.insert().values(
+            id=1, name="w", category="c", workflow_data=json.dumps(workflow), is_active=True, execution_count=0))
+
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=url, PORT=str(port), FLASK_USE_RELOADER=reloader,
+               ROLLUP_FLUSH_INTERVAL="3600")  # nothing is written unless shutdown flushes
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen([sys.executable, "app.py"], cwd=backend, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                response = requests.post(f"http://127.0.0.1:{port}/api/workflows/1/execute", json={}, timeout=5)
+                break
+            except requests.ConnectionError:
+                assert time.monotonic() < deadline, "app did not start"
+                time.sleep(0.2)
+        assert response.json()["status"] == "success"
+        with engine.connect() as conn:
+            assert conn.execute(sqlalchemy.text("SELECT count(*) FROM execution_rollups")).scalar() == 0
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=15) == 0
+    finally:
+        proc.kill()
+
+    with engine.connect() as conn:
+        assert conn.execute(sqlalchemy.text("SELECT runs FROM execution_rollups WHERE scope = 'workflow'")).scalar() == 1
@@ -0,0 +1,92 @@
+import socket
+
+import pytest
+
+from script_runner import ScriptError, ScriptPool
+
+# Reaches the real `os` module through a stdlib class, whatever the builtins
+ESCAPE = """
+wrap_close = [c for c in ().__class__.__base__.__subclasses__() if c.__name__ == "_wrap_close"][0]
+os = wrap_close.__init__.__globals__  # the os module's namespace
+"""
+
+@pytest.fixture
+def pool():
+    pool = ScriptPool(size=1)
+    yield pool
+    while not pool.idle.empty():
+        pool.idle.get().kill()
+
+@pytest.fixture
+def listener():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    server.settimeout(0.5)
+    yield server
+    server.close()
+
+def test_scripts_still_run(pool):
+    assert pool.run("total = sum(data['values'])", {"values": [1, 2, 3]}) == {"total": 6}
+
+def test_escape_cannot_open_sockets(pool, listener):
+    port = listener.getsockname()[1]
+    script = ESCAPE + f"""
+socket = os["sys"].modules["builtins"].__import__("socket")
+socket.create_connection(("127.0.0.1", {port}), timeout=1).sendall(b"leak")
+"""
+    # Importing socket already needs a new fd; either way nothing connects
+    with pytest.raises(ScriptError):
+        pool.run(script, {})
+    with pytest.raises(socket.timeout):
+        listener.accept()
+
+def test_socket_syscall_is_denied(pool):
+    # The worker has ctypes loaded, so scripts can make raw syscalls; seccomp refuses them
+    script = ESCAPE + """
+ctypes = os["sys"].modules["ctypes"]
+libc = ctypes.CDLL(None, use_errno=True)
+fd = libc.socket(2, 1, 0)
+errno = ctypes.get_errno()
+"""
+    result = pool.run(script, {})
+    assert result["fd"] == -1
+    assert result["errno"] == 1  # EPERM
+
+def test_escape_cannot_spawn_processes(pool):
+    with pytest.raises(ScriptError, match="PermissionError"):
+        pool.run(ESCAPE + "os['fork']()", {})
+    assert pool.run(ESCAPE + "status = os['system']('true')", {})["status"] != 0
+
+def test_escape_cannot_open_files(pool):
+    with pytest.raises(ScriptError, match="PermissionError"):
+        pool.run(ESCAPE + "os['open']('/etc/hostname', os['O_RDONLY'])", {})
+
+def test_freed_fd_does_not_allow_open(pool):
+    # Closing an fd leaves a free slot; the filter has to refuse the open anyway
+    script = ESCAPE + """
+os['close'](2)
+text = os['sys'].modules['builtins'].open('/etc/passwd').read()
+"""
+    with pytest.raises(ScriptError, match="PermissionError"):
+        pool.run(script, {})
+    with pytest.raises(ScriptError, match="PermissionError"):
+        pool.run(ESCAPE + "os['open']('/etc/passwd', os['O_RDONLY'])", {})
+
+def test_escape_cannot_touch_paths(pool):
+    with pytest.raises(ScriptError, match="PermissionError"):
+        pool.run(ESCAPE + "os['mkdir']('/tmp/script-sandbox-test')", {})
+
+def test_builtins_do_not_leak_between_runs(pool):
+    pool.run("__builtins__['sum'] = lambda xs: 42", {})
+    assert pool.run("total = sum([1, 2])", {}) == {"total": 3}
+
+def test_workers_are_not_shared_between_owners(pool):
+    pid = ESCAPE + "pid = os['getpid']()"
+    first = pool.run(pid, {}, owner=1)["pid"]
+    assert pool.run(pid, {}, owner=1)["pid"] == first
+    assert pool.run(pid, {}, owner=2)["pid"] != first
+
+def test_worker_is_unprivileged(pool):
+    uid = pool.run(ESCAPE + "uid = os['getuid']()", {})["uid"]
+    assert uid != 0
@@ -0,0 +1,70 @@
+import pytest
+
+import blob_store
+from semantic_cache import SemanticCache
+
+GRAPH = {"workflows": [{"name": "Unblock 1.2.3.4", "workflow_data": {"nodes": [{"id": "n1", "params": {"ip": "1.2.3.4"}}]}}]}
+
+@pytest.fixture
+def cache():
+    return SemanticCache(capacity=64)
+
+def _store(cache, prompt):
+    cache.store(prompt, blob_store.put(GRAPH))
+
+def test_paraphrase_hits_with_entities_substituted(cache):
+    _store(cache, "unblock IP 1.2.3.4 in WAF and email security")
+    hit = cache.lookup("remove 5.6.7.8 from WAF blocklist then notify security")
+    assert hit is not None
+    assert hit["graph"]["workflows"][0]["workflow_data"]["nodes"][0]["params"]["ip"] == "5.6.7.8"
+
+def test_reordered_condition_hits(cache):
+    _store(cache, "Restart the payment-api service if CPU is above 90 percent")
+    assert cache.lookup("if cpu is above 90 percent restart the payment-api service") is not None
+
+LONG = (
+    "When the nightly health check webhook fires for the production cluster, look at the "
+    "reported usage value and {clause}, and post a short summary for the on-call engineer"
+)
+
+@pytest.mark.parametrize("cached, asked", [
+    # Comparison direction
+    (LONG.format(clause="if cpu is above 90 restart the payment-api service"),
+     LONG.format(clause="if cpu is below 90 restart the payment-api service")),
+    # Negation
+    (LONG.format(clause="if the status is healthy restart the payment-api service"),
+     LONG.format(clause="if the status is not healthy restart the payment-api service")),
+    # Integration
+    (LONG.format(clause="open a github issue with the details for the payment-api service"),
+     LONG.format(clause="open a gitlab issue with the details for the payment-api service")),
+    # Action
+    (LONG.format(clause="if cpu is above 90 restart the payment-api service"),
+     LONG.format(clause="if cpu is above 90 scale the payment-api service")),
+    # Step order
+    (LONG.format(clause="send an email to soc@acme.com then unblock 1.2.3.4 in the waf"),
+     LONG.format(clause="unblock 1.2.3.4 in the waf then send an email to soc@acme.com")),
+    # Operands swapped between two comparisons
+    (LONG.format(clause="if cpu is above 90 and memory below 50 restart the payment-api service"),
+     LONG.format(clause="if cpu is below 90 and memory above 50 restart the payment-api service")),
+    # A word the signature doesn't know about
+    (LONG.format(clause="if cpu is above 90 restart the payment-api service"),
+     LONG.format(clause="if disk is above 90 restart the payment-api service")),
+])
+def test_one_meaningful_word_misses(cache, cached, asked):
+    _store(cache, cached)
+    assert cache.lookup(cached) is not None
+    assert cache.lookup(asked) is None
+
+def test_capacity_bounds_entries():
+    cache = SemanticCache(capacity=2)
+    for n in range(5):
+        _store(cache, f"restart the payment-api service if cpu is above {n}")
+    assert len(cache.entries) == 2
+    assert cache.lookup("restart the payment-api service if cpu is above 4") is not None
+    assert cache.lookup("restart the payment-api service if cpu is above 0") is None
+
+def test_expired_blob_drops_the_entry(cache, monkeypatch):
+    _store(cache, "restart the payment-api service")
+    monkeypatch.setattr(blob_store, "get", lambda ref: None)
+    assert cache.lookup("restart the payment-api service") is None
+    assert not cache.entries
@@ -0,0 +1,19 @@
+import uuid
+
+import pytest
+
+from tool_runtime import IdempotencyConflict, invoke_tool
+from tools import scale_service
+
+def test_same_key_same_args_replays():
+    key = uuid.uuid4().hex
+    first = invoke_tool(scale_service, {"service_name": "x", "replicas": 2}, idempotency_key=key)
+    # Normalized: whitespace and argument order don't make it a different call
+    again = invoke_tool(scale_service, {"replicas": 2, "service_name": " x "}, idempotency_key=key)
+    assert first == again == "Scaled x to 2 replicas."
+
+def test_same_key_different_args_conflicts():
+    key = uuid.uuid4().hex
+    invoke_tool(scale_service, {"service_name": "x", "replicas": 2}, idempotency_key=key)
+    with pytest.raises(IdempotencyConflict, match="different arguments"):
+        invoke_tool(scale_service, {"service_name": "x", "replicas": 5}, idempotency_key=key)
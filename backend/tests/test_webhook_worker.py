@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+
+import webhook_worker
+
+class StubQueue:
+    def __init__(self, events):
+        self.events = list(events)
+        self.acked = []
+        self.lock = threading.Lock()
+
+    def recover(self, worker_id):
+        return 0
+
+    def claim(self, worker_id, count):
+        with self.lock:
+            claimed, self.events = self.events[:count], self.events[count:]
+            return claimed
+
+    def ack(self, worker_id, event):
+        with self.lock:
+            self.acked.append((event, time.monotonic()))
+
+    def length(self):
+        return len(self.events)
+
+def _drain(monkeypatch, queue, process, until, concurrency=4):
+    monkeypatch.setattr(webhook_worker, "event_queue", lambda: queue)
+    monkeypatch.setattr(webhook_worker, "WEBHOOK_POLL_INTERVAL", 0.01)
+    if process is not None:
+        monkeypatch.setattr(webhook_worker, "process_event", process)
+    stop = threading.Event()
+    thread = threading.Thread(target=webhook_worker.drain, args=(None, concurrency, "test", stop))
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    thread.join(5)
+
+def test_slow_event_does_not_block_the_rest(monkeypatch):
+    queue = StubQueue(["slow"] + [f"fast-{i}" for i in range(20)])
+    started = time.monotonic()
+
+    def process(app, raw):
+        time.sleep(1.0 if raw == "slow" else 0.01)
+
+    _drain(monkeypatch, queue, process, until=lambda: len(queue.acked) == 21)
+    acked = dict(queue.acked)
+    assert len(acked) == 21
+    # 20 fast events on the 3 free threads finish long before the slow one
+    assert max(t for raw, t in acked.items() if raw != "slow") - started < 0.5
+    assert acked["slow"] - started >= 1.0
+
+def test_malformed_event_does_not_stop_the_loop(monkeypatch):
+    queue = StubQueue(["not json", '{"no": "workflow"}'])
+    _drain(monkeypatch, queue, None, until=lambda: len(queue.acked) == 2)
+    assert sorted(raw for raw, _ in queue.acked) == ['not json', '{"no": "workflow"}']
+
+def test_same_event_id_runs_separately_per_workflow(monkeypatch):
+    from app import app
+    from database import db
+    from models import AdminWorkflow
+
+    with app.app_context():
+        db.create_all()
+        for workflow_id in (101, 102):
+            db.session.merge(AdminWorkflow(id=workflow_id, name="w", category="c", workflow_data="{}", is_active=True))
+        db.session.commit()
+
+    run_ids = []
+    monkeypatch.setattr(webhook_worker, "execute_workflow",
+                        lambda workflow, payload, **kwargs: run_ids.append(kwargs["run_id"]) or (None, {"status": "success"}))
+    for workflow_id in (101, 102):
+        event = {"event_id": "alert-1", "workflow_id": workflow_id, "received_at": time.time(), "payload": {}}
+        webhook_worker.process_event(app, json.dumps(event))
+    assert run_ids == ["101:alert-1", "102:alert-1"]
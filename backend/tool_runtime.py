@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter
+
+from metrics import record_cache
+from redis_client import get_redis
+
+TOOL_CACHE_SIZE = int(os.environ.get("TOOL_CACHE_SIZE", "4096"))
+IDEMPOTENCY_TTL = int(os.environ.get("TOOL_IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_PENDING_TTL = int(os.environ.get("TOOL_IDEMPOTENCY_PENDING_TTL", "300"))
+IDEMPOTENCY_WAIT = float(os.environ.get("TOOL_IDEMPOTENCY_WAIT", "30"))
+
+TOOL_CALLS = Counter("tool_calls_total", "Tool invocations that actually ran", ["tool"])
+IDEMPOTENT_REPLAYS = Counter("tool_idempotent_replays_total", "Mutating calls answered from a previous run", ["tool"])
+
+class IdempotencyConflict(Exception):
+    """The idempotency key belongs to a call with different arguments, or
+    another worker holds it and did not finish in time"""
+
+# --- Declaring tool behaviour ---
+
+def read_only(ttl_seconds):
+    """Mark a tool as pure/read-only: identical calls within `ttl_seconds` share one result"""
+    def decorate(tool):
+        tool.metadata = {**(tool.metadata or {}), "read_only": True, "cache_ttl": ttl_seconds}
+        return tool
+    return decorate
+
+def mutating(tool):
+    """Mark a tool as changing external state: calls with an idempotency key apply at most once"""
+    tool.metadata = {**(tool.metadata or {}), "mutating": True}
+    return tool
+
+def _is_error(result):
+    # Tools report failures as "Error: ..." strings rather than raising
+    return isinstance(result, str) and result.startswith("Error")
+
+# --- Bounded TTL cache ---
+
+class TTLCache:
+    """LRU-bounded mapping whose entries expire after a per-entry TTL"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """(True, value) for a live entry, else (False, None)"""
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.data[key]
+                return False, None
+            self.data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def add(self, key, value, ttl):
+        """Set only if absent (or expired); returns True if set"""
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self.data[key] = (time.monotonic() + ttl, value)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+_results = TTLCache(TOOL_CACHE_SIZE)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def normalize_args(tool, args):
+    """Stable cache key material: schema defaults applied, strings trimmed, keys sorted"""
+    schema = getattr(tool, "args_schema", None)
+    if schema is not None and hasattr(schema, "model_validate"):
+        args = schema.model_validate(args).model_dump()
+    args = {k: v.strip() if isinstance(v, str) else v for k, v in args.items()}
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+def cache_key(tool, args):
+    digest = hashlib.sha256(normalize_args(tool, args).encode()).hexdigest()
+    return f"{tool.name}:{digest}"
+
+def _call_cached(tool, args, ttl):
+    key = cache_key(tool, args)
+    hit, value = _results.get(key)
+    record_cache("tool", hit)
+    if hit:
+        return value
+
+    # Single flight: concurrent identical calls wait for the first one
+    with _inflight_lock:
+        waiter = _inflight.get(key)
+        leader = waiter is None
+        if leader:
+            waiter = _inflight[key] = {"done": threading.Event(), "result": None, "error": None}
+    if not leader:
+        waiter["done"].wait()
+        if waiter["error"] is not None:
+            raise waiter["error"]
+        return waiter["result"]
+
+    try:
+        TOOL_CALLS.labels(tool.name).inc()
+        result = tool.invoke(args)
+        if not _is_error(result):
+            _results.set(key, result, ttl)
+        waiter["result"] = result
+        return result
+    except Exception as e:
+        waiter["error"] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        waiter["done"].set()
+
+# --- Idempotency for mutating tools ---
+
+class _IdempotencyStore:
+    """Claims keys in Redis when configured (shared by all workers), else in process memory"""
+
+    def __init__(self):
+        self.local = TTLCache(TOOL_CACHE_SIZE)
+
+    def claim(self, key, args_digest):
+        r = get_redis()
+        pending = json.dumps({"state": "pending", "args": args_digest})
+        if r is not None:
+            return bool(r.set(key, pending, nx=True, ex=IDEMPOTENCY_PENDING_TTL))
+        return self.local.add(key, pending, IDEMPOTENCY_PENDING_TTL)
+
+    def get(self, key):
+        r = get_redis()
+        if r is not None:
+            raw = r.get(key)
+        else:
+            _, raw = self.local.get(key)
+        return json.loads(raw) if raw else None
+
+    def complete(self, key, args_digest, result):
+        r = get_redis()
+        record = json.dumps({"state": "done", "args": args_digest, "result": result}, default=str)
+        if r is not None:
+            r.set(key, record, ex=IDEMPOTENCY_TTL)
+        else:
+            self.local.set(key, record, IDEMPOTENCY_TTL)
+
+    def release(self, key):
+        r = get_redis()
+        if r is not None:
+            r.delete(key)
+        else:
+            self.local.delete(key)
+
+_idempotency = _IdempotencyStore()
+
+def _call_idempotent(tool, args, idempotency_key):
+    key = f"idem:{tool.name}:{idempotency_key}"
+    # The key stands for one specific call; replaying it for other arguments
+    # would report a change that never happened
+    args_digest = hashlib.sha256(normalize_args(tool, args).encode()).hexdigest()
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while not _idempotency.claim(key, args_digest):
+        record = _idempotency.get(key)
+        if record and record.get("args") != args_digest:
+            raise IdempotencyConflict(f"{tool.name} call {idempotency_key} was already made with different arguments")
+        if record and record["state"] == "done":
+            IDEMPOTENT_REPLAYS.labels(tool.name).inc()
+            return record["result"]
+        if time.monotonic() >= deadline:
+            raise IdempotencyConflict(f"{tool.name} call {idempotency_key} is still running elsewhere")
+        time.sleep(0.1)
+
+    try:
+        TOOL_CALLS.labels(tool.name).inc()
+        result = tool.invoke(args)
+    except Exception:
+        _idempotency.release(key)
+        raise
+    if _is_error(result):
+        # Failed attempts must stay retryable
+        _idempotency.release(key)
+    else:
+        _idempotency.complete(key, args_digest, result)
+    return result
+
+def invoke_tool(tool, args, idempotency_key=None):
+    """Run a tool the way the executor should: memoized if read-only,
+    at-most-once per `idempotency_key` if mutating, plain call otherwise."""
+    meta = tool.metadata or {}
+    if meta.get("read_only"):
+        return _call_cached(tool, args, meta.get("cache_ttl", 30))
+    if meta.get("mutating") and idempotency_key:
+        return _call_idempotent(tool, args, idempotency_key)
+    TOOL_CALLS.labels(tool.name).inc()
+    return tool.invoke(args)
@@ -2,6 +2,9 @@ from langchain_core.tools import tool
 import random
 import time
 
+from tool_runtime import mutating, read_only
+
+@mutating
 @tool
 def restart_service(service_name: str, environment: str = "production"):
     """
@@ -17,6 +20,7 @@ def restart_service(service_name: str, environment: str = "production"):
          return f"Error: Failed to restart {service_name} in {environment}. Connection timed out."
     return f"Successfully restarted {service_name} in {environment}."
 
+@read_only(ttl_seconds=30)
 @tool
 def check_disk_usage(host: str):
     """
@@ -28,6 +32,7 @@ def check_disk_usage(host: str):
     usage = random.randint(20, 95)
     return f"Disk usage on {host} is {usage}%."
 
+@mutating
 @tool
 def scale_service(service_name: str, replicas: int):
     """
@@ -39,6 +44,7 @@ def scale_service(service_name: str, replicas: int):
     """
     return f"Scaled {service_name} to {replicas} replicas."
 
+@read_only(ttl_seconds=15)
 @tool
 def query_metrics(metric_name: str, duration_minutes: int = 60):
     """
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from database import db
+from execution_plan import PlanError, nodes_and_connections
+from models import AdminWorkflow
+from redis_client import get_redis
+from tool_runtime import TTLCache
+
+WEBHOOK_QUEUE_KEY = os.environ.get("WEBHOOK_QUEUE_KEY", "webhook:events")
+WEBHOOK_DEDUPE_WINDOW = int(os.environ.get("WEBHOOK_DEDUPE_WINDOW", "60"))  # seconds
+WEBHOOK_MAX_QUEUE = int(os.environ.get("WEBHOOK_MAX_QUEUE", "100000"))
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_ENQUEUE_TIMEOUT = float(os.environ.get("WEBHOOK_ENQUEUE_TIMEOUT", "2"))
+
+QUEUED, DUPLICATE, REJECTED = 1, 0, -1
+OUTCOMES = {QUEUED: "queued", DUPLICATE: "duplicate", REJECTED: "rejected"}
+
+WEBHOOK_EVENTS = Counter("webhook_events_total", "Webhook deliveries by outcome", ["outcome"])
+ENQUEUE_BATCH = Histogram("webhook_enqueue_batch_size", "Events written per Redis round trip", buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500))
+QUEUE_DEPTH = Gauge("webhook_queue_depth", "Webhook events waiting for a worker")
+
+class QueueUnavailable(Exception):
+    """The event could not be handed to the queue in time"""
+
+# Per event: skip if its dedupe key is live, refuse if the queue is full,
+# otherwise claim the key and push. One round trip per batch.
+# KEYS[1] queue, KEYS[2..] dedupe keys; ARGV[1] window, ARGV[2] max length, ARGV[3..] events
+ENQUEUE_SCRIPT = """
+local results = {}
+local length = redis.call('LLEN', KEYS[1])
+for i = 2, #KEYS do
+  if length >= tonumber(ARGV[2]) then
+    results[i - 1] = -1
+  elseif redis.call('SET', KEYS[i], '1', 'NX', 'EX', ARGV[1]) then
+    redis.call('RPUSH', KEYS[1], ARGV[i + 1])
+    length = length + 1
+    results[i - 1] = 1
+  else
+    results[i - 1] = 0
+  end
+end
+return results
+"""
+
+# Move up to ARGV[1] events to the worker's processing list so a crash can requeue them
+# KEYS[1] queue, KEYS[2] processing list
+CLAIM_SCRIPT = """
+local events = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #events > 0 then
+  redis.call('LTRIM', KEYS[1], #events, -1)
+  redis.call('RPUSH', KEYS[2], unpack(events))
+end
+return events
+"""
+
+class RedisEventQueue:
+    """Trigger events in a Redis list, shared by every API process and worker"""
+
+    def __init__(self, client, key=WEBHOOK_QUEUE_KEY):
+        self.client = client
+        self.key = key
+        self._enqueue = client.register_script(ENQUEUE_SCRIPT)
+        self._claim = client.register_script(CLAIM_SCRIPT)
+
+    def enqueue_batch(self, items):
+        """items: [(dedupe_key, event_json)] -> outcome code per item"""
+        keys = [self.key] + [f"webhook:dedupe:{k}" for k, _ in items]
+        args = [WEBHOOK_DEDUPE_WINDOW, WEBHOOK_MAX_QUEUE] + [e for _, e in items]
+        return [int(r) for r in self._enqueue(keys=keys, args=args)]
+
+    def claim(self, worker_id, count):
+        return [e.decode() for e in self._claim(keys=[self.key, f"{self.key}:processing:{worker_id}"], args=[count])]
+
+    def ack(self, worker_id, event):
+        """Drop one finished event from the worker's processing list"""
+        self.client.lrem(f"{self.key}:processing:{worker_id}", 1, event)
+
+    def recover(self, worker_id):
+        """Put events a previous run of this worker claimed but never finished back at the head"""
+        processing = f"{self.key}:processing:{worker_id}"
+        recovered = 0
+        while self.client.lmove(processing, self.key, "RIGHT", "LEFT") is not None:
+            recovered += 1
+        return recovered
+
+    def length(self):
+        return self.client.llen(self.key)
+
+class LocalEventQueue:
+    """In-process stand-in when REDIS_URL is unset (single process, not durable)"""
+
+    def __init__(self):
+        self.events = deque()
+        self.seen = TTLCache(max(WEBHOOK_MAX_QUEUE, 1))
+        self.lock = threading.Lock()
+
+    def enqueue_batch(self, items):
+        results = []
+        with self.lock:
+            for dedupe_key, event in items:
+                if len(self.events) >= WEBHOOK_MAX_QUEUE:
+                    results.append(REJECTED)
+                elif self.seen.add(dedupe_key, True, WEBHOOK_DEDUPE_WINDOW):
+                    self.events.append(event)
+                    results.append(QUEUED)
+                else:
+                    results.append(DUPLICATE)
+        return results
+
+    def claim(self, worker_id, count):
+        with self.lock:
+            return [self.events.popleft() for _ in range(min(count, len(self.events)))]
+
+    def ack(self, worker_id, event):
+        pass
+
+    def recover(self, worker_id):
+        return 0
+
+    def length(self):
+        return len(self.events)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def event_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                client = get_redis()
+                _queue = RedisEventQueue(client) if client is not None else LocalEventQueue()
+    return _queue
+
+class GroupCommitter:
+    """Coalesces concurrent enqueues into one round trip.
+
+    Callers block until the batch holding their event is written. While a
+    write is in flight new events pile up and go out together in the next
+    one, so batches grow with load without adding a fixed delay.
+    """
+
+    def __init__(self, batch_size=WEBHOOK_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def _start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="webhook-group-commit", daemon=True)
+            self.thread.start()
+
+    def submit(self, dedupe_key, event, timeout=WEBHOOK_ENQUEUE_TIMEOUT):
+        slot = {"done": threading.Event(), "result": None, "error": None}
+        with self.cond:
+            self._start()
+            self.pending.append((dedupe_key, event, slot))
+            self.cond.notify()
+        if not slot["done"].wait(timeout):
+            raise QueueUnavailable("Timed out writing to the webhook queue")
+        if slot["error"] is not None:
+            raise QueueUnavailable(str(slot["error"])) from slot["error"]
+        return slot["result"]
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            ENQUEUE_BATCH.observe(len(batch))
+            try:
+                results = event_queue().enqueue_batch([(key, event) for key, event, _ in batch])
+            except Exception as e:
+                for _, _, slot in batch:
+                    slot["error"] = e
+                    slot["done"].set()
+                continue
+            for (_, _, slot), result in zip(batch, results):
+                slot["result"] = result
+                slot["done"].set()
+
+committer = GroupCommitter()
+
+def dedupe_key(workflow_id, headers, body):
+    """Sender-supplied event id if there is one, else the payload's content hash"""
+    event_id = headers.get("X-Event-Id") or headers.get("Idempotency-Key")
+    digest = hashlib.sha256(event_id.encode() if event_id else body).hexdigest()
+    return f"{workflow_id}:{digest}"
+
+def enqueue_event(workflow_id, payload, body, headers, remote_addr):
+    """Queue one delivery; returns (outcome, event_id)"""
+    event_id = headers.get("X-Event-Id") or uuid.uuid4().hex
+    event = json.dumps({
+        "event_id": event_id,
+        "workflow_id": workflow_id,
+        "payload": payload,
+        "received_at": time.time(),
+        "metadata": {
+            "remote_addr": remote_addr,
+            "user_agent": headers.get("User-Agent"),
+            "content_type": headers.get("Content-Type"),
+        },
+    }, separators=(",", ":"))
+    outcome = OUTCOMES[committer.submit(dedupe_key(workflow_id, headers, body), event)]
+    WEBHOOK_EVENTS.labels(outcome).inc()
+    return outcome, event_id
+
+# --- Per-workflow webhook settings, cached so bursts don't hit the database per event ---
+WEBHOOK_SETTINGS_TTL = float(os.environ.get("WEBHOOK_SETTINGS_TTL", "30"))
+_settings = TTLCache(4096)
+
+def webhook_settings(workflow_id):
+    """{"accept_json_only": bool} for an active workflow with a webhook trigger, else None"""
+    hit, settings = _settings.get(workflow_id)
+    if hit:
+        return settings
+    settings = None
+    workflow = db.session.get(AdminWorkflow, workflow_id)
+    if workflow is not None and workflow.is_active:
+        try:
+            nodes, _ = nodes_and_connections(workflow.workflow_data)
+        except PlanError:
+            nodes = []
+        webhooks = [n for n in nodes if n.get("type") == "webhook"]
+        if webhooks:
+            settings = {"accept_json_only": any((n.get("config") or {}).get("accept_json_only") for n in webhooks)}
+    _settings.set(workflow_id, settings, WEBHOOK_SETTINGS_TTL)
+    return settings
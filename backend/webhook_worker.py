@@ -0,0 +1,135 @@
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Histogram
+
+from database import db
+from execution_plan import PlanError
+from executor import execute_workflow
+from metrics import LATENCY_BUCKETS
+from models import AdminWorkflow
+from webhook_queue import QUEUE_DEPTH, LocalEventQueue, event_queue
+
+WEBHOOK_WORKER_CONCURRENCY = int(os.environ.get("WEBHOOK_WORKER_CONCURRENCY", "8"))
+# Stable across restarts so a restarted worker requeues what it had claimed
+WEBHOOK_WORKER_ID = os.environ.get("WEBHOOK_WORKER_ID", socket.gethostname())
+WEBHOOK_POLL_INTERVAL = float(os.environ.get("WEBHOOK_POLL_INTERVAL", "0.2"))
+
+QUEUE_DELAY = Histogram("webhook_queue_delay_seconds", "Time from ingest to execution start", buckets=LATENCY_BUCKETS)
+WEBHOOK_RUNS = Counter("webhook_runs_total", "Webhook-triggered runs by outcome", ["status"])
+
+def process_event(app, raw):
+    """Run one queued event. Never raises, so a bad event can't stop the drain loop."""
+    try:
+        event = json.loads(raw)
+        workflow_id = event["workflow_id"]
+        delay = time.time() - event["received_at"]
+    except (ValueError, KeyError, TypeError) as e:
+        WEBHOOK_RUNS.labels("invalid").inc()
+        print(f"DEBUG: Dropping malformed webhook event: {e}", flush=True)
+        return
+    QUEUE_DELAY.observe(delay)
+    with app.app_context():
+        try:
+            workflow = db.session.get(AdminWorkflow, workflow_id)
+            if workflow is None or not workflow.is_active:
+                WEBHOOK_RUNS.labels("dropped").inc()
+                return
+            metadata = {
+                "event_id": event["event_id"],
+                "received_at": event["received_at"],
+                "queue_delay_ms": round(delay * 1000, 1),
+                **event.get("metadata", {}),
+            }
+            _, result = execute_workflow(
+                workflow, event["payload"],
+                # Sender event ids are only unique per sender; one alert fanned out to
+                # two webhooks must not share tool idempotency keys
+                trigger_source="webhook", trigger_metadata=metadata, run_id=f"{workflow_id}:{event['event_id']}",
+            )
+            WEBHOOK_RUNS.labels(result["status"]).inc()
+        except PlanError as e:
+            WEBHOOK_RUNS.labels("invalid").inc()
+            print(f"DEBUG: Webhook for workflow {workflow_id} not runnable: {e}", flush=True)
+        except Exception as e:
+            db.session.rollback()
+            WEBHOOK_RUNS.labels("error").inc()
+            print(f"DEBUG: Webhook run failed for workflow {workflow_id}: {e}", flush=True)
+
+def drain(app, concurrency=WEBHOOK_WORKER_CONCURRENCY, worker_id=WEBHOOK_WORKER_ID, stop=None):
+    """Run queued webhook events until `stop` is set.
+
+    Events are claimed only for idle threads and each one is acked when it
+    finishes, so a slow event holds up nothing but its own thread. A busy
+    worker stops taking work and the backlog stays in Redis (where ingest
+    can push back with 429s) instead of piling up in memory.
+    """
+    stop = stop or threading.Event()
+    queue = event_queue()
+    recovered = queue.recover(worker_id)
+    if recovered:
+        print(f"DEBUG: Requeued {recovered} unfinished webhook events from {worker_id}", flush=True)
+
+    idle = threading.BoundedSemaphore(concurrency)
+
+    def run_one(raw):
+        try:
+            process_event(app, raw)
+            queue.ack(worker_id, raw)
+        except Exception as e:
+            # Left in the processing list; recover() requeues it on restart
+            print(f"DEBUG: Could not ack webhook event: {e}", flush=True)
+        finally:
+            idle.release()
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="webhook") as pool:
+        while not stop.is_set():
+            if not idle.acquire(timeout=WEBHOOK_POLL_INTERVAL):
+                continue
+            free = 1
+            while free < concurrency and idle.acquire(blocking=False):
+                free += 1
+            try:
+                events = queue.claim(worker_id, free)
+                QUEUE_DEPTH.set(queue.length())
+            except Exception as e:
+                events = []
+                print(f"DEBUG: Could not claim webhook events: {e}", flush=True)
+            for _ in range(free - len(events)):
+                idle.release()
+            if not events:
+                stop.wait(WEBHOOK_POLL_INTERVAL)
+                continue
+            for raw in events:
+                pool.submit(run_one, raw)
+
+_local_worker = None
+_local_lock = threading.Lock()
+
+def ensure_local_worker(app):
+    """Without Redis, events sit in process memory, so drain them in a background thread here"""
+    global _local_worker
+    if not isinstance(event_queue(), LocalEventQueue):
+        return
+    with _local_lock:
+        if _local_worker is None or not _local_worker.is_alive():
+            _local_worker = threading.Thread(target=drain, args=(app,), name="webhook-drain", daemon=True)
+            _local_worker.start()
+
+if __name__ == '__main__':
+    from app import app
+    from script_runner import script_pool
+
+    script_pool.warm()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"DEBUG: Webhook worker {WEBHOOK_WORKER_ID} draining with concurrency {WEBHOOK_WORKER_CONCURRENCY}", flush=True)
+    try:
+        drain(app, stop=stop)
+    except KeyboardInterrupt:
+        pass
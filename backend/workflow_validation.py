@@ -0,0 +1,324 @@
+# Structural checks and repairs for workflow exports, shared by the planner
+# (agent_graph) and the execution plan compiler (execution_plan).
+
+def validate_connections(graph_data):
+    """Validate that all nodes are properly connected"""
+    workflows = graph_data.get("workflows", [])
+    if not workflows:
+        return []
+    
+    nodes = workflows[0].get("workflow_data", {}).get("nodes", [])
+    connections = workflows[0].get("workflow_data", {}).get("connections", [])
+    
+    errors = []
+    node_ids = {n["id"] for n in nodes}
+    incoming = {nid: [] for nid in node_ids}
+    outgoing = {nid: [] for nid in node_ids}
+    
+    # Build connection graph
+    for conn in connections:
+        from_id = conn["from"]
+        to_id = conn["to"]
+        if from_id in outgoing:
+            outgoing[from_id].append(to_id)
+        if to_id in incoming:
+            incoming[to_id].append(from_id)
+    
+    # Validate each node
+    for node in nodes:
+        nid = node["id"]
+        ntype = node["type"]
+        label = node.get("label", "Unknown")
+        
+        # Start nodes should have no incoming
+        if ntype in ["webhook", "trigger"]:
+            if incoming[nid]:
+                errors.append(f"{nid} ({label}): Start node should have no incoming connections")
+            if not outgoing[nid]:
+                errors.append(f"{nid} ({label}): Start node must have at least 1 outgoing connection")
+        else:
+            # All other nodes must have incoming
+            if not incoming[nid]:
+                errors.append(f"{nid} ({label}): Orphaned node - no incoming connections")
+        
+        # Condition nodes must have exactly 2 outgoing (true/false)
+        if ntype == "condition":
+            if len(outgoing[nid]) != 2:
+                errors.append(f"{nid} ({label}): Condition must have exactly 2 outgoing connections (true/false)")
+        
+        # Warn about potential dead ends (nodes with no outgoing except final log nodes)
+        if not outgoing[nid] and ntype not in ["log"] and len(nodes) > 1:
+            # Check if this is truly a dead end or just a final node
+            # A final node is acceptable if it's at the end of a branch
+            if incoming[nid]:  # Has incoming, so it's in the middle of flow
+                errors.append(f"{nid} ({label}): Potential dead end - no outgoing connections")
+    
+    return errors
+
+# --- Production-Ready Validation Functions ---
+
+def validate_json_structure(graph_data):
+    """Validate JSON structure before processing"""
+    errors = []
+    
+    if "workflows" not in graph_data:
+        errors.append("Missing 'workflows' key in root object")
+        return errors
+    
+    if not isinstance(graph_data["workflows"], list):
+        errors.append("'workflows' must be an array")
+        return errors
+    
+    if len(graph_data["workflows"]) == 0:
+        errors.append("'workflows' array is empty")
+        return errors
+    
+    workflow = graph_data["workflows"][0]
+    
+    if not workflow.get("name") or not workflow.get("name").strip():
+        errors.append("Workflow 'name' is required and cannot be empty")
+    
+    if not workflow.get("description") or not workflow.get("description").strip():
+        errors.append("Workflow 'description' is required and cannot be empty")
+    
+    if "workflow_data" not in workflow:
+        errors.append("Missing 'workflow_data' in workflow")
+        return errors
+    
+    workflow_data = workflow["workflow_data"]
+    
+    if "nodes" not in workflow_data:
+        errors.append("Missing 'nodes' in workflow_data")
+    
+    if "connections" not in workflow_data:
+        errors.append("Missing 'connections' in workflow_data")
+    
+    return errors
+
+def validate_node_ids(nodes):
+    """Ensure all node IDs are unique"""
+    errors = []
+    node_ids = [n["id"] for n in nodes]
+    duplicates = [nid for nid in node_ids if node_ids.count(nid) > 1]
+    
+    if duplicates:
+        unique_dupes = list(set(duplicates))
+        errors.append(f"Duplicate node IDs found: {', '.join(unique_dupes)}")
+    
+    return errors
+
+def validate_connection_targets(nodes, connections):
+    """Validate all connections reference existing nodes"""
+    errors = []
+    node_ids = {n["id"] for n in nodes}
+    
+    for conn in connections:
+        from_id = conn.get("from")
+        to_id = conn.get("to")
+        
+        if not from_id:
+            errors.append("Connection missing 'from' field")
+            continue
+        
+        if not to_id:
+            errors.append("Connection missing 'to' field")
+            continue
+        
+        if from_id not in node_ids:
+            errors.append(f"Connection references non-existent source node: {from_id}")
+        
+        if to_id not in node_ids:
+            errors.append(f"Connection references non-existent target node: {to_id}")
+    
+    return errors
+
+# Integration parameter requirements
+INTEGRATION_REQUIRED_PARAMS = {
+    "Email": {
+        "send_email": ["to", "subject", "body"],
+        "send_bulk_email": ["recipients", "subject", "body"]
+    },
+    "AWS": {
+        "list_blocked_ips_waf": ["ipset_name", "scope"],
+        "unblock_ip_waf": ["ipset_name", "ip", "scope"]
+    },
+    "Github": {
+        "create_issue": ["params"],
+        "list_projects": ["params"]
+    },
+    "Gitlab": {
+        "create_issue": ["params"],
+        "list_projects": ["params"]
+    }
+}
+
+def validate_integration_params(nodes):
+    """Validate integration nodes have required parameters"""
+    errors = []
+    
+    for node in nodes:
+        if node.get("type") != "integration":
+            continue
+        
+        integration_type = node.get("integration_type_name")
+        task = node.get("task")
+        params = node.get("params", {})
+        node_id = node.get("id")
+        label = node.get("label", "Unknown")
+        
+        if integration_type in INTEGRATION_REQUIRED_PARAMS:
+            required = INTEGRATION_REQUIRED_PARAMS[integration_type].get(task, [])
+            for param in required:
+                if param not in params or not params[param]:
+                    errors.append(
+                        f"{node_id} ({label}): Missing required parameter '{param}' for {integration_type}.{task}"
+                    )
+    
+    return errors
+
+# Valid condition operators
+VALID_OPERATORS = ["eq", "ne", "gt", "lt", "gte", "lte", "contains", "not_contains"]
+
+def validate_condition_operators(nodes):
+    """Validate condition node operators"""
+    errors = []
+    
+    for node in nodes:
+        if node.get("type") != "condition":
+            continue
+        
+        node_id = node.get("id")
+        label = node.get("label", "Unknown")
+        config = node.get("config", {})
+        condition = config.get("condition", {})
+        operator = condition.get("operator")
+        
+        if not operator:
+            errors.append(f"{node_id} ({label}): Missing operator in condition")
+        elif operator not in VALID_OPERATORS:
+            errors.append(
+                f"{node_id} ({label}): Invalid operator '{operator}'. "
+                f"Must be one of: {', '.join(VALID_OPERATORS)}"
+            )
+    
+    return errors
+
+def detect_cycles(nodes, connections):
+    """Detect circular dependencies in workflow"""
+    from collections import defaultdict
+    
+    # Build adjacency list
+    graph = defaultdict(list)
+    for conn in connections:
+        graph[conn["from"]].append(conn["to"])
+    
+    # DFS to detect cycles
+    visited = set()
+    rec_stack = set()
+    
+    def has_cycle(node_id):
+        visited.add(node_id)
+        rec_stack.add(node_id)
+        
+        for neighbor in graph[node_id]:
+            if neighbor not in visited:
+                if has_cycle(neighbor):
+                    return True
+            elif neighbor in rec_stack:
+                return True
+        
+        rec_stack.remove(node_id)
+        return False
+    
+    node_ids = [n["id"] for n in nodes]
+    for nid in node_ids:
+        if nid not in visited:
+            if has_cycle(nid):
+                return ["Circular dependency detected in workflow connections"]
+    
+    return []
+
+def auto_fix_connections(graph_data):
+    """Automatically fix common connection errors before validation"""
+    if "workflows" not in graph_data or not graph_data["workflows"]:
+        return
+    
+    workflow = graph_data["workflows"][0]
+    workflow_data = workflow.get("workflow_data", {})
+    nodes = workflow_data.get("nodes", [])
+    connections = workflow_data.get("connections", [])
+    
+    if not nodes or not connections:
+        return
+    
+    # Build connection maps
+    node_ids = [n["id"] for n in nodes]
+    incoming = {nid: [] for nid in node_ids}
+    outgoing = {nid: [] for nid in node_ids}
+    
+    for conn in connections:
+        from_id = conn.get("from")
+        to_id = conn.get("to")
+        if from_id in outgoing:
+            outgoing[from_id].append(conn)
+        if to_id in incoming:
+            incoming[to_id].append(conn)
+    
+    # Fix 1: Connect orphaned nodes to previous sequential node
+    for i, node in enumerate(nodes):
+        nid = node["id"]
+        ntype = node["type"]
+        
+        # Skip start nodes
+        if ntype in ["webhook", "trigger"]:
+            continue
+        
+        # If orphaned and not a condition node
+        if not incoming[nid] and ntype != "condition":
+            # Find previous node in sequence
+            if i > 0:
+                prev_node = nodes[i - 1]
+                prev_id = prev_node["id"]
+                
+                # Add connection from previous node
+                new_conn = {"from": prev_id, "to": nid}
+                connections.append(new_conn)
+                outgoing[prev_id].append(new_conn)
+                incoming[nid].append(new_conn)
+                print(f"AUTO-FIX: Connected orphaned node {nid} to {prev_id}", flush=True)
+    
+    # Fix 2: Ensure condition nodes have exactly 2 outgoing connections
+    for node in nodes:
+        if node.get("type") != "condition":
+            continue
+        
+        nid = node["id"]
+        out_conns = outgoing[nid]
+        
+        # Count true/false branches
+        true_conns = [c for c in out_conns if c.get("sourceHandle") == "true"]
+        false_conns = [c for c in out_conns if c.get("sourceHandle") == "false"]
+        
+        # If missing branches, try to add them
+        if len(true_conns) == 0 or len(false_conns) == 0:
+            # Find next nodes in sequence
+            node_idx = nodes.index(node)
+            
+            if len(true_conns) == 0 and node_idx + 1 < len(nodes):
+                next_node = nodes[node_idx + 1]
+                new_conn = {"from": nid, "sourceHandle": "true", "to": next_node["id"]}
+                connections.append(new_conn)
+                outgoing[nid].append(new_conn)
+                incoming[next_node["id"]].append(new_conn)
+                print(f"AUTO-FIX: Added true branch for condition {nid} to {next_node['id']}", flush=True)
+            
+            if len(false_conns) == 0 and node_idx + 2 < len(nodes):
+                next_next_node = nodes[node_idx + 2]
+                new_conn = {"from": nid, "sourceHandle": "false", "to": next_next_node["id"]}
+                connections.append(new_conn)
+                outgoing[nid].append(new_conn)
+                incoming[next_next_node["id"]].append(new_conn)
+                print(f"AUTO-FIX: Added false branch for condition {nid} to {next_next_node['id']}", flush=True)
+    
+    # Update connections in workflow data
+    workflow_data["connections"] = connections
@@ -71,11 +71,14 @@ const WorkflowCanvas = ({ graphData }) => {
             // Support both internal simple format and company nested format
             let rawNodes = [];
             let rawEdges = [];
+            let serverLayout = false;
 
             if (graphData.workflows && graphData.workflows[0]) {
                 const w = graphData.workflows[0].workflow_data;
                 rawNodes = w.nodes || [];
                 rawEdges = w.connections || [];
+                // Backend fills positions when the request asks for layout
+                serverLayout = rawNodes.length > 0 && rawNodes.every(n => n.position);
             } else {
                 rawNodes = graphData.nodes || [];
                 rawEdges = graphData.edges || [];
@@ -129,10 +132,12 @@ const WorkflowCanvas = ({ graphData }) => {
                 };
             });
 
-            const { nodes: layoutedNodes, edges: layoutedEdges } = getLayoutedElements(
-                normalizedNodes,
-                processedEdges
-            );
+            const { nodes: layoutedNodes, edges: layoutedEdges } = serverLayout
+                ? {
+                    nodes: normalizedNodes.map(node => ({ ...node, targetPosition: 'left', sourcePosition: 'right' })),
+                    edges: processedEdges
+                }
+                : getLayoutedElements(normalizedNodes, processedEdges);
 
             setNodes(layoutedNodes);
             setEdges(layoutedEdges);
@@ -26,7 +26,7 @@ const WorkflowConsole = () => {
             const response = await fetch('http://localhost:5001/api/run_workflow', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ prompt: currentPrompt })
+                body: JSON.stringify({ prompt: currentPrompt, layout: true })
             });
 
             if (!response.ok) throw new Error('API Request Failed');